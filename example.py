@@ -3,6 +3,7 @@ import scigui
 objects = [scigui.objects.Debug]
 functions = [scigui.functions.AddNumbers, scigui.functions.Plot]
 
-# Execute
-app = scigui.Application(objects = objects, functions = functions)
-app.run()
+# Execute (only when run as a script, since worker processes re-import it, see scigui.backends)
+if __name__ == "__main__":
+    app = scigui.Application(objects = objects, functions = functions)
+    app.run()
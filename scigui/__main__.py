@@ -0,0 +1,134 @@
+"""
+Command line interface, e.g.
+
+python -m scigui run workspace.sgui --objects mymodule:OBJECTS --functions mymodule:FUNCTIONS
+
+This loads the workspace, runs all of its functions (like 'Run all' in the GUI), and saves the results back to the workspace (or to --output). No window is ever
+created. The exit code is 0 if everything ran successfully, and 1 if any function failed.
+
+python -m scigui convert workspace.sgui workspace_db.sgui
+
+This converts a JSON workspace to a workspace database (see scigui.database), or a database back to JSON.
+"""
+
+import argparse
+import importlib
+import sys
+import traceback
+
+import matplotlib
+
+
+def import_list(spec):
+    """Import a list of classes given in the form 'module:attribute', e.g. 'mymodule:OBJECTS'.
+
+    Args:
+        spec (str): The module and attribute, separated by a colon.
+
+    Returns:
+        list: The list of classes.
+    """
+    if ":" not in spec:
+        raise argparse.ArgumentTypeError(f"'{spec}' should be in the form module:attribute, e.g. mymodule:OBJECTS")
+
+    module_name, attribute = spec.split(":", 1)
+
+    try:
+        item = importlib.import_module(module_name)
+        for name in attribute.split("."):
+            item = getattr(item, name)
+
+    except (ImportError, AttributeError) as e:
+        raise argparse.ArgumentTypeError(f"Could not import '{spec}': {e}")
+
+    return list(item)
+
+def run(args):
+    from scigui.headless import HeadlessApplication
+    from scigui.scheduler import SchedulingError
+
+    objects = [cls for spec in args.objects for cls in spec]
+    functions = [cls for spec in args.functions for cls in spec]
+
+    application = HeadlessApplication(objects = objects, functions = functions, max_workers = args.workers, figures_directory = args.figures)
+    application.strict_inputs = args.strict_inputs
+
+    try:
+        application.load_file(args.workspace, refresh_treeviews = False)
+
+    except OSError as e:
+        print(f"Could not open workspace: {e}", file = sys.stderr)
+        return 1
+
+    exit_code = 0
+
+    try:
+        print("Executing all functions")
+        application.run_functions(force = args.force)
+        print("Finished executing all functions")
+
+    except SchedulingError as e:
+        # Nothing was run, so there's nothing to save
+        print(f"Scheduling error: {e}", file = sys.stderr)
+        application.backends.shutdown()
+        return 1
+
+    except Exception:
+        traceback.print_exc()
+        exit_code = 1
+
+    # Save whatever was produced, even if a function failed part way through the run
+    application.save_file(args.output if args.output is not None else args.workspace)
+    application.backends.shutdown()
+
+    return exit_code
+
+def convert(args):
+    from scigui.database import database_to_json, is_database, json_to_database
+
+    try:
+        if is_database(args.source):
+            database_to_json(args.source, args.destination)
+            print(f"Converted database {args.source} to JSON {args.destination}")
+        else:
+            json_to_database(args.source, args.destination)
+            print(f"Converted JSON {args.source} to database {args.destination}")
+
+    except (OSError, ValueError) as e:
+        print(f"Could not convert workspace: {e}", file = sys.stderr)
+        return 1
+
+    return 0
+
+def main(argv = None):
+    # Never use a GUI backend for plots made by the user's own modules
+    matplotlib.use("Agg")
+
+    parser = argparse.ArgumentParser(prog = "python -m scigui", description = "Run SciGUI workspaces without a display.")
+    subparsers = parser.add_subparsers(dest = "command", required = True)
+
+    run_parser = subparsers.add_parser("run", help = "Run all the functions in a .sgui workspace and save the results.")
+    run_parser.add_argument("workspace", help = "The .sgui file to run.")
+    run_parser.add_argument("--objects", type = import_list, action = "append", default = [], metavar = "MODULE:ATTRIBUTE",
+                            help = "List of object classes, in the same order given to scigui.Application. Can be given more than once.")
+    run_parser.add_argument("--functions", type = import_list, action = "append", default = [], metavar = "MODULE:ATTRIBUTE",
+                            help = "List of function classes, in the same order given to scigui.Application. Can be given more than once.")
+    run_parser.add_argument("-o", "--output", default = None, help = "File to save the results to. Defaults to overwriting the workspace.")
+    run_parser.add_argument("--figures", default = None, help = "Folder to save plots to. Defaults to the current working directory.")
+    run_parser.add_argument("--workers", type = int, default = None, help = "Maximum number of functions to run at the same time.")
+    run_parser.add_argument("--force", action = "store_true", help = "Re-run every function, even if its inputs haven't changed since it was last run.")
+    run_parser.add_argument("--strict-inputs", action = "store_true", help = "Fail any function that edits its inputs, instead of giving it a copy.")
+    run_parser.set_defaults(handler = run)
+
+    convert_parser = subparsers.add_parser("convert", help = "Convert a JSON .sgui workspace to a workspace database, or a database back to JSON.")
+    convert_parser.add_argument("source", help = "The .sgui file to convert. Whether it's JSON or a database is worked out from the file itself.")
+    convert_parser.add_argument("destination", help = "The .sgui file to save the converted workspace to.")
+    convert_parser.set_defaults(handler = convert)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+# Worker processes re-import this module, so only run when it's actually the main script
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Backends for running a user's function.execute(). Each function class can choose how it is run by giving an optional execution() static method, which should return:
+
+inline - Run in whichever thread is executing the FunctionStore (default).
+thread - Run in a separate thread pool.
+process - Run in a separate worker process. Useful for pure-Python number crunching, which holds the GIL. The inputs are resolved in the main process and then sent to
+          the worker, so all the inputs and results must be picklable. The worker processes are kept alive between calls, with the modules containing the user's objects
+          and functions already imported.
+
+Worker processes are started with 'spawn', so each one imports the script that started the Application again. The script must only create and run the Application
+inside an 'if __name__ == "__main__":' block (see example.py), otherwise every worker opens a window of its own.
+
+Functions run in a worker process can still use inputs_dictionary["\\APPLICATION\\"].popup(), but the popups will only be shown once the function has finished.
+"""
+
+import concurrent.futures
+import importlib
+import multiprocessing
+import threading
+
+EXECUTION_MODES = ["inline", "thread", "process"]
+
+
+def get_execution_mode(function):
+    """Get the execution mode requested by a function class.
+
+    Args:
+        function (class): The user's function class.
+
+    Returns:
+        str: "inline", "thread" or "process".
+    """
+    try:
+        mode = function.execution()
+
+    except AttributeError:
+        return "inline"
+
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"{function.__name__}.execution() returned '{mode}', but it must be one of {EXECUTION_MODES}")
+
+    return mode
+
+
+class WorkerApplication:
+    """Stand-in for the Application that is given to functions running in a worker process."""
+    def __init__(self):
+        self.popups = []
+
+    def popup(self, title_text, body_text):
+        # Popups are sent back to the main process with the results
+        self.popups.append((title_text, body_text))
+
+    def get_axes(self, title = "Plot", three_d = False):
+        raise RuntimeError("get_axes() cannot be used by functions with execution() = 'process'. Use 'inline' or 'thread' instead.")
+
+
+def initialise_worker(module_names):
+    """Import the modules containing the user's objects and functions, so the worker is ready before any work is sent to it."""
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+def execute_in_worker(function, inputs_dictionary, outputs_dictionary):
+    """Run a function's execute() inside a worker process.
+
+    Returns:
+        tuple: The dictionary of results returned by the function, and the list of popups it asked for.
+    """
+    application = WorkerApplication()
+    inputs_dictionary["\\APPLICATION\\"] = application
+    results = function.execute(inputs_dictionary = inputs_dictionary, outputs_dictionary = outputs_dictionary)
+
+    return results, application.popups
+
+
+class ExecutionBackends:
+    def __init__(self, classes, max_workers = None):
+        """Holds the thread and process pools used to run functions. The pools are only started when they're first needed.
+
+        Args:
+            classes (list): The user's object and function classes. Their modules will be imported by each worker process when it starts.
+            max_workers (int, optional): Maximum number of threads or processes in each pool. Defaults to None, which uses the concurrent.futures default.
+        """
+        self.module_names = []
+        for cls in classes:
+            # The main script gets re-imported by multiprocessing itself
+            if cls.__module__ != "__main__" and cls.__module__ not in self.module_names:
+                self.module_names.append(cls.__module__)
+
+        self.max_workers = max_workers
+        self.thread_pool = None
+        self.process_pool = None
+        self.lock = threading.Lock()
+
+    def get_thread_pool(self):
+        with self.lock:
+            if self.thread_pool is None:
+                self.thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = "scigui-function")
+
+            return self.thread_pool
+
+    def get_process_pool(self):
+        with self.lock:
+            if self.process_pool is None:
+                # Use 'spawn' on all platforms - forking a process that is running Tk is not safe
+                self.process_pool = concurrent.futures.ProcessPoolExecutor(max_workers = self.max_workers,
+                                                                           mp_context = multiprocessing.get_context("spawn"),
+                                                                           initializer = initialise_worker,
+                                                                           initargs = (self.module_names,))
+
+            return self.process_pool
+
+    def run(self, function, inputs_dictionary, outputs_dictionary, wait = None, mode = None):
+        """Run a function's execute() using the backend it asks for.
+
+        Args:
+            function (class): The user's function class.
+            inputs_dictionary (dict): The resolved inputs. The "\\APPLICATION\\" key is replaced with a WorkerApplication if the function is run in a worker process.
+            outputs_dictionary (dict): The outputs dictionary.
+            wait (callable, optional): Called repeatedly whilst waiting for a thread or process to finish, e.g. to keep a GUI responsive. Defaults to None, which just blocks.
+            mode (str, optional): Run it with this backend instead, e.g. "inline" whilst profiling. Defaults to None, which uses the one the function asks for.
+
+        Returns:
+            dict: The results returned by the function.
+        """
+        if mode is None:
+            mode = get_execution_mode(function)
+
+        if mode == "inline":
+            return function.execute(inputs_dictionary = inputs_dictionary, outputs_dictionary = outputs_dictionary)
+
+        elif mode == "thread":
+            future = self.get_thread_pool().submit(function.execute, inputs_dictionary = inputs_dictionary, outputs_dictionary = outputs_dictionary)
+            return self.wait_for(future, wait)
+
+        else:
+            application = inputs_dictionary["\\APPLICATION\\"]
+            worker_inputs = {key : value for key, value in inputs_dictionary.items() if key != "\\APPLICATION\\"}
+
+            future = self.get_process_pool().submit(execute_in_worker, function, worker_inputs, outputs_dictionary)
+            results, popups = self.wait_for(future, wait)
+
+            for title_text, body_text in popups:
+                application.popup(title_text = title_text, body_text = body_text)
+
+            return results
+
+    @staticmethod
+    def wait_for(future, wait):
+        if wait is not None:
+            while not future.done():
+                wait()
+                concurrent.futures.wait([future], timeout = 0.05)
+
+        return future.result()
+
+    def shutdown(self):
+        """Stop the thread and process pools."""
+        with self.lock:
+            if self.thread_pool is not None:
+                self.thread_pool.shutdown(wait = False, cancel_futures = True)
+                self.thread_pool = None
+
+            if self.process_pool is not None:
+                self.process_pool.shutdown(wait = False, cancel_futures = True)
+                self.process_pool = None
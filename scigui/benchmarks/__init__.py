@@ -0,0 +1,12 @@
+"""
+Benchmarks for scigui itself, on synthetic workspaces whose size can be chosen (see scigui.benchmarks.workspace), e.g.
+
+python -m scigui.benchmarks --objects 50000 --depth 3 --list-length 20 --chain-length 50 -o results.json
+python -m scigui.benchmarks -o new.json --baseline results.json
+
+The second run is compared with the first, and any benchmark that's slower by more than --threshold is flagged as a regression (the exit code is 1 if there
+are any). Add --tk to include the benchmarks that need Tk, using xvfb-run on a machine without a display.
+"""
+
+from scigui.benchmarks.suite import DEFAULT_PARAMETERS, HEADLESS_BENCHMARKS, TK_BENCHMARKS, compare_results, run_benchmarks
+from scigui.benchmarks.workspace import make_workspace
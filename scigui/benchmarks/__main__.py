@@ -0,0 +1,85 @@
+"""
+Command line interface for the benchmarks. See scigui.benchmarks.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import matplotlib
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m scigui.benchmarks", description = "Time scigui's hot paths on a synthetic workspace.")
+    parser.add_argument("--objects", type = int, default = None, help = "Number of objects in the workspace.")
+    parser.add_argument("--depth", type = int, default = None, help = "How many folders deep the objects are.")
+    parser.add_argument("--list-length", type = int, default = None, help = "Number of links in each object's list of objects.")
+    parser.add_argument("--chain-length", type = int, default = None, help = "Number of functions, each of which reads the output of the one before.")
+    parser.add_argument("--operations", type = int, default = None, help = "Number of objects looked up or replaced by get_object and set_object.")
+    parser.add_argument("--repeats", type = int, default = 5, help = "Number of times to run each benchmark. The best time is the one compared.")
+    parser.add_argument("--only", nargs = "+", default = None, metavar = "NAME", help = "Only run these benchmarks.")
+    parser.add_argument("--tk", action = "store_true", help = "Also run the benchmarks that need Tk. These need a display, e.g. from xvfb-run.")
+    parser.add_argument("--directory", default = None, help = "Folder to put the workspace in. Defaults to a temporary folder.")
+    parser.add_argument("-o", "--output", default = None, help = "JSON file to save the results to.")
+    parser.add_argument("--baseline", default = None, help = "JSON file of earlier results to compare with.")
+    parser.add_argument("--threshold", type = float, default = 0.2, help = "How much slower than the baseline counts as a regression, e.g. 0.2 for 20%%.")
+
+    args = parser.parse_args(argv)
+
+    # Imported here so --help works without them
+    from scigui.benchmarks.suite import HEADLESS_BENCHMARKS, TK_BENCHMARKS, compare_results, run_benchmarks
+
+    if not args.tk:
+        matplotlib.use("Agg")
+
+    elif os.name != "nt" and sys.platform != "darwin" and not os.environ.get("DISPLAY"):
+        print("The Tk benchmarks need a display. Run them with xvfb-run, e.g. xvfb-run python -m scigui.benchmarks --tk", file = sys.stderr)
+        return 2
+
+    if args.only is not None:
+        unknown = set(args.only) - set(HEADLESS_BENCHMARKS + TK_BENCHMARKS)
+
+        if unknown:
+            print(f"Unknown benchmarks: {', '.join(sorted(unknown))}. Choose from {', '.join(HEADLESS_BENCHMARKS + TK_BENCHMARKS)}", file = sys.stderr)
+            return 2
+
+    parameters = {key : value for key, value in [("Objects", args.objects), ("Depth", args.depth), ("List length", args.list_length),
+                                                 ("Chain length", args.chain_length), ("Operations", args.operations)] if value is not None}
+
+    results = run_benchmarks(parameters = parameters, repeats = args.repeats, tk = args.tk, names = args.only, directory = args.directory)
+
+    print("Parameters: " + ", ".join(f"{key} {value}" for key, value in results["Parameters"].items()))
+
+    for name, result in results["Benchmarks"].items():
+        per_operation = f"   ({result['Per operation'] * 1e6:.1f} us per operation)" if result["Operations"] > 1 else ""
+        print(f"{name:<20} best {result['Best']:.4f} s   median {result['Median']:.4f} s{per_operation}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent = 4)
+
+        print(f"Saved results to {args.output}")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+
+    if baseline.get("Parameters") != results["Parameters"]:
+        print("Warning: the baseline was run with different parameters, so the results may not be comparable")
+
+    comparisons = compare_results(results, baseline, threshold = args.threshold)
+
+    print(f"Compared with {args.baseline}:")
+
+    for comparison in comparisons:
+        flag = "   REGRESSION" if comparison["Regression"] else ""
+        print(f"{comparison['Name']:<20} {comparison['Change']:+.1%}{flag}")
+
+    return 1 if any(comparison["Regression"] for comparison in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
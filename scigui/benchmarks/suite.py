@@ -0,0 +1,260 @@
+"""
+The benchmarks themselves. Each one is timed several times, and the results are saved as JSON so they can be compared with a baseline (see compare_results()).
+
+The headless benchmarks use HeadlessApplication, so they run anywhere. The Tk benchmarks (the objects tree, the object window, and 'Run all' with its event
+loop) need a display, e.g. xvfb-run on a machine without one.
+"""
+
+import contextlib
+import datetime
+import gc
+import io
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from scigui.benchmarks.workspace import FUNCTIONS, OBJECT_INDEX, OBJECTS, TARGET_IID, make_workspace
+
+
+HEADLESS_BENCHMARKS = ["load_file", "save_file", "get_object", "set_object", "execute", "run_functions"]
+TK_BENCHMARKS = ["fill_objects_tree", "obj_fnc_window", "run_all_functions"]
+
+DEFAULT_PARAMETERS = {"Objects" : 10000, "Depth" : 2, "List length" : 10, "Chain length" : 20, "Operations" : 1000, "Seed" : 0}
+
+
+def summarise(times, operations = 1):
+    """Summarise the times taken by each repeat of a benchmark.
+
+    Args:
+        times (list): The time taken by each repeat, in seconds.
+        operations (int, optional): Number of operations in each repeat, e.g. objects looked up. Defaults to 1.
+
+    Returns:
+        dict: The result.
+    """
+    return {"Times" : times,
+            "Best" : min(times),
+            "Median" : statistics.median(times),
+            "Mean" : statistics.mean(times),
+            "Operations" : operations,
+            "Per operation" : min(times) / operations}
+
+def time_repeats(run, repeats, setup = None, operations = 1):
+    """Time a benchmark.
+
+    Args:
+        run (callable): The benchmark. It's called with whatever setup() returns.
+        repeats (int): Number of times to run it.
+        setup (callable, optional): Called before each repeat, without being timed. Defaults to None.
+        operations (int, optional): Number of operations in each repeat. Defaults to 1.
+
+    Returns:
+        dict: The result (see summarise()).
+    """
+    times = []
+
+    for _ in range(repeats):
+        state = setup() if setup is not None else None
+
+        # Garbage from the last repeat shouldn't be collected part way through this one
+        gc.collect()
+        gc.disable()
+
+        try:
+            start = time.perf_counter()
+            run(state)
+            times.append(time.perf_counter() - start)
+
+        finally:
+            gc.enable()
+
+    return summarise(times, operations)
+
+
+def run_headless_benchmarks(filename, contents, parameters, repeats, names):
+    from scigui.headless import HeadlessApplication
+    from scigui.main import ObjectStore, get_object, set_object
+
+    results = {}
+    rng = random.Random(parameters["Seed"])
+    sample = [rng.choice(contents["Item IIDs"]) for _ in range(parameters["Operations"])] if len(contents["Item IIDs"]) > 0 else []
+    output_filename = os.path.join(os.path.dirname(filename), "saved.sgui")
+
+    def new_application():
+        return HeadlessApplication(objects = OBJECTS, functions = FUNCTIONS)
+
+    def load(application):
+        application.load_file(filename, refresh_treeviews = False, print_msg = False)
+
+    if "load_file" in names:
+        results["load_file"] = time_repeats(load, repeats, setup = new_application)
+
+    application = new_application()
+    load(application)
+
+    if "save_file" in names:
+        results["save_file"] = time_repeats(lambda state : application.save_file(output_filename), repeats)
+
+    if "get_object" in names and len(sample) > 0:
+        def get_objects(state):
+            for iid in sample:
+                get_object(application.active_objects, iid)
+
+        results["get_object"] = time_repeats(get_objects, repeats, operations = len(sample))
+
+    if "set_object" in names and len(sample) > 0:
+        def make_stores():
+            return [ObjectStore(application = application, index = OBJECT_INDEX, dictionary = {"\\INPUTS\\" : {"Value" : "0", "Links" : []}}) for _ in sample]
+
+        def set_objects(stores):
+            for iid, store in zip(sample, stores):
+                set_object(database = application.active_objects, iid = iid, to_add = store)
+
+        results["set_object"] = time_repeats(set_objects, repeats, setup = make_stores, operations = len(sample))
+
+    # The functions do nothing, so this is only scigui's own overhead
+    function_stores = [application.active_functions[key] for key in contents["Functions"]]
+
+    if "execute" in names and len(function_stores) > 0:
+        def execute(state):
+            for key, function_store in zip(contents["Functions"], function_stores):
+                function_store.execute(refresh_treeview = False, name = key)
+
+        results["execute"] = time_repeats(execute, repeats, operations = len(function_stores))
+
+    if "run_functions" in names and len(function_stores) > 0:
+        results["run_functions"] = time_repeats(lambda state : application.run_functions(force = True), repeats, operations = len(function_stores))
+
+    application.backends.shutdown()
+
+    return results
+
+def run_tk_benchmarks(filename, contents, parameters, repeats, names):
+    from scigui.main import Application, fill_objects_tree
+
+    results = {}
+    application = Application(objects = OBJECTS, functions = FUNCTIONS, console_log = None)
+    application.autosave = False
+    application.load_file(filename, refresh_treeviews = False, print_msg = False)
+    application.root.update()
+
+    try:
+        if "fill_objects_tree" in names:
+            def clear_tree():
+                application.objects_tree.delete(*application.objects_tree.get_children())
+
+            def fill_tree(state):
+                fill_objects_tree(treeview = application.objects_tree, dictionary = application.active_objects, object_image = application.object_image,
+                                  folder_image = application.folder_image)
+                application.root.update_idletasks()
+
+            results["fill_objects_tree"] = time_repeats(fill_tree, repeats, setup = clear_tree)
+
+        if "obj_fnc_window" in names:
+            # The object window opens whatever is selected in the objects tree
+            def select_target():
+                close_window()
+
+                if not application.objects_tree.exists(TARGET_IID):
+                    fill_objects_tree(treeview = application.objects_tree, dictionary = application.active_objects, object_image = application.object_image,
+                                      folder_image = application.folder_image)
+
+                application.objects_tree.focus(TARGET_IID)
+
+            def open_window(state):
+                application.obj_fnc_window("object")
+                application.root.update()
+
+            def close_window():
+                if getattr(application, "main_window", None) is not None and application.main_window.winfo_exists():
+                    application.main_window.destroy()
+
+            results["obj_fnc_window"] = time_repeats(open_window, repeats, setup = select_target)
+            close_window()
+
+        if "run_all_functions" in names and len(contents["Functions"]) > 0:
+            def run_all(state):
+                application.run_all_functions(force = True)
+
+                # The functions run in the background, and the run has finished once the main thread has been told
+                while application.is_running():
+                    application.root.update()
+
+            results["run_all_functions"] = time_repeats(run_all, repeats, operations = len(contents["Functions"]))
+
+    finally:
+        application.modified_and_not_saved = False
+        application.on_closing()
+
+    return results
+
+def run_benchmarks(parameters = None, repeats = 5, tk = False, names = None, directory = None):
+    """Make a synthetic workspace, and time scigui's hot paths on it.
+
+    Args:
+        parameters (dict, optional): The workspace's parameters, with the same keys as DEFAULT_PARAMETERS. Any that aren't given use the defaults. Defaults to None.
+        repeats (int, optional): Number of times to run each benchmark. Defaults to 5.
+        tk (bool, optional): Whether to run the Tk benchmarks too, which need a display. Defaults to False.
+        names (list, optional): Only run these benchmarks. Defaults to None, which runs all of them.
+        directory (str, optional): Folder to put the workspace in. Defaults to None, which uses a temporary folder that's deleted afterwards.
+
+    Returns:
+        dict: The results, as {"Parameters" : parameters, "Environment" : where they were run, "Benchmarks" : {name : result}}. See summarise() for each result.
+    """
+    parameters = dict(DEFAULT_PARAMETERS, **(parameters or {}))
+    names = set(names) if names is not None else set(HEADLESS_BENCHMARKS + (TK_BENCHMARKS if tk else []))
+
+    with contextlib.ExitStack() as stack:
+        if directory is None:
+            directory = stack.enter_context(tempfile.TemporaryDirectory(prefix = "scigui-benchmarks-"))
+
+        os.makedirs(directory, exist_ok = True)
+        filename = os.path.join(directory, "workspace.sgui")
+        contents = make_workspace(filename, objects = parameters["Objects"], depth = parameters["Depth"], list_length = parameters["List length"],
+                                  chain_length = parameters["Chain length"], seed = parameters["Seed"])
+
+        # Everything scigui prints (e.g. "Saved to ...") would be timed too
+        with contextlib.redirect_stdout(io.StringIO()):
+            benchmarks = run_headless_benchmarks(filename, contents, parameters, repeats, names)
+
+            if tk and names & set(TK_BENCHMARKS):
+                benchmarks.update(run_tk_benchmarks(filename, contents, parameters, repeats, names))
+
+    return {"Parameters" : parameters,
+            "Environment" : {"Python" : sys.version,
+                             "Platform" : platform.platform(),
+                             "Machine" : platform.node(),
+                             "Time" : datetime.datetime.now().isoformat(timespec = "seconds"),
+                             "Repeats" : repeats},
+            "Benchmarks" : benchmarks}
+
+def compare_results(results, baseline, threshold = 0.2):
+    """Compare benchmark results with a baseline, e.g. from before a change.
+
+    Args:
+        results (dict): The results, from run_benchmarks().
+        baseline (dict): The baseline results.
+        threshold (float, optional): How much slower a benchmark can be before it's a regression, e.g. 0.2 for 20% slower. Defaults to 0.2.
+
+    Returns:
+        list: A dictionary for each benchmark in both, with "Name", "Baseline" and "Result" (the best time per operation, in seconds), "Change" (as a fraction
+              of the baseline) and "Regression".
+    """
+    comparisons = []
+
+    for name, result in results["Benchmarks"].items():
+        if name not in baseline.get("Benchmarks", {}):
+            continue
+
+        # The best time is the least affected by whatever else the machine is doing
+        old = baseline["Benchmarks"][name]["Per operation"]
+        new = result["Per operation"]
+        change = (new - old) / old if old > 0 else 0.0
+
+        comparisons.append({"Name" : name, "Baseline" : old, "Result" : new, "Change" : change, "Regression" : change > threshold})
+
+    return comparisons
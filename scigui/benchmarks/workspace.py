@@ -0,0 +1,108 @@
+"""
+Synthetic workspaces for the benchmarks. Every object is an Item, whose inputs are a value and a list of links to other items, and every function is a Step,
+which does nothing but link to the previous step's output and make the next one. This keeps the time spent in the user's code to almost nothing, so the
+benchmarks only measure scigui itself.
+"""
+
+import json
+import math
+import random
+
+
+class Item:
+    def __init__(self, dictionary):
+        self.value = dictionary["Value"]
+        self.links = dictionary["Links"]
+
+    @staticmethod
+    def inputs():
+        return {"Value" : "raw",
+                "Links" : ["object"]}
+
+
+class Step:
+    @staticmethod
+    def execute(inputs_dictionary, outputs_dictionary):
+        return {"Result" : {"Value" : "0", "Links" : []}}
+
+    @staticmethod
+    def inputs():
+        return {"Source" : "object"}
+
+    @staticmethod
+    def outputs():
+        return {"Result" : Item}
+
+
+OBJECTS = [Item]
+FUNCTIONS = [Step]
+
+OBJECT_INDEX = 1                        # Index of Item in Application.objects, which starts with String
+FUNCTION_INDEX = 0                      # Index of Step in Application.functions
+
+TARGET_IID = "\\Target"                 # An item at the top of the tree with a full list of links, for opening in the object window
+
+
+def get_item_iid(i, depth, branching):
+    # Spread the items over the folders like the digits of a number, so every folder at the same depth has about the same number of items in it
+    folders = []
+
+    for _ in range(depth):
+        i, digit = divmod(i, branching)
+        folders.append(f"Folder {digit}")
+
+    return "\\" + "\\".join(reversed(folders)) + ("\\" if depth > 0 else "") + f"Item {i}"
+
+def make_item(value, links):
+    return {"\\INPUTS\\" : {"Value" : str(value), "Links" : links}, "\\OBJECT_INDEX\\" : OBJECT_INDEX}
+
+def add_to_folder(objects, iid, item):
+    folder = objects
+    keys = iid.split("\\")[1:]
+
+    for key in keys[:-1]:
+        folder = folder.setdefault(key, {})
+
+    folder[keys[-1]] = item
+
+def make_workspace(filename, objects = 10000, depth = 2, list_length = 10, chain_length = 20, seed = 0):
+    """Write a synthetic JSON workspace, made of OBJECTS and FUNCTIONS.
+
+    Args:
+        filename (str): The .sgui file to write.
+        objects (int, optional): Number of items, not counting the chain of outputs and TARGET_IID. Defaults to 10000.
+        depth (int, optional): How many folders deep the items are. Defaults to 2.
+        list_length (int, optional): Number of links in each item's list of objects. Defaults to 10.
+        chain_length (int, optional): Number of functions, each of which reads the output of the one before. Defaults to 20.
+        seed (int, optional): Seed for choosing the links, so the same parameters always give the same workspace. Defaults to 0.
+
+    Returns:
+        dict: What's in the workspace, i.e. {"Item IIDs" : IID of every item, "Chain IIDs" : IID of every output of the chain, "Functions" : key of every function}.
+    """
+    rng = random.Random(seed)
+    branching = max(2, math.ceil(objects ** (1 / (depth + 1)))) if objects > 0 else 2
+
+    item_iids = [get_item_iid(i, depth, branching) for i in range(objects)]
+    json_objects = {}
+
+    for i, iid in enumerate(item_iids):
+        links = [item_iids[rng.randrange(objects)] for _ in range(list_length)] if i > 0 else []
+        add_to_folder(json_objects, iid, make_item(i, links))
+
+    add_to_folder(json_objects, TARGET_IID, make_item(-1, [rng.choice(item_iids) for _ in range(list_length)] if objects > 0 else []))
+
+    # Each step reads the output of the one before, so they have to be run in order
+    chain_iids = [f"\\Chain\\Step {i}" for i in range(chain_length + 1)]
+    add_to_folder(json_objects, chain_iids[0], make_item(0, []))
+
+    json_functions = {}
+
+    for i in range(chain_length):
+        json_functions[f"Step {i + 1}"] = {"\\INPUTS\\" : {"Source" : chain_iids[i]},
+                                           "\\OUTPUTS\\" : {"Result" : chain_iids[i + 1]},
+                                           "\\FUNCTION_INDEX\\" : FUNCTION_INDEX}
+
+    with open(filename, "w") as f:
+        json.dump({"Objects" : json_objects, "Functions" : json_functions}, f)
+
+    return {"Item IIDs" : item_iids, "Chain IIDs" : chain_iids, "Functions" : list(json_functions)}
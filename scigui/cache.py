@@ -0,0 +1,298 @@
+"""
+Cache of function results, so pure functions don't need to be re-run when they're given the same inputs again. Function classes opt in by giving a cache_results()
+static method that returns True.
+
+Results are kept in memory, and also saved to a folder next to the open .sgui file so they survive between sessions. Both are limited in size, with the least
+recently used results removed first.
+
+The objects built from each ObjectStore are also cached (in memory only), so an object linked to by many others is only built once. These are used by default,
+and object classes opt out with a cache_instance() static method that returns False.
+"""
+
+import collections
+import os
+import pickle
+import threading
+
+
+def get_cache_results(function):
+    """Check whether a function class has asked for its results to be cached.
+
+    Args:
+        function (class): The user's function class.
+
+    Returns:
+        bool: True if results should be cached.
+    """
+    try:
+        return bool(function.cache_results())
+    except AttributeError:
+        return False
+
+
+class ResultCache:
+    def __init__(self, memory_limit = 64 * 1024**2, disk_limit = 1024**3, directory = None):
+        """In-memory and on-disk cache of function results, each with least-recently-used eviction.
+
+        Args:
+            memory_limit (int, optional): Maximum number of bytes (of pickled results) to keep in memory. Defaults to 64 MB.
+            disk_limit (int, optional): Maximum number of bytes to keep on disk. Defaults to 1 GB.
+            directory (str, optional): Folder to keep the on-disk cache in. Defaults to None, which only uses the in-memory cache.
+        """
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.lock = threading.Lock()
+
+        self.memory = collections.OrderedDict()     # {key : pickled results}, with the least recently used first
+        self.memory_bytes = 0
+
+        self.directory = None
+        self.disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.set_directory(directory)
+
+    def set_directory(self, directory):
+        """Change the folder used for the on-disk cache, e.g. when a different file is opened.
+
+        Args:
+            directory (str): The folder. It is created when the first result is saved to it. Use None to turn off the on-disk cache.
+        """
+        with self.lock:
+            self.directory = directory
+            self.disk_bytes = 0
+
+            if directory is not None and os.path.isdir(directory):
+                for entry in os.scandir(directory):
+                    if entry.name.endswith(".pickle"):
+                        self.disk_bytes += entry.stat().st_size
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def get(self, key):
+        """Look up the results for a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict or None: A fresh copy of the cached results, or None if they aren't in the cache.
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return pickle.loads(self.memory[key])
+
+            if self.directory is not None:
+                path = self.get_path(key)
+
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+
+                    os.utime(path)      # Mark as recently used
+
+                except OSError:
+                    pass
+
+                else:
+                    self.disk_hits += 1
+                    self.add_to_memory(key, data)
+                    return pickle.loads(data)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, results):
+        """Add results to the cache. Results that can't be pickled are silently ignored.
+
+        Args:
+            key (str): The cache key.
+            results (dict): The results returned by the function.
+        """
+        try:
+            data = pickle.dumps(results, protocol = pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+
+        with self.lock:
+            self.add_to_memory(key, data)
+
+            if self.directory is not None:
+                self.add_to_disk(key, data)
+
+    def add_to_memory(self, key, data):
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key))
+
+        # Don't let a single huge result push everything else out
+        if len(data) > self.memory_limit:
+            return
+
+        self.memory[key] = data
+        self.memory_bytes += len(data)
+
+        while self.memory_bytes > self.memory_limit:
+            old_key, old_data = self.memory.popitem(last = False)
+            self.memory_bytes -= len(old_data)
+            self.evictions += 1
+
+    def add_to_disk(self, key, data):
+        if len(data) > self.disk_limit:
+            return
+
+        path = self.get_path(key)
+
+        try:
+            os.makedirs(self.directory, exist_ok = True)
+
+            if os.path.exists(path):
+                self.disk_bytes -= os.path.getsize(path)
+
+            # Write to a temporary file first, so a crash can't leave a half-written result behind
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+
+        except OSError:
+            return
+
+        self.disk_bytes += len(data)
+
+        if self.disk_bytes > self.disk_limit:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".pickle")]
+            entries.sort(key = lambda entry : entry.stat().st_mtime)
+
+            for entry in entries:
+                if self.disk_bytes <= self.disk_limit:
+                    break
+
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+
+                self.disk_bytes -= size
+                self.evictions += 1
+
+    def clear(self):
+        """Remove everything from the in-memory and on-disk caches, and reset the counters."""
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+
+            if self.directory is not None and os.path.isdir(self.directory):
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(".pickle"):
+                        try:
+                            os.remove(entry.path)
+                        except OSError:
+                            pass
+
+            self.disk_bytes = 0
+            self.memory_hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def statistics(self):
+        """Get the hit/miss counters and current sizes of the cache.
+
+        Returns:
+            dict: The statistics.
+        """
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+
+            return {"Memory hits" : self.memory_hits,
+                    "Disk hits" : self.disk_hits,
+                    "Misses" : self.misses,
+                    "Hit rate" : (self.memory_hits + self.disk_hits) / lookups if lookups > 0 else 0.0,
+                    "Evictions" : self.evictions,
+                    "Memory entries" : len(self.memory),
+                    "Memory bytes" : self.memory_bytes,
+                    "Disk bytes" : self.disk_bytes,
+                    "Disk directory" : self.directory}
+
+
+def get_cache_instance(object_class):
+    """Check whether instances of an object class can be cached and shared. Object classes opt out by giving a cache_instance() static method that returns False,
+    e.g. if their instances are edited by the functions that use them.
+
+    Args:
+        object_class (class): The user's object class.
+
+    Returns:
+        bool: True if instances can be cached.
+    """
+    try:
+        return bool(object_class.cache_instance())
+    except AttributeError:
+        return True
+
+
+class InstanceCache:
+    def __init__(self, max_entries = 1024):
+        """In-memory cache of the objects built by ObjectStore.get_object(), with least-recently-used eviction. The entries themselves are checked for being out of
+        date by the ObjectStore, so this only limits how many are kept.
+
+        Args:
+            max_entries (int, optional): Maximum number of objects to keep. Defaults to 1024.
+        """
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()      # {ObjectStore : entry}, with the least recently used first
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, store):
+        with self.lock:
+            entry = self.entries.get(store)
+
+            if entry is not None:
+                self.entries.move_to_end(store)
+
+            return entry
+
+    def put(self, store, entry):
+        with self.lock:
+            self.entries[store] = entry
+            self.entries.move_to_end(store)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last = False)
+                self.evictions += 1
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        """Remove every cached object, and reset the counters."""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def statistics(self):
+        """Get the hit/miss counters and current size of the cache.
+
+        Returns:
+            dict: The statistics.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {"Hits" : self.hits,
+                    "Misses" : self.misses,
+                    "Hit rate" : self.hits / lookups if lookups > 0 else 0.0,
+                    "Evictions" : self.evictions,
+                    "Entries" : len(self.entries)}
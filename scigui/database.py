@@ -0,0 +1,404 @@
+"""
+Workspaces stored in a single SQLite database, as an alternative to JSON. The file still ends in .sgui, and is recognised by its SQLite header.
+
+The database has these tables:
+    tree        One row for every object and folder, keyed by IID, with the folder it's in and its position in that folder. Folders have no object_id.
+    objects     The JSON form of each object (see ObjectStore.to_json_form()), keyed by an ID that stays the same when the object is moved or renamed.
+    functions   The JSON form of each function, keyed by name, with its position in the list.
+    sections    Any other parts of the workspace, as JSON.
+
+Once a database is attached to an ObjectTree (see WorkspaceDatabase.attach()), every change to the tree is written straight away as a small transaction, so
+saving only needs to write the functions. Opening a workspace only reads the tree table. Each object's JSON form is read the first time it's needed.
+
+json_to_database() and database_to_json() convert between the two formats a piece at a time, without loading the whole workspace.
+"""
+
+import collections.abc
+import json
+import os
+import sqlite3
+import threading
+
+from scigui.payloads import PayloadStore
+from scigui.workspace import EncodedJSON, WorkspaceEncoder, read_workspace, write_workspace
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tree (iid TEXT PRIMARY KEY, parent TEXT NOT NULL, position INTEGER NOT NULL, object_id INTEGER);
+CREATE INDEX IF NOT EXISTS tree_parent ON tree (parent, position);
+CREATE TABLE IF NOT EXISTS objects (id INTEGER PRIMARY KEY, object_index INTEGER NOT NULL, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS functions (name TEXT PRIMARY KEY, position INTEGER NOT NULL, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sections (name TEXT PRIMARY KEY, data TEXT NOT NULL);
+"""
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def is_database(filename):
+    """Check whether a file is a workspace database, rather than JSON.
+
+    Args:
+        filename (str): The file.
+
+    Returns:
+        bool: True if it's an SQLite database.
+    """
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+    except OSError:
+        return False
+
+def get_json_form(item):
+    # Items can be stores, or JSON forms that have been read straight from a file
+    if hasattr(item, "to_json_form"):
+        return item.to_json_form()
+
+    return item
+
+def is_folder(item):
+    # The JSON form of an object is a dictionary too, but it has keys starting with '\\', which the names of objects and folders can't
+    return isinstance(item, dict) and "\\OBJECT_INDEX\\" not in item
+
+def remove_database(filename):
+    # Delete a database, along with the files SQLite keeps next to it whilst it's open
+    for path in (filename, filename + "-wal", filename + "-shm", filename + "-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def subtree(iid):
+    # SQL condition (and its parameters) for an item and everything inside it. ']' is the character after '\\', so this covers every IID starting with iid + '\\'.
+    return "(iid = ? OR (iid >= ? AND iid < ?))", (iid, iid + "\\", iid + "]")
+
+
+class WorkspaceDatabase:
+    def __init__(self, filename):
+        """A workspace stored in an SQLite database. The database is made if it doesn't exist.
+
+        Args:
+            filename (str): The .sgui file.
+        """
+        self.filename = filename
+        self.lock = threading.RLock()           # Objects can be changed by functions running on other threads
+        self.tree = None                        # The ObjectTree this database is attached to
+        self.encoder = WorkspaceEncoder()       # Objects can hold things with their own JSON form, e.g. references to payloads (see scigui.payloads)
+
+        self.connection = sqlite3.connect(filename, check_same_thread = False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.detach()
+
+        with self.lock:
+            self.connection.close()
+
+    # Reading
+    def read_objects(self, objects, make_store):
+        """Add every object and folder in the database to a folder. Objects aren't read yet, only their position in the tree.
+
+        Args:
+            objects (dict): The folder to add them to, e.g. an empty ObjectTree.
+            make_store (callable): Called as make_store(object_index, loader) for each object, and returns its ObjectStore. loader() reads its JSON form.
+        """
+        folders = {"" : objects}
+
+        with self.lock:
+            # Sorting by parent puts every folder before the things in it, since a folder's IID is the start of theirs
+            rows = self.connection.execute("SELECT tree.iid, tree.parent, tree.object_id, objects.object_index FROM tree LEFT JOIN objects ON objects.id = tree.object_id "
+                                           "ORDER BY tree.parent, tree.position").fetchall()
+
+        for iid, parent, object_id, object_index in rows:
+            folder = folders[parent]
+            key = iid.rpartition("\\")[2]
+
+            if object_id is None:
+                folder[key] = {}
+                folders[iid] = folder[key]
+            else:
+                folder[key] = make_store(object_index, lambda object_id = object_id : self.read_object(object_id))
+
+    def read_object(self, object_id):
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM objects WHERE id = ?", (object_id,)).fetchone()
+
+        if row is None:
+            raise KeyError(f"Object {object_id} is not in {self.filename}")
+
+        return json.loads(row[0])
+
+    def read_functions(self):
+        """Get the JSON form of every function, in order.
+
+        Returns:
+            dict: Dictionary of {name : JSON form}.
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT name, data FROM functions ORDER BY position").fetchall()
+
+        return {name : json.loads(data) for name, data in rows}
+
+    def read_sections(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT name, data FROM sections").fetchall()
+
+        return {name : json.loads(data) for name, data in rows}
+
+    # Writing
+    def write_functions(self, functions):
+        """Replace all the functions in the database.
+
+        Args:
+            functions (dict): Dictionary of {name : FunctionStore or JSON form}.
+        """
+        rows = [(name, position, self.encoder.encode(get_json_form(function))) for position, (name, function) in enumerate(functions.items())]
+
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM functions")
+            self.connection.executemany("INSERT INTO functions (name, position, data) VALUES (?, ?, ?)", rows)
+
+    def write_section(self, name, data):
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO sections (name, data) VALUES (?, ?)", (name, self.encoder.encode(data)))
+
+    def write_objects(self, objects):
+        """Replace all the objects in the database.
+
+        Args:
+            objects (dict): The objects, e.g. an ObjectTree.
+        """
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM tree")
+            self.connection.execute("DELETE FROM objects")
+
+            for position, (key, item) in enumerate(objects.items()):
+                self.insert_item("\\" + key, item, position)
+
+    def insert_item(self, iid, item, position):
+        # Add an item, and everything inside it. This must be called inside a transaction.
+        parent = iid.rpartition("\\")[0]
+
+        if is_folder(item):
+            self.connection.execute("INSERT INTO tree (iid, parent, position, object_id) VALUES (?, ?, ?, NULL)", (iid, parent, position))
+
+            for child_position, (key, child) in enumerate(item.items()):
+                self.insert_item(iid + "\\" + key, child, child_position)
+
+        else:
+            json_form = get_json_form(item)
+            cursor = self.connection.execute("INSERT INTO objects (object_index, data) VALUES (?, ?)", (json_form["\\OBJECT_INDEX\\"], self.encoder.encode(json_form)))
+            self.connection.execute("INSERT INTO tree (iid, parent, position, object_id) VALUES (?, ?, ?, ?)", (iid, parent, position, cursor.lastrowid))
+
+    def delete_item(self, iid):
+        # Remove an item, and everything inside it. This must be called inside a transaction.
+        condition, parameters = subtree(iid)
+        self.connection.execute(f"DELETE FROM objects WHERE id IN (SELECT object_id FROM tree WHERE {condition})", parameters)
+        self.connection.execute(f"DELETE FROM tree WHERE {condition}", parameters)
+
+    def next_position(self, iid):
+        # Position for an item that has been added, or moved, to the folder it's in. Items are usually added to the end, so the folder only needs to be
+        # renumbered if it wasn't.
+        parent, _, key = iid.rpartition("\\")
+        folder = self.tree.find(parent)
+
+        if next(reversed(folder)) == key:
+            row = self.connection.execute("SELECT MAX(position) FROM tree WHERE parent = ? AND iid != ?", (parent, iid)).fetchone()
+            return 0 if row[0] is None else row[0] + 1
+
+        self.renumber(parent)
+        return list(folder.keys()).index(key)
+
+    def renumber(self, folder_iid):
+        # Save the order of the items in a folder. This must be called inside a transaction.
+        folder = self.tree.find(folder_iid)
+        self.connection.executemany("UPDATE tree SET position = ? WHERE iid = ?", [(position, folder_iid + "\\" + key) for position, key in enumerate(folder.keys())])
+
+    # Keeping the database up to date
+    def attach(self, tree, write = False):
+        """Save every change made to an ObjectTree from now on.
+
+        Args:
+            tree (ObjectTree): The tree.
+            write (bool, optional): Whether to replace the objects in the database with the ones in the tree first. Defaults to False, for a tree that was
+                                    read from this database.
+        """
+        self.detach()
+
+        if write:
+            self.write_objects(tree)
+
+        self.tree = tree
+        self.tree.add_listener(self.on_objects_event)
+
+    def detach(self):
+        if self.tree is not None:
+            self.tree.remove_listener(self.on_objects_event)
+            self.tree = None
+
+    def on_objects_event(self, event, iid, new_iid = None):
+        # Called by the tree straight after it changes (see scigui.tree), on whichever thread changed it. Each change is one transaction.
+        with self.lock, self.connection:
+            if event == "add":
+                item = self.tree.find(iid)
+                self.insert_item(iid, item, self.next_position(iid))
+
+            elif event == "remove":
+                self.delete_item(iid)
+
+            elif event == "replace":
+                item = self.tree.find(iid)
+                get_json_form(item)         # Read it before its old row is deleted, in case it's the same object being added again
+                row = self.connection.execute("SELECT position FROM tree WHERE iid = ?", (iid,)).fetchone()
+                self.delete_item(iid)
+                self.insert_item(iid, item, row[0] if row is not None else self.next_position(iid))
+
+            elif event == "move":
+                condition, parameters = subtree(iid)
+                new_parent = new_iid.rpartition("\\")[0]
+                start = len(iid) + 1
+
+                self.connection.execute(f"UPDATE tree SET parent = CASE WHEN iid = ? THEN ? ELSE ? || substr(parent, ?) END, iid = ? || substr(iid, ?) WHERE {condition}",
+                                        (iid, new_parent, new_iid, start, new_iid, start) + parameters)
+                self.connection.execute("UPDATE tree SET position = ? WHERE iid = ?", (self.next_position(new_iid), new_iid))
+
+            elif event == "reorder":
+                self.renumber(iid)
+
+
+class DatabaseFolder(collections.abc.Mapping):
+    def __init__(self, database, iid = ""):
+        """A folder in a workspace database, which can be read and added to like a dictionary, without loading the rest of the workspace. Objects are read as
+        their encoded JSON form. Used to convert between JSON and databases.
+
+        Args:
+            database (WorkspaceDatabase): The database.
+            iid (str, optional): The IID of the folder. Defaults to "", the top level.
+        """
+        self.database = database
+        self.iid = iid
+        self.num_added = 0
+
+    def __getitem__(self, key):
+        iid = self.iid + "\\" + key
+        row = self.database.connection.execute("SELECT tree.object_id, objects.data FROM tree LEFT JOIN objects ON objects.id = tree.object_id WHERE tree.iid = ?",
+                                               (iid,)).fetchone()
+
+        if row is None:
+            raise KeyError(key)
+
+        return DatabaseFolder(self.database, iid) if row[0] is None else EncodedJSON(row[1])
+
+    def __setitem__(self, key, value):
+        # Items are always added to the end
+        self.database.insert_item(self.iid + "\\" + key, value, self.num_added)
+        self.num_added += 1
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def __len__(self):
+        return self.database.connection.execute("SELECT COUNT(*) FROM tree WHERE parent = ?", (self.iid,)).fetchone()[0]
+
+    def items(self):
+        cursor = self.database.connection.execute("SELECT tree.iid, tree.object_id, objects.data FROM tree LEFT JOIN objects ON objects.id = tree.object_id "
+                                                  "WHERE tree.parent = ? ORDER BY tree.position", (self.iid,))
+
+        for iid, object_id, data in cursor:
+            key = iid.rpartition("\\")[2]
+            yield key, DatabaseFolder(self.database, iid) if object_id is None else EncodedJSON(data)
+
+
+def write_database(filename, objects, functions, sections = None):
+    """Save a whole workspace as a new database. It's written to filename + ".tmp" first, which then replaces the file, like scigui.workspace.write_workspace().
+
+    Args:
+        filename (str): The .sgui file to save to.
+        objects (dict): The objects, e.g. Application.active_objects.
+        functions (dict): The functions, e.g. Application.active_functions.
+        sections (dict, optional): Any other sections to save. Defaults to None.
+    """
+    temp_filename = filename + ".tmp"
+    remove_database(temp_filename)
+    database = None
+
+    try:
+        database = WorkspaceDatabase(temp_filename)
+        database.write_objects(objects)
+        database.write_functions(functions)
+
+        for name, data in (sections or {}).items():
+            database.write_section(name, data)
+
+        # Put everything back in the one file before it's moved
+        database.connection.execute("PRAGMA journal_mode = DELETE")
+        database.close()
+        os.replace(temp_filename, filename)
+
+    except BaseException:
+        if database is not None:
+            database.close()
+
+        remove_database(temp_filename)
+        raise
+
+def json_to_database(json_filename, database_filename, progress = None):
+    """Convert a JSON workspace to a database, a piece at a time.
+
+    Args:
+        json_filename (str): The JSON workspace.
+        database_filename (str): The database to make. It is replaced if it already exists. Its payloads (see scigui.payloads) are copied next to it.
+        progress (callable, optional): Called as progress(bytes_read, total_bytes) as the JSON is read. Defaults to None.
+    """
+    temp_filename = database_filename + ".tmp"
+    remove_database(temp_filename)
+    database = None
+
+    try:
+        database = WorkspaceDatabase(temp_filename)
+        functions = {}
+
+        with database.lock, database.connection:
+            sections = read_workspace(json_filename, objects = DatabaseFolder(database), functions = functions, convert = lambda json_form : json_form, progress = progress)
+
+        database.write_functions(functions)
+
+        for name, data in sections.items():
+            database.write_section(name, data)
+
+        database.connection.execute("PRAGMA journal_mode = DELETE")
+        database.close()
+
+        # The payloads go next to the new file before it's there, so it never refers to one that isn't (see scigui.payloads)
+        PayloadStore(json_filename + ".payloads").copy_all_to(database_filename + ".payloads")
+        os.replace(temp_filename, database_filename)
+
+    except BaseException:
+        if database is not None:
+            database.close()
+
+        remove_database(temp_filename)
+        raise
+
+def database_to_json(database_filename, json_filename):
+    """Convert a database workspace to JSON, a piece at a time.
+
+    Args:
+        database_filename (str): The database.
+        json_filename (str): The JSON workspace to make. It is replaced if it already exists. Its payloads (see scigui.payloads) are copied next to it.
+    """
+    database = WorkspaceDatabase(database_filename)
+
+    try:
+        PayloadStore(database_filename + ".payloads").copy_all_to(json_filename + ".payloads")
+        functions = {name : EncodedJSON(json.dumps(json_form)) for name, json_form in database.read_functions().items()}
+
+        with database.lock:
+            write_workspace(json_filename, objects = DatabaseFolder(database), functions = functions, sections = database.read_sections())
+
+    finally:
+        database.close()
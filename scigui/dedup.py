@@ -0,0 +1,391 @@
+"""
+Identical input values are only kept once. Sweeps and repeated runs leave many objects whose inputs are the same, or only differ in a few values, so each value
+in an object's "\\INPUTS\\" that is big enough to be worth it is interned in a ValuePool by a hash of its contents (see ObjectStore.dictionary), and every object
+with the same value shares the one copy.
+
+ObjectStore dictionaries are never edited in place - editing an object replaces its dictionary - so sharing values between them is safe. Editing one object gives
+it new values and leaves the others as they were, i.e. copy-on-write. The user's objects are built from copy-on-write views of the values (see scigui.views), and
+shared arrays are given to them read-only, so an object that changes its inputs can't change anyone else's.
+
+Checking whether a value is worth sharing has to be cheap, since it's done for every object that's made or loaded, so lists and dictionaries are only encoded
+(and hashed) once a rough count of their size shows they're big enough (see may_be_shared()).
+
+When a JSON workspace is saved, each value that is shared by more than one object is saved once, in the "Shared" section of the file ({hash : value}), and the
+objects refer to it as {"\\SHARED\\": hash}. The section is written before the objects (see scigui.workspace), so the objects can be converted as soon as they've
+been read. Journals and databases save objects in full, but a database converted from a JSON workspace keeps its "Shared" section, which is read the same way.
+"""
+
+import hashlib
+import itertools
+import json
+import threading
+
+from scigui.payloads import array_to_json_form, inputs_to_json_form
+from scigui.views import make_view
+from scigui.workspace import WorkspaceEncoder
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+SHARE_MIN_BYTES = 1024                  # Values smaller than this (as JSON) aren't worth sharing, since each value in the pool costs a few hundred bytes itself
+
+
+def is_shared_form(value):
+    """Check whether a value read from a .sgui file refers to a value in its "Shared" section.
+
+    Args:
+        value: The value.
+
+    Returns:
+        bool: True if it's a reference to a shared value.
+    """
+    return isinstance(value, dict) and len(value) == 1 and "\\SHARED\\" in value
+
+def value_default(value):
+    # For encoding values as JSON in the same form they're saved in
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return array_to_json_form(value)
+
+    if hasattr(value, "to_json_form"):
+        return value.to_json_form()
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_value(value):
+    """Encode a value as JSON, the same way it's saved in a .sgui file.
+
+    Args:
+        value: The value.
+
+    Returns:
+        str: The JSON, or None if the value can't be encoded (it isn't shared in that case).
+    """
+    try:
+        return json.dumps(value, default = value_default)
+    except (TypeError, ValueError):
+        return None
+
+def estimate_size(value, limit):
+    """Roughly count how big a value is as JSON, without encoding it. The count is never much more than the real size, and stops once it reaches the limit, so
+    big values aren't looked at all the way through.
+
+    Args:
+        value: The value.
+        limit (int): The size to stop at, in bytes.
+
+    Returns:
+        int: The rough size. Once it reaches the limit, the rest of the value isn't counted.
+    """
+    size = 0
+    stack = [value]
+
+    while len(stack) > 0 and size < limit:
+        value = stack.pop()
+
+        if isinstance(value, str):
+            size += len(value) + 2
+
+        elif isinstance(value, (list, tuple)):
+            # Every item is at least one character, plus a comma, so only the first few can matter
+            size += 2 + len(value)
+            stack.extend(itertools.islice(value, limit))
+
+        elif isinstance(value, dict):
+            size += 2 + 4 * len(value)
+            stack.extend(itertools.islice(value.keys(), limit))
+            stack.extend(itertools.islice(value.values(), limit))
+
+        elif isinstance(value, (int, float)):
+            size += len(repr(value))
+
+        elif numpy is not None and isinstance(value, numpy.ndarray):
+            size += value.nbytes
+
+        else:
+            # None and anything else are at least one character
+            size += 1
+
+    return size
+
+def may_be_shared(value):
+    # Cheap check for values that are too small to share, without encoding them
+    if isinstance(value, str):
+        return len(value) >= SHARE_MIN_BYTES
+
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return value.nbytes >= SHARE_MIN_BYTES // 2
+
+    if isinstance(value, (list, tuple, dict)):
+        return estimate_size(value, SHARE_MIN_BYTES) >= SHARE_MIN_BYTES
+
+    return False
+
+
+class ValuePool:
+    def __init__(self):
+        """The shared input values of the objects in the open workspace, keyed by a hash of their contents."""
+        self.lock = threading.Lock()            # Objects are made by functions on other threads as well
+        self.values = {}                        # {hash : value}
+        self.hashes = {}                        # {id(value) : hash} for every value in self.values, which keeps them alive so the IDs can't be reused
+        self.sizes = {}                         # {hash : size of the value as JSON, in bytes}
+
+    def add(self, value_hash, value, size):
+        """Add a value whose hash is already known, e.g. one read from the "Shared" section of a file.
+
+        Args:
+            value_hash (str): The hash.
+            value: The value.
+            size (int): The size of the value as JSON.
+
+        Returns:
+            The value to use, which is the one already in the pool if there is one.
+        """
+        with self.lock:
+            existing = self.values.get(value_hash)
+
+            if existing is not None:
+                return existing
+
+            self.values[value_hash] = value
+            self.hashes[id(value)] = value_hash
+            self.sizes[value_hash] = size
+            return value
+
+    def intern(self, value):
+        """Get the shared copy of a value, adding it to the pool if nothing has the same contents yet.
+
+        Args:
+            value: The value.
+
+        Returns:
+            The shared copy, or the value itself if it's too small to share.
+        """
+        if id(value) in self.hashes or not may_be_shared(value):
+            return value
+
+        encoded = encode_value(value)
+
+        if encoded is None or len(encoded) < SHARE_MIN_BYTES:
+            return value
+
+        # Include the type, so e.g. a tuple isn't replaced by a list with the same contents
+        value_hash = hashlib.sha1((type(value).__name__ + ":" + encoded).encode()).hexdigest()
+
+        return self.add(value_hash, value, len(encoded))
+
+    def intern_dictionary(self, dictionary):
+        """Share the inputs of an object's dictionary with any other objects that have the same ones.
+
+        Args:
+            dictionary (dict): The ObjectStore's dictionary.
+
+        Returns:
+            dict: A new dictionary, with the shared copy of each input.
+        """
+        if dictionary is None or "\\INPUTS\\" not in dictionary:
+            return dictionary
+
+        dictionary = dictionary.copy()
+        dictionary["\\INPUTS\\"] = {key : self.intern(value) for key, value in dictionary["\\INPUTS\\"].items()}
+
+        return dictionary
+
+    def hash_of(self, value):
+        return self.hashes.get(id(value))
+
+    def read_only(self, key, value):
+        """Get an input value in a form that can't be changed in place, for building the user's object from it. Lists and dictionaries are given as copy-on-write
+        views (see scigui.views), and arrays in the pool as read-only views of the same data.
+
+        Args:
+            key (str): The input key.
+            value: The value.
+
+        Returns:
+            The read-only form, or the value itself if it's fine as it is (e.g. a string).
+        """
+        if numpy is not None and isinstance(value, numpy.ndarray):
+            if self.hash_of(value) is None:
+                return value
+
+            view = value.view()
+            view.flags.writeable = False
+            return view
+
+        return make_view(key, value)
+
+    def count_references(self, objects):
+        """Count how many objects use each value in the pool.
+
+        Args:
+            objects (dict): The objects, e.g. Application.active_objects.
+
+        Returns:
+            dict: {hash : number of objects}.
+        """
+        counts = {}
+
+        for value in objects.values():
+            if isinstance(value, dict):
+                for value_hash, count in self.count_references(value).items():
+                    counts[value_hash] = counts.get(value_hash, 0) + count
+
+            # Objects from a database that haven't been read yet can't be using anything in the pool
+            elif hasattr(value, "dictionary_loaded") and value.dictionary_loaded():
+                for input_value in value.dictionary.get("\\INPUTS\\", {}).values():
+                    value_hash = self.hashes.get(id(input_value))
+
+                    if value_hash is not None:
+                        counts[value_hash] = counts.get(value_hash, 0) + 1
+
+        return counts
+
+    def shared_values(self, objects):
+        """Get the values that more than one object uses, which are saved in the "Shared" section.
+
+        Args:
+            objects (dict): The objects, e.g. Application.active_objects.
+
+        Returns:
+            dict: {hash : value}.
+        """
+        return {value_hash : self.values[value_hash] for value_hash, count in self.count_references(objects).items() if count > 1}
+
+    def collect(self, objects):
+        """Remove every value that the objects don't use any more, e.g. after objects have been deleted or replaced.
+
+        Args:
+            objects (dict): The objects, e.g. Application.active_objects.
+        """
+        counts = self.count_references(objects)
+
+        with self.lock:
+            for value_hash in [value_hash for value_hash in self.values if value_hash not in counts]:
+                del self.hashes[id(self.values.pop(value_hash))]
+                del self.sizes[value_hash]
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+            self.hashes.clear()
+            self.sizes.clear()
+
+    def statistics(self, objects):
+        """Get how much sharing values saves, for the objects in the workspace.
+
+        Args:
+            objects (dict): The objects, e.g. Application.active_objects.
+
+        Returns:
+            dict: The statistics. The ratio is the number of values the objects use for every one that's actually kept.
+        """
+        counts = self.count_references(objects)
+        references = sum(counts.values())
+        kept_bytes = sum(self.sizes[value_hash] for value_hash in counts)
+        total_bytes = sum(self.sizes[value_hash] * count for value_hash, count in counts.items())
+
+        return {"Values used" : references,
+                "Values kept" : len(counts),
+                "Dedup ratio" : references / len(counts) if len(counts) > 0 else 1.0,
+                "Bytes used" : total_bytes,
+                "Bytes saved" : total_bytes - kept_bytes,
+                "Pool entries" : len(self.values)}
+
+
+class SharedSection:
+    def __init__(self, pool, convert, section = None):
+        """The "Shared" section of a file that's being loaded, whose values are converted and added to the pool the first time an object refers to them.
+
+        Args:
+            pool (ValuePool): The pool to add them to.
+            convert (callable): Called with the JSON form of each value, and returns the value, e.g. with any payload references converted.
+            section (dict, optional): The section, as {hash : JSON form}. Defaults to None, for a file without one (or one that hasn't been read yet).
+        """
+        self.pool = pool
+        self.convert = convert
+        self.section = {}
+        self.converted = {}             # {hash : value} of the values that have been converted
+
+        if section is not None:
+            self.update(section)
+
+    def update(self, section):
+        self.section.update(section)
+
+    def get(self, value_hash):
+        if value_hash not in self.converted:
+            json_form = self.section[value_hash]
+            self.converted[value_hash] = self.pool.add(value_hash, self.convert(json_form), len(json.dumps(json_form)))
+
+        return self.converted[value_hash]
+
+    def resolve(self, inputs):
+        """Replace each reference to a shared value in an object's inputs with the value itself.
+
+        Args:
+            inputs (dict): The "\\INPUTS\\" dictionary.
+
+        Raises:
+            ValueError: If the value isn't in the section.
+
+        Returns:
+            dict: A new dictionary, with the shared values in place of their references.
+        """
+        resolved = {}
+
+        for key, value in inputs.items():
+            if is_shared_form(value):
+                value_hash = value["\\SHARED\\"]
+
+                try:
+                    value = self.get(value_hash)
+                except KeyError:
+                    raise ValueError(f"Input '{key}' refers to shared value {value_hash}, which isn't in the file.")
+
+            resolved[key] = value
+
+        return resolved
+
+
+class SharingEncoder(WorkspaceEncoder):
+    def __init__(self, pool, shared, **kwargs):
+        """Encodes objects with references to the values in the "Shared" section, in place of the values themselves.
+
+        Args:
+            pool (ValuePool): The pool the values are in.
+            shared (dict): The values in the "Shared" section, as {hash : value}.
+        """
+        super().__init__(**kwargs)
+        self.pool = pool
+        self.shared = shared
+
+    def default(self, o):
+        json_form = super().default(o)
+
+        if isinstance(json_form, dict) and "\\OBJECT_INDEX\\" in json_form and "\\INPUTS\\" in json_form:
+            inputs = dict(json_form["\\INPUTS\\"])
+
+            for key, value in o.dictionary["\\INPUTS\\"].items():
+                value_hash = self.pool.hash_of(value)
+
+                if value_hash in self.shared:
+                    inputs[key] = {"\\SHARED\\" : value_hash}
+
+            json_form["\\INPUTS\\"] = inputs
+
+        return json_form
+
+
+def section_to_json_form(shared):
+    """Get the JSON form of the "Shared" section, for saving.
+
+    Args:
+        shared (dict): The shared values, as {hash : value}.
+
+    Returns:
+        dict: The section.
+    """
+    return inputs_to_json_form(shared)
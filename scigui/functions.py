@@ -6,6 +6,15 @@ outputs() - This is a list of outputs and the object type that is output. Otherw
 execute(dictionary) - this will receive a dictionary containing keys corresponding to 'inputs', and should return a dictionary with keys corresponding to each 'output' (except a file output, 
                       which isn't needed). Each value in the dictionary should be a subdictionary, that can submitted to the corresponding object to create it.
 
+Optionally, it can also have:
+
+execution() - Returns "inline", "thread" or "process", to choose how execute() is run (see scigui.backends). Defaults to "inline". Use "process" for CPU-heavy pure-Python code,
+              which needs the script that runs the Application to be guarded by 'if __name__ == "__main__":'.
+cache_results() - Returns True if the results can be cached (see scigui.cache), i.e. the function always gives the same outputs for the same inputs. Defaults to False.
+
+List and dictionary inputs are given to execute() as copy-on-write views (see scigui.views), which are lists and dictionaries that can be changed without changing
+the stored inputs.
+
 """
 
 import scigui
@@ -0,0 +1,86 @@
+"""
+Running .sgui workspaces without a display, e.g. on batch nodes. HeadlessApplication behaves like Application, but never creates a Tk window. Popups are written to
+stderr, and plots made with get_axes() are saved as image files.
+"""
+
+import os
+import re
+import sys
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from scigui.main import Application
+
+
+class HeadlessApplication(Application):
+    def __init__(self, objects, functions, max_workers = None, figures_directory = None):
+        """An Application without a GUI.
+
+        Args:
+            objects (list): The object classes, in the same order as used to make the workspace.
+            functions (list): The function classes, in the same order as used to make the workspace.
+            max_workers (int, optional): Maximum number of functions to run at the same time. Defaults to None, which uses the concurrent.futures default.
+            figures_directory (str, optional): Folder to save plots to. Defaults to None, which uses the current working directory.
+        """
+        self.initialise_data(objects, functions, max_workers)
+        self.autosave = False           # The workspace is saved once everything has run, and --output must leave the original as it is
+        self.root = None
+        self.figures_directory = figures_directory if figures_directory is not None else os.getcwd()
+        self.figures = []               # Figures made by the functions that are running, which are saved once each function finishes
+        self.num_figures_saved = 0
+
+    def call_in_main_thread(self, function, *args, wait = True, **kwargs):
+        # There's no Tk, so everything can be run from whichever thread asks
+        return function(*args, **kwargs)
+
+    def set_status(self, text, progress = None, total = None):
+        pass
+
+    def queue_tree_event(self, event, iid, new_iid = None):
+        pass
+
+    def refresh_objects_tree(self):
+        pass
+
+    def popup(self, title_text, body_text):
+        print(f"{title_text}: {body_text}", file = sys.stderr)
+
+    def get_axes(self, title = "Plot", three_d = False):
+        """Make a new plot, which will be saved as a .png once the function has finished.
+
+        Args:
+            title (str, optional): The plot title, which is also used in the file name. Defaults to "Plot".
+            three_d (bool, optional): Whether to make 3D axes. Defaults to False.
+
+        Returns:
+            matplotlib.axes.Axes: The axes to plot on.
+        """
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        figure.suptitle(title)
+
+        if three_d:
+            axes = figure.add_subplot(projection = '3d')
+        else:
+            axes = figure.add_subplot()
+
+        with self.objects_lock:
+            self.figures.append((title, figure))
+
+        return axes
+
+    def draw_figures(self):
+        """Save any plots that have been made to the figures directory."""
+        with self.objects_lock:
+            figures = self.figures
+            self.figures = []
+
+        for title, figure in figures:
+            self.num_figures_saved += 1
+            safe_title = re.sub(r"[^\w\-]+", "_", title).strip("_")
+            filename = os.path.join(self.figures_directory, f"figure_{self.num_figures_saved:03d}_{safe_title}.png")
+
+            os.makedirs(self.figures_directory, exist_ok = True)
+            figure.savefig(filename)
+            print(f"Saved plot '{title}' to {filename}")
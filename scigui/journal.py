@@ -0,0 +1,372 @@
+"""
+Autosaving JSON workspaces. Whilst a JSON .sgui file is open, every change to its objects and functions is appended to a journal next to it (filename + ".journal"),
+one line of JSON per change, which is much quicker than saving the whole workspace. If the program stops without the workspace being saved, the changes in the
+journal are replayed the next time it's opened (see read_journal() and apply_record()).
+
+Each change has a sequence number, and the .sgui file records the last one it includes (in its "Journal" section), so a change is never replayed twice. Once the
+journal gets long, it's compacted in the background: the journal is moved to filename + ".journal.old", replayed onto a copy of the workspace that's kept as
+filename + ".autosave", and deleted. Changes made whilst that's happening go in a new journal. The .sgui file itself is only ever written when the user saves,
+so throwing away the changes (see delete_journal()) always leaves it as it was last saved. When the workspace is opened, the autosave (if there is one) is read
+instead of the .sgui file, and the journal is replayed onto that (see get_recovery_filename()).
+
+The changes are:
+    {"Event": "set", "IID": iid, "Item": JSON form}     An object or folder was added or replaced. An IID of "" replaces all the objects.
+    {"Event": "remove", "IID": iid}                     An object or folder was removed
+    {"Event": "move", "IID": iid, "New IID": new_iid, "Position": position}
+                                                        An object or folder was moved or renamed, to a position in its new folder
+    {"Event": "reorder", "IID": iid, "Keys": keys}      The items in a folder were put in a different order
+    {"Event": "functions", "Functions": functions}      The functions were added, edited, deleted or reordered, so they are all saved together
+    {"Event": "function", "Key": key, "Function": JSON form}
+                                                        One function was changed without changing the others, e.g. by running it
+"""
+
+import json
+import os
+import threading
+import traceback
+
+from scigui.workspace import WorkspaceEncoder, read_workspace, write_workspace
+
+
+COMPACT_RECORDS = 1000                  # Compact the journal once it has this many changes in it...
+COMPACT_BYTES = 64 * 1024**2            # ...or once it's this big
+
+
+def journal_filenames(filename):
+    # The journal being compacted (if there is one) comes first, since it has the older changes
+    return filename + ".journal.old", filename + ".journal"
+
+def get_autosave_filename(filename):
+    return filename + ".autosave"
+
+def get_recovery_filename(filename):
+    """Get the file to read a workspace from, so that any changes that were compacted but not saved are recovered.
+
+    Args:
+        filename (str): The .sgui file.
+
+    Returns:
+        str: The autosave, if there is one that's newer than the .sgui file, or else the .sgui file.
+    """
+    autosave_filename = get_autosave_filename(filename)
+
+    # An autosave that's older than the file was left behind by something that saved the file without scigui, so the file is newer
+    if os.path.exists(autosave_filename) and (not os.path.exists(filename) or os.path.getmtime(autosave_filename) >= os.path.getmtime(filename)):
+        return autosave_filename
+
+    return filename
+
+def get_sequence(sections):
+    """Get the sequence number of the last change that a workspace file includes.
+
+    Args:
+        sections (dict): The other sections in the file, as returned by read_workspace().
+
+    Returns:
+        int: The sequence number, or 0 if the file has never had a journal.
+    """
+    return sections.get("Journal", {}).get("Sequence", 0)
+
+def delete_journal(filename):
+    """Delete a workspace's journal and autosave, e.g. once the workspace has been saved without one, or to throw away the changes in them.
+
+    Args:
+        filename (str): The .sgui file.
+    """
+    for journal_filename in journal_filenames(filename) + (get_autosave_filename(filename),):
+        if os.path.exists(journal_filename):
+            os.remove(journal_filename)
+
+def read_journal(filename, sequence = 0):
+    """Read the changes in a workspace's journal that aren't in the workspace file yet.
+
+    Args:
+        filename (str): The .sgui file.
+        sequence (int, optional): The sequence number of the last change the .sgui file includes (see get_sequence()). Defaults to 0.
+
+    Yields:
+        dict: Each change, in order.
+    """
+    for journal_filename in journal_filenames(filename):
+        for record in read_journal_file(journal_filename, sequence):
+            sequence = record["Sequence"]
+            yield record
+
+def read_journal_file(journal_filename, sequence = 0):
+    # A compaction that was stopped part way through can leave the same change in the journal twice, so only changes newer than the last one are read
+    if not os.path.exists(journal_filename):
+        return
+
+    with open(journal_filename, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+
+            except json.JSONDecodeError:
+                # The last line can be cut short if the program stopped whilst writing it
+                break
+
+            if record["Sequence"] > sequence:
+                sequence = record["Sequence"]
+                yield record
+
+def repair_journal_file(journal_filename):
+    # Remove a line that was cut short, so the next change isn't added onto the end of it
+    if not os.path.exists(journal_filename):
+        return
+
+    with open(journal_filename, "rb+") as f:
+        data = f.read()
+
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+def find_folder(objects, iid, create = False):
+    # Works on ObjectTrees, and on the plain nested dictionaries read when compacting
+    folder = objects
+
+    for key in iid.split("\\")[1:] if iid != "" else []:
+        if key not in folder and create:
+            folder[key] = {}
+
+        folder = folder[key]
+
+    return folder
+
+def convert_item(item, convert):
+    # Convert the JSON form of an object, or a folder of them
+    if isinstance(item, dict) and not any(key.startswith("\\") for key in item):
+        return {key : convert_item(value, convert) for key, value in item.items()}
+
+    return convert(item)
+
+def reorder_folder(folder, keys):
+    if hasattr(folder, "reorder"):
+        folder.reorder(keys)
+        return
+
+    items = [(key, folder.pop(key)) for key in keys]
+    folder.update(items)
+
+def apply_record(objects, functions, record, convert):
+    """Replay one change from a journal.
+
+    Args:
+        objects (dict): The objects, e.g. an ObjectTree, or the nested dictionaries from a .sgui file.
+        functions (dict): The functions.
+        record (dict): The change.
+        convert (callable): Called with the JSON form of each object or function, and returns what to add to objects or functions.
+    """
+    event = record["Event"]
+
+    if event == "set":
+        parent_iid, _, key = record["IID"].rpartition("\\")
+
+        if record["IID"] == "":
+            objects.clear()
+            objects.update(convert_item(record["Item"], convert))
+        else:
+            find_folder(objects, parent_iid, create = True)[key] = convert_item(record["Item"], convert)
+
+    elif event == "remove":
+        parent_iid, _, key = record["IID"].rpartition("\\")
+        find_folder(objects, parent_iid).pop(key, None)
+
+    elif event == "move":
+        old_parent_iid, _, old_key = record["IID"].rpartition("\\")
+        new_parent_iid, _, new_key = record["New IID"].rpartition("\\")
+        new_parent = find_folder(objects, new_parent_iid)
+
+        new_parent[new_key] = find_folder(objects, old_parent_iid).pop(old_key)
+        keys = [key for key in new_parent.keys() if key != new_key]
+        keys.insert(record["Position"], new_key)
+        reorder_folder(new_parent, keys)
+
+    elif event == "reorder":
+        reorder_folder(find_folder(objects, record["IID"]), record["Keys"])
+
+    elif event == "functions":
+        functions.clear()
+        functions.update({name : convert(function) for name, function in record["Functions"].items()})
+
+    elif event == "function":
+        # Replacing a function that's already there keeps its position
+        functions[record["Key"]] = convert(record["Function"])
+
+
+class Journal:
+    def __init__(self, filename, sequence = 0):
+        """The journal of changes made to a JSON workspace since it was last saved. The journal file is made if it doesn't exist, and added to if it does.
+
+        Args:
+            filename (str): The .sgui file.
+            sequence (int, optional): The sequence number of the last change that has been made, including any that were replayed from the journal. Defaults to 0.
+        """
+        self.filename = filename
+        self.old_filename, self.journal_filename = journal_filenames(filename)
+        self.autosave_filename = get_autosave_filename(filename)
+        self.sequence = sequence
+        self.encoder = WorkspaceEncoder()
+        self.tree = None                        # The ObjectTree whose changes are being recorded
+        self.lock = threading.RLock()           # Held whilst writing to the journal, since changes can be made by functions running on other threads
+        self.compact_lock = threading.Lock()    # Held whilst the .sgui file is being written
+        self.compact_thread = None
+
+        for journal_filename in journal_filenames(filename):
+            repair_journal_file(journal_filename)
+
+        self.file = open(self.journal_filename, "a")
+        self.num_records = sum(1 for _ in read_journal(filename, 0))
+
+    def attach(self, tree, write = False):
+        """Record every change made to an ObjectTree from now on.
+
+        Args:
+            tree (ObjectTree): The tree.
+            write (bool, optional): Whether to record the whole tree first, e.g. when it replaces the workspace's objects. Defaults to False.
+        """
+        self.detach()
+        self.tree = tree
+        self.tree.add_listener(self.on_objects_event)
+
+        if write:
+            self.append({"Event": "set", "IID": "", "Item": tree})
+
+    def detach(self):
+        if self.tree is not None:
+            self.tree.remove_listener(self.on_objects_event)
+            self.tree = None
+
+    def on_objects_event(self, event, iid, new_iid = None):
+        # Called by the tree straight after it changes (see scigui.tree), on whichever thread changed it
+        if event in ("add", "replace"):
+            self.append({"Event": "set", "IID": iid, "Item": self.tree.find(iid)})
+
+        elif event == "remove":
+            self.append({"Event": "remove", "IID": iid})
+
+        elif event == "move":
+            new_parent_iid, _, new_key = new_iid.rpartition("\\")
+            position = list(self.tree.find(new_parent_iid).keys()).index(new_key)
+            self.append({"Event": "move", "IID": iid, "New IID": new_iid, "Position": position})
+
+        elif event == "reorder":
+            self.append({"Event": "reorder", "IID": iid, "Keys": list(self.tree.find(iid).keys())})
+
+    def write_functions(self, functions):
+        self.append({"Event": "functions", "Functions": functions})
+
+    def write_function(self, key, function):
+        self.append({"Event": "function", "Key": key, "Function": function})
+
+    def append(self, record):
+        """Add a change to the end of the journal. It's flushed straight away, so it's kept even if the program crashes.
+
+        Args:
+            record (dict): The change. Objects and functions in it are saved in their JSON form.
+        """
+        with self.lock:
+            self.sequence += 1
+            record["Sequence"] = self.sequence
+            self.file.write(self.encoder.encode(record) + "\n")
+            self.file.flush()
+            self.num_records += 1
+
+            if self.num_records >= COMPACT_RECORDS or self.file.tell() >= COMPACT_BYTES:
+                self.compact_in_background()
+
+    def clear(self):
+        # Empty the journal, once everything in it (and the autosave) is in the .sgui file. This must be called whilst holding self.lock.
+        self.file.truncate(0)
+        self.file.seek(0)
+        self.num_records = 0
+
+        for filename in [self.old_filename, self.autosave_filename]:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def save(self, write):
+        """Save the whole workspace, which empties the journal.
+
+        Args:
+            write (callable): Called as write(sections) to save the workspace, where sections are the extra sections to put in the .sgui file (see
+                              scigui.workspace.write_workspace()).
+        """
+        with self.compact_lock, self.lock:
+            write({"Journal" : {"Sequence" : self.sequence}})
+            self.clear()
+
+    def compact(self):
+        """Replay the journal onto the autosave (or onto a copy of the .sgui file, if there isn't one yet), without touching the workspace that's open or the
+        .sgui file. This reads and writes the whole workspace, so it's usually done in the background (see compact_in_background())."""
+        with self.compact_lock:
+            # Move the changes so far out of the way, so any more can carry on being added whilst this is running
+            with self.lock:
+                if self.num_records == 0 and not os.path.exists(self.old_filename):
+                    return
+
+                self.file.close()
+
+                if os.path.exists(self.old_filename):
+                    # A compaction that failed left some changes behind, which go first
+                    with open(self.old_filename, "a") as old_file, open(self.journal_filename, "r") as f:
+                        old_file.write(f.read())
+
+                    os.remove(self.journal_filename)
+                else:
+                    os.replace(self.journal_filename, self.old_filename)
+
+                self.file = open(self.journal_filename, "a")
+                self.num_records = 0
+
+            # Replay them onto the JSON forms from the autosave, or the .sgui file if this is the first time
+            objects = {}
+            functions = {}
+            sections = read_workspace(get_recovery_filename(self.filename), objects = objects, functions = functions, convert = lambda json_form : json_form)
+            sequence = get_sequence(sections)
+
+            for record in read_journal_file(self.old_filename, sequence):
+                apply_record(objects, functions, record, convert = lambda json_form : json_form)
+                sequence = record["Sequence"]
+
+            sections["Journal"] = {"Sequence" : sequence}
+            write_workspace(self.autosave_filename, objects = objects, functions = functions, sections = sections)
+            os.remove(self.old_filename)
+
+    def compact_in_background(self):
+        with self.lock:
+            if self.compact_thread is not None and self.compact_thread.is_alive():
+                return
+
+            self.compact_thread = threading.Thread(target = self.compact_and_report, name = "Journal compaction", daemon = True)
+            self.compact_thread.start()
+
+    def compact_and_report(self):
+        try:
+            self.compact()
+
+        except Exception:
+            # The changes are still in the journal, so nothing is lost, and they'll be compacted next time
+            print(f"Could not autosave {self.filename}:")
+            traceback.print_exc()
+
+    def close(self, compact = True):
+        """Stop recording changes.
+
+        Args:
+            compact (bool, optional): Whether to put any changes that are still in the journal into the autosave first, and delete the journal. The changes are
+                                      recovered the next time the workspace is opened. Defaults to True.
+        """
+        self.detach()
+
+        if self.compact_thread is not None:
+            self.compact_thread.join()
+
+        if compact:
+            self.compact()
+
+        with self.lock:
+            self.file.close()
+
+            if compact and os.path.exists(self.journal_filename) and os.path.getsize(self.journal_filename) == 0:
+                os.remove(self.journal_filename)
@@ -7,7 +7,14 @@ import json
 import sys
 import time 
 import itertools 
-import copy
+import threading
+import hashlib
+import queue
+import collections
+import tempfile
+import ast
+import pstats
+import numpy
 
 # For matplotlib with tkinter
 import matplotlib
@@ -16,6 +23,20 @@ from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg, NavigationToolbar2Tk)
 from mpl_toolkits import mplot3d
 
+from scigui.scheduler import FunctionGraph, SchedulingError, RunCancelled, run_graph
+from scigui.backends import ExecutionBackends, get_execution_mode
+from scigui.cache import ResultCache, InstanceCache, get_cache_results, get_cache_instance
+from scigui.views import make_view, materialise
+from scigui.tree import ObjectTree
+from scigui.workspace import read_workspace, write_workspace
+from scigui.database import WorkspaceDatabase, is_database, write_database
+from scigui.journal import Journal, apply_record, delete_journal, get_recovery_filename, get_sequence, read_journal
+from scigui.payloads import PayloadReference, PayloadStore, describe_array, inputs_to_json_form
+from scigui.dedup import SharedSection, SharingEncoder, ValuePool, section_to_json_form
+from scigui.telemetry import STAGES, RunHistory, format_bytes, format_seconds, set_memory_tracking
+from scigui.profiling import ORIGINS, Profiler, get_hotspots, get_origin_totals, get_profile_filename
+from scigui.stalls import StallMonitor
+
 
 # Functions for manipulating the 'active objects' and 'active functions' databases
 def get_object(active_objects, iid):
@@ -28,6 +49,10 @@ def get_object(active_objects, iid):
     Returns:
         dict or ObjectStore: The item stored at the given directory. It should reference the actual original item, so editing this result will edit the original.
     """
+    # Use the flat index if there is one
+    if isinstance(active_objects, ObjectTree):
+        return active_objects.find(iid)
+
     key_list = iid.split("\\")
     key_list.pop(0)                                 # Index 0 is always just an empty string ('')
 
@@ -46,6 +71,10 @@ def set_object(database, iid, to_add):
         iid (_type_): _description_
         to_add (_type_): thing to add
     """
+    if isinstance(database, ObjectTree):
+        database.set_item(iid, to_add)
+        return
+
     # Will either create a new set of subdictionaries to get to the desired iid, or will replace an existing object if there is one there
     key_list = iid.split("\\")
     key_list.pop(0)                                 # Index 0 is always just an empty string ('')
@@ -86,7 +115,114 @@ def move_object_in_dict(active_objects, old_iid, new_iid):
         old_iid (str): The IID of the original object that will be moved
         new_iid (str): The IID that you want the original object to have after being moved.
     """
-    raise ValueError("Not yet implemented")
+    if isinstance(active_objects, ObjectTree):
+        active_objects.move(old_iid, new_iid)
+        return
+
+    if get_object(active_objects, new_iid.rpartition("\\")[0]).get(new_iid.split("\\")[-1]) is not None:
+        raise ValueError(f"Cannot move '{old_iid}' to '{new_iid}', as there is already an item there.")
+
+    old_parent = get_object(active_objects, old_iid.rpartition("\\")[0])
+    item = old_parent.pop(old_iid.split("\\")[-1])
+    set_object(active_objects, new_iid, item)
+
+def get_linked_iids(datatypes, inputs):
+    """Find the IIDs of every object that a set of inputs links to.
+
+    Args:
+        datatypes (dict): Dictionary of {input key : datatype}, with any functional datatypes already evaluated.
+        inputs (dict): The user's inputs, i.e. a "\\INPUTS\\" dictionary.
+
+    Returns:
+        list: The IIDs linked to, in the order they appear in the inputs.
+    """
+    iids = []
+
+    for key, datatype in datatypes.items():
+        value = inputs.get(key)
+
+        if isinstance(datatype, list):
+            if datatype[0] == "object" and isinstance(value, list):
+                iids += [item for item in value if isinstance(item, str) and "\\" in item]
+
+        elif datatype == "object" or datatype == "raw":
+            # Raw inputs are only links if they're a reference to a String object - check this by looking for '\\' in the user's input
+            if isinstance(value, str) and "\\" in value:
+                iids.append(value)
+
+    return iids
+
+def get_file_paths(datatypes, inputs):
+    """Find every file path given in a set of inputs.
+
+    Args:
+        datatypes (dict): Dictionary of {input key : datatype}, with any functional datatypes already evaluated.
+        inputs (dict): The user's inputs, i.e. a "\\INPUTS\\" dictionary.
+
+    Returns:
+        list: The file paths.
+    """
+    paths = []
+
+    for key, datatype in datatypes.items():
+        value = inputs.get(key)
+
+        if datatype == ["file"] and isinstance(value, list):
+            paths += [item for item in value if isinstance(item, str) and item != ""]
+
+        elif datatype == "file" and isinstance(value, str) and value != "":
+            paths.append(value)
+
+    return paths
+
+def get_hash(data):
+    """Get a hash of some JSON-like data, which will be the same every time the program is run (unlike hash()).
+
+    Args:
+        data: The data to hash. Anything that can't be converted to JSON is hashed using its repr(), apart from numpy arrays, whose contents are hashed.
+
+    Returns:
+        str: The hash, as a hexadecimal string.
+    """
+    return hashlib.sha1(json.dumps(data, sort_keys = True, default = hash_default).encode()).hexdigest()
+
+def hash_default(value):
+    # The repr() of a large numpy array leaves most of it out, so its contents are hashed instead
+    if isinstance(value, numpy.ndarray):
+        return [str(value.dtype), value.shape, hashlib.sha1(numpy.ascontiguousarray(value).tobytes()).hexdigest()]
+
+    return repr(value)
+
+def get_linked_iids_recursive(active_objects, iids):
+    """Follow object links to find every object that a list of objects depends on, including the objects themselves.
+
+    Args:
+        active_objects (dict): Active objects dictionary
+        iids (list): The IIDs to start from.
+
+    Returns:
+        set: The IIDs of every object reached. IIDs that don't exist yet (e.g. because they will be made by a function) are still included.
+    """
+    found = set()
+    to_check = list(iids)
+
+    while to_check:
+        iid = to_check.pop()
+
+        if iid in found:
+            continue
+
+        found.add(iid)
+
+        try:
+            item = get_object(active_objects, iid)
+        except (KeyError, TypeError):
+            continue
+
+        if isinstance(item, ObjectStore):
+            to_check += item.links()
+
+    return found
 
 def get_function(active_functions, iid):
     return active_functions[iid.split("\\")[-1]]
@@ -102,35 +238,284 @@ def set_function(database, iid, to_add):
     database[iid.split("\\")[-1]] = to_add
 
 
+# Functions for parameter sweeps
+def parse_sweep_values(text):
+    """Convert the text a user typed for a sweep into a list of values. This can be a comma separated list (e.g. "1, 2, 5"), or a range in the form 
+    start:stop:step (e.g. "0:1:0.25"), which includes the stop value. The step defaults to 1 if only start:stop is given.
+
+    Args:
+        text (str): The text to convert.
+
+    Returns:
+        list: The values, as strings (the same as any other 'raw' input).
+    """
+    text = text.strip()
+
+    if text == "":
+        return []
+
+    if ":" in text and "," not in text:
+        parts = text.split(":")
+
+        if len(parts) not in [2, 3]:
+            raise ValueError(f"Ranges must be in the form start:stop:step, but got '{text}'.")
+
+        try:
+            numbers = [float(part) for part in parts]
+        except ValueError:
+            raise ValueError(f"Ranges must be in the form start:stop:step, using numbers, but got '{text}'.")
+
+        start, stop = numbers[0], numbers[1]
+        step = numbers[2] if len(numbers) == 3 else 1.0
+
+        if step == 0 or (stop - start) / step < 0:
+            raise ValueError(f"The step in '{text}' never reaches the stop value.")
+
+        # Use integers if the range only contains integers, so e.g. 1:3 gives '1', '2', '3' rather than '1.0', '2.0', '3.0'
+        use_ints = all(float(number).is_integer() for number in numbers)
+        num_steps = int(round((stop - start) / step, 9)) + 1
+        values = []
+
+        for i in range(num_steps):
+            value = start + i * step
+            values.append(str(int(round(value))) if use_ints else f"{value:.10g}")
+
+        return values
+
+    return [value.strip() for value in text.split(",")]
+
+def get_sweep_inputs(values, mode = "product"):
+    """Get the set of inputs to use for each run of a sweep.
+
+    Args:
+        values (dict): Dictionary of {input key : list of values to use for that input}.
+        mode (str, optional): "product" to run every combination of the values, or "zip" to use the first value of each list together, then the second, etc. Defaults to "product".
+
+    Returns:
+        list: List of dictionaries of {input key : value}, one for each run.
+    """
+    keys = list(values.keys())
+
+    if mode == "product":
+        combinations = itertools.product(*[values[key] for key in keys])
+
+    elif mode == "zip":
+        lengths = set(len(values[key]) for key in keys)
+
+        if len(lengths) > 1:
+            raise ValueError("All inputs must have the same number of values to zip them together.")
+
+        combinations = zip(*[values[key] for key in keys])
+
+    else:
+        raise ValueError(f"Sweep mode must be 'product' or 'zip', not '{mode}'")
+
+    return [dict(zip(keys, combination)) for combination in combinations]
+
+
 # Functions related to Treeviews
-def fill_objects_tree(treeview, dictionary, object_image, folder_image):
-    # Note - this function does not check if there is an item in the Tree that needs to be removed (e.g. because they're absent in the dictionary).
+OBJECTS_TREE_PAGE_SIZE = 1000           # Most items from one folder that are added to an objects Treeview at once. The rest are added when "Show more" is clicked.
 
-    # Iterating function
-    def add_dict_under_parent(dict_to_add, parent_key = ''):
-        for key, value in dict_to_add.items():
+def placeholder_iid(folder_iid):
+    # Folders that haven't been opened yet have a placeholder in them, so they can be opened. Names can't contain '\\', so this can't clash with an actual object.
+    return folder_iid + "\\\\placeholder"
 
-            if "\\" in key:
-                raise ValueError("Internal Objects Tree Error", "Objects cannot have '\\' in their name.")
+def more_iid(folder_iid):
+    # The "Show more" item at the bottom of a large folder
+    return folder_iid + "\\\\more"
 
-            iid = parent_key + '\\' + key
+def is_placeholder(iid):
+    """Check whether an item in an objects Treeview is a placeholder or a "Show more" item, rather than an object or folder."""
+    return "\\\\" in iid
 
-            # If it's a dictionary (i.e. a folder), add it to the tree then add everything under it
-            if isinstance(value, dict):
+def describe_value(value):
+    """Get a short description of an input value that is too big to show in full, e.g. a numpy array, without reading it if it's a payload.
 
-                # If an item already exists don't add it again
-                if not treeview.exists(iid):
-                    treeview.insert(parent_key, 'end', iid, text = key, image = folder_image)      # Parent ID, Position, ID, Displayed Text
+    Args:
+        value: The value.
 
-                # But check everything under it for new items
-                add_dict_under_parent(value, parent_key = iid)
+    Returns:
+        str: The description, or None if the value isn't an array or payload.
+    """
+    if isinstance(value, PayloadReference):
+        return value.describe()
 
-            # If it's an object, just add it to the tree
-            else:
-                if not treeview.exists(iid):
-                    treeview.insert(parent_key, 'end', iid, text = key, image = object_image)      
+    if isinstance(value, numpy.ndarray):
+        return describe_array(value.dtype, value.shape)
 
-    add_dict_under_parent(dictionary)
+    return None
+
+def get_object_summary(store):
+    """Get the summary of an object to show next to its name in the objects Treeview, from its class's summary() static method, if it has one.
+
+    Args:
+        store (ObjectStore): The object.
+
+    Returns:
+        str: The summary, or None if it doesn't have one.
+    """
+    try:
+        summary = store.object.summary
+    except AttributeError:
+        return None
+
+    # Objects from a workspace database aren't read just to show them
+    if store.dictionary_loaded():
+        try:
+            return summary(store.dictionary["\\INPUTS\\"])
+        except Exception:
+            return None
+
+    return None
+
+def add_objects_tree_item(treeview, parent_iid, key, value, object_image, folder_image, opened = None):
+    """Add one object or folder to the end of a folder in an objects Treeview. A folder's contents are only added if it is open.
+
+    Args:
+        treeview (ttk.Treeview): The Treeview.
+        parent_iid (str): IID of the folder to add it to.
+        key (str): The name of the item.
+        value (ObjectStore or dict): The item.
+        object_image (tk.PhotoImage): Image shown next to objects.
+        folder_image (tk.PhotoImage): Image shown next to folders.
+        opened (set, optional): IIDs of folders that should be opened straight away. Defaults to None.
+    """
+    if "\\" in key:
+        raise ValueError("Internal Objects Tree Error", "Objects cannot have '\\' in their name.")
+
+    iid = parent_iid + '\\' + key
+
+    # If it's a dictionary (i.e. a folder), add it to the tree, but only add everything under it when it's opened
+    if isinstance(value, dict):
+        treeview.insert(parent_iid, 'end', iid, text = key, image = folder_image, tags = ("folder",))      # Parent ID, Position, ID, Displayed Text
+
+        if opened is not None and iid in opened:
+            treeview.item(iid, open = True)
+            fill_objects_tree(treeview, value, object_image = object_image, folder_image = folder_image, parent_iid = iid, opened = opened)
+
+        elif len(value) > 0:
+            treeview.insert(iid, 'end', placeholder_iid(iid), text = "")
+
+    # If it's an object, just add it to the tree, with its summary if it has one (e.g. the shape of an Array)
+    else:
+        summary = get_object_summary(value)
+        treeview.insert(parent_iid, 'end', iid, text = key if summary is None else f"{key}  ({summary})", image = object_image)
+
+def fill_objects_tree(treeview, dictionary, object_image, folder_image, parent_iid = '', start = 0, opened = None):
+    """Add the items in a folder to an objects Treeview, which is assumed not to have any of them yet. Only the items directly in the folder are added. The
+    contents of each folder are added when it's opened (see open_objects_tree_item()), and large folders are added a page at a time, so even workspaces
+    with hundreds of thousands of objects can be shown straight away.
+
+    Args:
+        treeview (ttk.Treeview): The Treeview.
+        dictionary (dict): The folder.
+        object_image (tk.PhotoImage): Image shown next to objects.
+        folder_image (tk.PhotoImage): Image shown next to folders.
+        parent_iid (str, optional): IID of the folder. Defaults to '', the top level.
+        start (int, optional): Position in the folder to start from, when adding the next page. Defaults to 0.
+        opened (set, optional): IIDs of folders that should be opened straight away. Defaults to None.
+    """
+    end = start + OBJECTS_TREE_PAGE_SIZE
+
+    for key, value in itertools.islice(dictionary.items(), start, end):
+        add_objects_tree_item(treeview, parent_iid, key, value, object_image = object_image, folder_image = folder_image, opened = opened)
+
+    if len(dictionary) > end:
+        treeview.insert(parent_iid, 'end', more_iid(parent_iid), text = f"Show more ({len(dictionary) - end} not shown)")
+
+def open_objects_tree_item(treeview, active_objects, iid, object_image, folder_image):
+    """Add the contents of a folder to an objects Treeview when it's opened, or the next page of a large folder when its "Show more" item is clicked.
+
+    Args:
+        treeview (ttk.Treeview): The Treeview.
+        active_objects (dict): The objects shown in the Treeview.
+        iid (str): The IID of the folder or "Show more" item.
+        object_image (tk.PhotoImage): Image shown next to objects.
+        folder_image (tk.PhotoImage): Image shown next to folders.
+    """
+    if not treeview.exists(iid):
+        return
+
+    parent_iid = treeview.parent(iid)
+
+    if iid == more_iid(parent_iid):
+        start = len(treeview.get_children(parent_iid)) - 1
+        treeview.delete(iid)
+        fill_objects_tree(treeview, get_object(active_objects, parent_iid), object_image = object_image, folder_image = folder_image, parent_iid = parent_iid, start = start)
+
+    elif treeview.exists(placeholder_iid(iid)):
+        treeview.delete(placeholder_iid(iid))
+        fill_objects_tree(treeview, get_object(active_objects, iid), object_image = object_image, folder_image = folder_image, parent_iid = iid)
+
+def update_objects_tree_folder(treeview, active_objects, folder_iid, object_image, folder_image, opened = None):
+    """Make a folder in an objects Treeview match the same folder in active_objects, e.g. after items have been added, removed or reordered. Items that are
+    already shown are kept as they are (so folders inside it stay open), and no more of a large folder is shown than before.
+
+    Args:
+        treeview (ttk.Treeview): The Treeview.
+        active_objects (dict): The objects shown in the Treeview.
+        folder_iid (str): The IID of the folder.
+        object_image (tk.PhotoImage): Image shown next to objects.
+        folder_image (tk.PhotoImage): Image shown next to folders.
+        opened (set, optional): IIDs of folders that should be opened straight away if they're added. Defaults to None.
+    """
+    if folder_iid != "" and not treeview.exists(folder_iid):
+        return          # The folder it's in hasn't been opened yet
+
+    try:
+        folder = get_object(active_objects, folder_iid)
+    except KeyError:
+        return
+
+    if not isinstance(folder, dict):
+        return
+
+    children = treeview.get_children(folder_iid)
+
+    # A folder that hasn't been opened yet just needs a placeholder if there's anything in it
+    if folder_iid != "" and (placeholder_iid(folder_iid) in children or (len(children) == 0 and not treeview.item(folder_iid, "open"))):
+        if len(folder) > 0 and len(children) == 0:
+            treeview.insert(folder_iid, 'end', placeholder_iid(folder_iid), text = "")
+
+        elif len(folder) == 0 and len(children) > 0:
+            treeview.delete(placeholder_iid(folder_iid))
+
+        return
+
+    # Show the same number of items as before (or a whole page, if it wasn't a large folder)
+    more = more_iid(folder_iid)
+    shown = [iid for iid in children if iid != more]
+    limit = len(shown) if more in children else max(len(shown), OBJECTS_TREE_PAGE_SIZE)
+
+    keys = list(itertools.islice(folder.keys(), limit))
+    order = [folder_iid + '\\' + key for key in keys]
+    expected = set(order)
+
+    for iid in shown:
+        if iid not in expected:
+            treeview.delete(iid)
+
+    shown = set(shown)
+
+    for key, iid in zip(keys, order):
+        if iid not in shown:
+            add_objects_tree_item(treeview, folder_iid, key, folder[key], object_image = object_image, folder_image = folder_image, opened = opened)
+
+    if len(folder) > len(keys):
+        text = f"Show more ({len(folder) - len(keys)} not shown)"
+
+        if treeview.exists(more):
+            treeview.item(more, text = text)
+        else:
+            treeview.insert(folder_iid, 'end', more, text = text)
+
+        order.append(more)
+
+    elif treeview.exists(more):
+        treeview.delete(more)
+
+    if tuple(order) != treeview.get_children(folder_iid):
+        treeview.set_children(folder_iid, *order)
 
 def fill_functions_tree(treeview, dictionary, object_image = None, folder_image = None):
     """Placeholder function for filling a functions tree. It should work, but is very overkill since the functions tree shouldn't have folders or subfolders etc. Just a list of functions.
@@ -166,13 +551,19 @@ def fill_functions_tree(treeview, dictionary, object_image = None, folder_image
 
 def object_explorer(root, active_objects, variable_to_set, object_image, folder_image, object_type = None, grab_set = None):
         
+        # object_type can be a class, or a tuple of classes (like isinstance())
+        if isinstance(object_type, tuple):
+            type_name = "' or '".join(t.__name__ for t in object_type)
+        elif object_type is not None:
+            type_name = object_type.__name__
+
         def on_close():
             toplevel.destroy()
             if not grab_set is None:
                 grab_set.grab_set() 
 
         def select():
-            if str(objects_tree.focus()) == '':
+            if str(objects_tree.focus()) == '' or is_placeholder(str(objects_tree.focus())):
                 tk.messagebox.showinfo("Select object error", "No object selected from the tree.", parent = toplevel)
                 
             else:
@@ -194,7 +585,7 @@ def object_explorer(root, active_objects, variable_to_set, object_image, folder_
 
                         if not isinstance(selected_object.get_object(), object_type):
                             tk.messagebox.showinfo("Select object error", 
-                                                   f"Object selected is the wrong type. It must be of type '{object_type.__name__}'. You selected '{type(selected_object.get_object()).__name__}'.", 
+                                                   f"Object selected is the wrong type. It must be of type '{type_name}'. You selected '{type(selected_object.get_object()).__name__}'.", 
                                                    parent = toplevel)
                         
                         else:
@@ -207,7 +598,7 @@ def object_explorer(root, active_objects, variable_to_set, object_image, folder_
                     else:
                         if not isinstance(selected_object.get_object(), object_type):
                             tk.messagebox.showinfo("Select object error", 
-                                                   f"Object selected is the wrong type. It must be of type '{object_type.__name__}'. You selected '{object_type.__name__, type(selected_object).__name__}'.", 
+                                                   f"Object selected is the wrong type. It must be of type '{type_name}'. You selected '{type(selected_object).__name__}'.", 
                                                    parent = toplevel)
                         
                         else:
@@ -225,6 +616,19 @@ def object_explorer(root, active_objects, variable_to_set, object_image, folder_
 
         fill_objects_tree(objects_tree, active_objects, object_image = object_image, folder_image = folder_image)
 
+        # Folders are filled in when they're opened, and large folders are shown a page at a time
+        def open_item(iid):
+            open_objects_tree_item(objects_tree, active_objects, iid, object_image = object_image, folder_image = folder_image)
+
+        def selection_changed(event):
+            for iid in objects_tree.selection():
+                if is_placeholder(iid):
+                    objects_tree.selection_set(())
+                    open_item(iid)
+
+        objects_tree.bind("<<TreeviewOpen>>", lambda event : open_item(objects_tree.focus()))
+        objects_tree.bind("<<TreeviewSelect>>", selection_changed)
+
         select_button = tk.Button(toplevel, text = "Select", command = lambda : select())
         select_button.pack(side = "right")
 
@@ -268,54 +672,206 @@ class String(str):
         instance = super().__new__(self, dictionary["Value"])
         return instance
 
+    def __getnewargs__(self):
+        # So it can be pickled, e.g. to send it to a worker process
+        return ({"Value" : str(self)},)
+
     @staticmethod
     def inputs():
         return {"Value" : "raw"} 
 
+class Array(numpy.ndarray):
+    """This is a class for storing numpy arrays, e.g. the results of functions. The array is shared rather than copied (large ones are memory-mapped straight from
+    their payload file, see scigui.payloads), so it is read-only - functions that want to change it should make a copy first. Arrays typed in by the user are
+    read as Python literals, e.g. [[1, 2], [3, 4]]."""
+    def __new__(self, dictionary):
+        value = dictionary["Value"]
+
+        if isinstance(value, PayloadReference):
+            value = value.load()
+
+        elif isinstance(value, str):
+            value = numpy.array(ast.literal_eval(value))
+
+        instance = numpy.asarray(value).view(self)
+        instance.flags.writeable = False
+        return instance
+
+    @staticmethod
+    def inputs():
+        return {"Value" : "raw"} 
+
+    @staticmethod
+    def summary(dictionary):
+        return describe_value(dictionary["Value"])
+
 class ObjectStore:
-    def __init__(self, application, index, dictionary):
+    def __init__(self, application, index, dictionary, loader = None):
         self.application = application
-        self.object_index = index
         self.objects_list = application.objects
         self.object = self.objects_list[index]
+
+        # Array comes after the user's objects, so it's saved as -1, which doesn't change if objects are added to the application
+        self.object_index = -1 if self.object is Array else index
+        self.loader = loader                # Reads the dictionary the first time it's needed, for objects in a workspace database (see scigui.database)
+        self.version = 0                    # Increased whenever the dictionary is replaced, so cached objects built from the old one aren't used
         self.dictionary = dictionary
 
     @property
     def index(self):
         return self.object_index
 
+    @property
+    def dictionary(self):
+        if self._dictionary is None and self.loader is not None:
+            # Loading it isn't a change, so the version stays the same
+            self._dictionary = self.application.object_pool.intern_dictionary(self.loader())
+            self.loader = None
+
+        return self._dictionary
+
+    @dictionary.setter
+    def dictionary(self, dictionary):
+        # Inputs are shared with any other objects that have the same ones (see scigui.dedup). Dictionaries are replaced rather than edited, so this is safe.
+        self._dictionary = self.application.object_pool.intern_dictionary(dictionary)
+        self.version += 1
+
+        if self.version > 1:
+            self.application.objects_changed()
+
+    def dictionary_loaded(self):
+        return self._dictionary is not None
+
     def __repr__(self):
         return "<ObjectStore>(" + str(self.dictionary) + ")"
 
+    def datatypes(self):
+        """Get the datatype of each input, evaluating any functional inputs using the current input values.
+
+        Returns:
+            dict: Dictionary of {input key : datatype}.
+        """
+        datatypes = {}
+        for key, value in self.object.inputs().items():
+            if callable(value):
+                datatypes[key] = value(self.dictionary["\\INPUTS\\"])
+            else:
+                datatypes[key] = value
+
+        return datatypes
+
+    def links(self):
+        """Get the IIDs of the objects that this object links to.
+
+        Returns:
+            list: The linked IIDs.
+        """
+        return get_linked_iids(self.datatypes(), self.dictionary["\\INPUTS\\"])
+
     def get_object(self):
-        altered_dictionary = self.dictionary.copy()
+        """Build the user's object from this store, following any links to other objects.
+
+        The object is cached, and the same one is returned until this store's dictionary is replaced, or any of the objects it links to change (or a link points to a
+        different object, e.g. after things are moved around). Object classes with a cache_instance() static method that returns False are built fresh every time.
+
+        Returns:
+            object: The user's object.
+        """
+        if not get_cache_instance(self.object):
+            return self.build_object()[0]
+
+        instance_cache = self.application.instance_cache
+        entry = instance_cache.get(self)
+
+        if entry is not None:
+            version, instance, dependencies = entry
+
+            if version == self.version and self.dependencies_unchanged(dependencies):
+                instance_cache.record(hit = True)
+                return instance
+
+        instance_cache.record(hit = False)
+
+        version = self.version
+        instance, dependencies = self.build_object()
+        instance_cache.put(self, (version, instance, dependencies))
+
+        return instance
+
+    def dependencies_unchanged(self, dependencies):
+        """Check whether the objects used to build a cached object are still the same.
+
+        Args:
+            dependencies (list): List of (IID, ObjectStore, object) for each link, as returned by build_object().
+
+        Returns:
+            bool: True if every link still points to the same ObjectStore, and that store still gives the same object.
+        """
+        for iid, store, instance in dependencies:
+            try:
+                if get_object(active_objects = self.application.active_objects, iid = iid) is not store:
+                    return False
+            except (KeyError, TypeError):
+                return False
+
+            if store.get_object() is not instance:
+                return False
+
+        return True
+
+    def build_object(self):
+        """Build a new instance of the user's object, without using the cache.
+
+        Returns:
+            tuple: The object, and a list of (IID, ObjectStore, object) for each link that was followed.
+        """
+        # Copy the inputs, so that replacing links with objects doesn't edit the stored dictionary (which might be read by other threads at the same time). The
+        # object is given views of the values, so it can't change them for any other objects they're shared with either (see scigui.dedup).
+        pool = self.application.object_pool
+        inputs = {key : pool.read_only(key, value) for key, value in self.dictionary["\\INPUTS\\"].items()}
+        dependencies = []
 
         # If there are any references to objects, replace the directory to the object with the object itself
         for key, value in self.object.inputs().items():
-            if value == "object":
-                altered_dictionary["\\INPUTS\\"][key] = get_object(active_objects = self.application.active_objects, iid = self.dictionary[key])  # This will retrieve an "ObjectStore" object
-                altered_dictionary["\\INPUTS\\"][key] = altered_dictionary["\\INPUTS\\"][key].get_object()                                                          # This converts the "ObjectStore" object to the actual object itself.
 
-            if value == "raw" and ("\\" in str(altered_dictionary["\\INPUTS\\"][key])):
-                # Get the actual 'String' object if it's a reference to an object - check this by looking for '\\' in the user's input
-                altered_dictionary["\\INPUTS\\"][key] = get_object(active_objects = self.application.active_objects, iid = self.dictionary["\\INPUTS\\"][key])  # This will retrieve an "ObjectStore" object
-                altered_dictionary["\\INPUTS\\"][key] = altered_dictionary["\\INPUTS\\"][key].get_object()                                                          # This converts the "ObjectStore" object to the actual object itself.
+            # Get the actual 'String' object if a raw input is a reference to an object - check this by looking for '\\' in the user's input
+            if value == "object" or (value == "raw" and ("\\" in str(inputs[key]))):
+                iid = self.dictionary["\\INPUTS\\"][key]
+                store = get_object(active_objects = self.application.active_objects, iid = iid)   # This will retrieve an "ObjectStore" object
+                inputs[key] = store.get_object()                                                   # This converts the "ObjectStore" object to the actual object itself.
+                dependencies.append((iid, store, inputs[key]))
 
-        return self.object(dictionary = altered_dictionary["\\INPUTS\\"])
+        # Read any payloads that were saved separately (see scigui.payloads)
+        for key, value in inputs.items():
+            if isinstance(value, PayloadReference):
+                inputs[key] = value.load()
+
+        return self.object(dictionary = inputs), dependencies
 
     def to_json_form(self):
-        # For saving to a .json file
-        dictionary = self.dictionary
+        # For saving to a .json file (this is a new dictionary, so saving doesn't change the ObjectStore)
+        dictionary = self.dictionary.copy()
         dictionary["\\OBJECT_INDEX\\"] = self.object_index
 
+        # Small numpy arrays are saved in binary form (see scigui.payloads)
+        if "\\INPUTS\\" in dictionary:
+            dictionary["\\INPUTS\\"] = inputs_to_json_form(dictionary["\\INPUTS\\"])
+
         return dictionary
 
     @staticmethod
-    def from_json_form(application, dict_from_json):
+    def from_json_form(application, dict_from_json, shared = None):
         object_index = dict_from_json["\\OBJECT_INDEX\\"]
         dictionary = dict_from_json.copy()
         del dictionary["\\OBJECT_INDEX\\"]
 
+        if "\\INPUTS\\" in dictionary:
+            dictionary["\\INPUTS\\"] = application.payloads.load_references(dictionary["\\INPUTS\\"])
+
+            # Values that are shared with other objects are saved once, in the file's "Shared" section (see scigui.dedup)
+            if shared is not None:
+                dictionary["\\INPUTS\\"] = shared.resolve(dictionary["\\INPUTS\\"])
+
         return ObjectStore(application = application, index = object_index, dictionary = dictionary)
 
     @staticmethod
@@ -332,149 +888,536 @@ class FunctionStore:
         self.function_index = index
         self.functions_list = application.functions
         self.function = self.functions_list[index]
+        self.version = 0                    # Increased whenever the dictionary is replaced, so the execution plan is rebuilt
+        self.plan = None
         self.dictionary = dictionary
 
     @property
     def index(self):
         return self.function_index
 
+    @property
+    def dictionary(self):
+        return self._dictionary
+
+    @dictionary.setter
+    def dictionary(self, dictionary):
+        self._dictionary = dictionary
+        self.version += 1
+
+    def get_plan(self):
+        """Get the execution plan for this function, only rebuilding it if this store's dictionary has been replaced, or any of its links now point somewhere else.
+
+        Returns:
+            ExecutionPlan: The plan.
+        """
+        plan = self.plan
+
+        if plan is None or plan.version != self.version or not plan.is_valid():
+            plan = ExecutionPlan(self)
+            self.plan = plan
+
+        return plan
+
     def __repr__(self):
 
         return "<FunctionStore>(" + str(self.dictionary) + ")"
 
-    def execute(self):
+    def datatypes(self):
+        """Get the datatype of each input, evaluating any functional inputs using the current input values.
+
+        Returns:
+            dict: Dictionary of {input key : datatype}.
+        """
+        datatypes = {}
+        for key, value in self.function.inputs().items():
+            if callable(value):
+                datatypes[key] = value(self.dictionary["\\INPUTS\\"])
+            else:
+                datatypes[key] = value
+
+        return datatypes
 
-        # Edit the inputs dictionary so it replaces any references to objects with the actual object
-        inputs_dict = copy.deepcopy(self.dictionary["\\INPUTS\\"])
+    def input_links(self):
+        """Get the IIDs of the objects that this function reads directly from its inputs.
+
+        Returns:
+            list: The linked IIDs.
+        """
+        return list(self.get_plan().input_links)
+
+    def output_links(self):
+        """Get the IIDs of the objects that this function will write to when it is executed. Blank outputs and 'file' outputs are not included.
+
+        Returns:
+            list: The output IIDs.
+        """
+        outputs = self.function.outputs()
+        return [iid for key, iid in self.dictionary["\\OUTPUTS\\"].items() if iid != "" and not isinstance(outputs[key], str)]
+
+    def input_fingerprint(self):
+        """Get a hash of everything the function reads: its inputs, the dictionaries of every object it links to (directly or through other objects),
+        and the modification times of any files given as inputs.
+
+        Returns:
+            str: The hash.
+        """
+        plan = self.get_plan()
+        objects_hash, file_paths = plan.get_objects_hash()
+        files = {}
+
+        for path in file_paths:
+            try:
+                files[path] = os.path.getmtime(path)
+            except OSError:
+                files[path] = None
+
+        return get_hash({"Inputs" : plan.inputs_hash,
+                         "Objects" : objects_hash,
+                         "Files" : files})
+
+    def output_fingerprint(self):
+        """Get a hash of the objects currently stored at this function's outputs.
+
+        Returns:
+            str: The hash.
+        """
+        outputs = {}
+
+        for iid in self.get_plan().output_links:
+            try:
+                item = get_object(self.application.active_objects, iid)
+            except (KeyError, TypeError):
+                item = None
+
+            if isinstance(item, ObjectStore):
+                outputs[iid] = [item.object.__name__, item.dictionary]
+            else:
+                outputs[iid] = None
+
+        return get_hash(outputs)
+
+    def is_clean(self):
+        """Check whether re-running the function would give the same result as last time, i.e. nothing it reads has changed since it was last run, and its
+        outputs haven't been changed or deleted since. Functions with 'file' outputs, or no object outputs at all (e.g. ones that show a plot), are never clean,
+        since what they did can't be checked.
+
+        Returns:
+            bool: True if the function doesn't need to be re-run.
+        """
+        last_run = self.dictionary.get("\\LAST_RUN\\")
+
+        if last_run is None:
+            return False
+
+        # Only objects are fingerprinted, so a deleted file or a closed plot would otherwise never be made again
+        if any(isinstance(datatype, str) for datatype in self.function.outputs().values()) or len(self.output_links()) == 0:
+            return False
+
+        return last_run["Inputs"] == self.input_fingerprint() and last_run["Outputs"] == self.output_fingerprint()
+
+    def resolve_inputs(self):
+        """Get the inputs dictionary that is given to the user's execute() function, with any links replaced by the objects they link to.
+
+        Returns:
+            dict: The resolved inputs.
+        """
+        plan = self.get_plan()
+        inputs = self.dictionary["\\INPUTS\\"]
+        strict = self.application.strict_inputs
+
+        # The function is given copy-on-write views of the stored inputs, so only an input it actually edits gets copied
+        inputs_dict = {key : make_view(key, value, strict = strict) for key, value in inputs.items()}
+
+        # Lists of objects are always new lists, since the IIDs in them are replaced with the objects
+        for key in plan.object_list_keys:
+            inputs_dict[key] = list(inputs[key])
 
         # Provide a reference to the application, so the user can do their own GUI stuff if they want
         inputs_dict["\\APPLICATION\\"] = self.application
 
         # If there are any references to objects, replace the directory to the object with the object itself
-        for key, value in self.function.inputs().items():
+        for (key, i, iid), store in zip(plan.links, plan.stores):
+            if store is None:
+                self.application.popup("Object link error", f"Could not find object located at {iid} for input {key} when executing function.")
+                continue
 
-            if isinstance(value, list):
-                if value[0] == "object":
-                    for i in range(len(inputs_dict[key])):
+            if i is None:
+                inputs_dict[key] = store.get_object()          # This converts the "ObjectStore" object to the actual object itself.
+            else:
+                inputs_dict[key][i] = store.get_object()
 
-                        try:
-                            inputs_dict[key][i] = get_object(active_objects = self.application.active_objects, iid = inputs_dict[key][i])     # This will retrieve an "ObjectStore" object
-                            inputs_dict[key][i] = inputs_dict[key][i].get_object()          
-                                                                                            # This converts the "ObjectStore" object to the actual object itself.
-                        except KeyError:
-                            open_popup(self.application.root, "Object link error", f"Could not find object located at {object_location} for input {key} when executing function.")
+        return inputs_dict
+
+    def execute(self, refresh_treeview = True, name = None, profiling = False):
+        """Run the function, and save its outputs to the application's active objects. How long each stage takes is recorded in the application's run history
+        (see scigui.telemetry).
+
+        Args:
+            refresh_treeview (bool, optional): Whether to re-render the objects tree after saving the outputs. Defaults to True.
+            name (str, optional): The function's key in the active functions, for the run history. Defaults to None, which uses the name of its class.
+            profiling (bool, optional): Whether it's being profiled (see scigui.profiling). The function is then always run, rather than using the results cache, and
+                                        functions that ask to run in a thread are run inline, where the profiler can see them. Defaults to False.
+        """
+        timer = self.application.history.timer(name if name is not None else self.function.__name__, self.function)
+        status = "Failed"
 
+        try:
+            with timer.stage("Resolve inputs"):
+                # Record what the inputs were before running, so 'Run all' can tell if the function needs to be run again. This is also the key for the results cache.
+                input_fingerprint = self.input_fingerprint()
+                use_cache = get_cache_results(self.function)
+                results = None
 
-            elif callable(value):
-                actual_datatype = value(inputs_dict)
+                if use_cache and not profiling:
+                    results = self.application.result_cache.get(input_fingerprint)
 
-                if actual_datatype == "object":
-                    try:
-                        inputs_dict[key] = get_object(active_objects = self.application.active_objects, iid = self.dictionary["\\INPUTS\\"][key])     # This will retrieve an "ObjectStore" object
-                        inputs_dict[key] = inputs_dict[key].get_object()          
-                                                                                        # This converts the "ObjectStore" object to the actual object itself.
+                if results is None:
+                    inputs_dict = self.resolve_inputs()
 
-                    except KeyError:
-                        open_popup(self.application.root, "Object link error", f"Could not find object located at {object_location} for input {key} when executing function.")
+            if results is None:
+                with timer.stage("Execute"):
+                    # Execute the function, using a separate thread or process if the function asks for one. The profiler only sees the thread it's on, so a
+                    # function that asks for a thread is run inline whilst it's being profiled.
+                    mode = "inline" if profiling and get_execution_mode(self.function) == "thread" else None
+                    results = self.application.backends.run(self.function, inputs_dictionary = inputs_dict, outputs_dictionary = self.dictionary["\\OUTPUTS\\"].copy(),
+                                                            mode = mode)
 
+                    # The function might have returned (part of) one of its inputs
+                    results = materialise(results)
 
-            elif value == "object":
-                try:
-                    inputs_dict[key] = get_object(active_objects = self.application.active_objects, iid = self.dictionary["\\INPUTS\\"][key])     # This will retrieve an "ObjectStore" object
-                    inputs_dict[key] = inputs_dict[key].get_object()          
-                                                                                      # This converts the "ObjectStore" object to the actual object itself.
-                except KeyError:
-                    open_popup(self.application.root, "Object link error", f"Could not find object located at {object_location} for input {key} when executing function.")
+                if use_cache:
+                    self.application.result_cache.put(input_fingerprint, results)
+
+                status = "Completed"
+
+            else:
+                status = "Cached"
+
+            # Now set the output objects (blank outputs aren't saved)
+            updated_objects = False
+
+            with timer.stage("Write outputs"):
+                for key, object_index in self.get_plan().output_indices.items():
+
+                    if object_index == None:
+                        raise ValueError("Failed to find the object of type {} in the list of objects available in the application".format(self.function.outputs()[key]))
+
+                    # Large payloads in the output are saved to their own files, and the object only keeps a reference to them (see scigui.payloads)
+                    inputs = results[key]
+
+                    if isinstance(inputs, dict):
+                        inputs = self.application.payloads.save_inputs(inputs)
 
+                    # Add the object to our active_objects dictionary (other functions may be writing their outputs at the same time)
+                    object_store_to_add = ObjectStore(application = self.application, index = object_index, dictionary = {"\\INPUTS\\" : inputs})
 
-            elif value == "raw" and ("\\" in str(inputs_dict[key])):
-                # Get the actual 'String' object if it's a reference to an object - check this by looking for '\\' in the user's input
+                    with self.application.objects_lock:
+                        set_object(database = self.application.active_objects, iid = self.dictionary["\\OUTPUTS\\"][key], to_add = object_store_to_add)
+
+                    updated_objects = True
+
+                self.dictionary["\\LAST_RUN\\"] = {"Inputs" : input_fingerprint, "Outputs" : self.output_fingerprint()}
+                self.application.functions_changed(name)
+
+            if updated_objects and refresh_treeview:
+                with timer.stage("Refresh tree"):
+                    self.application.refresh_objects_tree()
+
+        except BaseException:
+            status = "Failed"
+            raise
+
+        finally:
+            timer.finish(status)
+
+    def to_json_form(self):
+        # For saving to a .json file (this is a new dictionary, so saving doesn't change the FunctionStore)
+        dictionary = self.dictionary.copy()
+        dictionary["\\FUNCTION_INDEX\\"] = self.function_index
+
+        return dictionary
+
+    @staticmethod
+    def from_json_form(application, dict_from_json):
+        function_index = dict_from_json["\\FUNCTION_INDEX\\"]
+        dictionary = dict_from_json.copy()
+        del dictionary["\\FUNCTION_INDEX\\"]
+
+        return FunctionStore(application = application, index = function_index, dictionary = dictionary)
+
+    @staticmethod
+    def check_if_json_form(dict):
+        if "\\FUNCTION_INDEX\\" in dict.keys():
+            return True
+        else:
+            return False
+
+class ExecutionPlan:
+    def __init__(self, function_store):
+        """Everything about running a FunctionStore that only changes when the store is edited, or the objects it links to are moved, replaced or deleted. This
+        saves evaluating functional inputs, splitting IIDs and walking through the active objects every time the function is run.
+
+        Args:
+            function_store (FunctionStore): The store to make a plan for.
+        """
+        self.application = function_store.application
+        self.version = function_store.version
+        self.generation = self.application.objects_generation
+
+        function = function_store.function
+        inputs = function_store.dictionary["\\INPUTS\\"]
+        declared_datatypes = function.inputs()
+
+        self.datatypes = function_store.datatypes()
+        self.input_links = get_linked_iids(self.datatypes, inputs)
+        self.output_links = function_store.output_links()
+        self.file_paths = get_file_paths(self.datatypes, inputs)
+        self.inputs_hash = get_hash({"Function" : function.__module__ + "." + function.__qualname__, "Inputs" : inputs})
+
+        # Every input that is replaced by an object when the function is run, as (input key, list index or None, IID)
+        self.links = []
+        self.object_list_keys = []
+
+        for key, datatype in self.datatypes.items():
+            if isinstance(datatype, list):
+                if datatype[0] == "object":
+                    self.links += [(key, i, iid) for i, iid in enumerate(inputs[key])]
+                    self.object_list_keys.append(key)
+
+            elif datatype == "object":
+                self.links.append((key, None, inputs[key]))
+
+            # Get the actual 'String' object if it's a reference to an object - check this by looking for '\\' in the user's input
+            elif datatype == "raw" and not callable(declared_datatypes[key]) and "\\" in str(inputs[key]):
+                self.links.append((key, None, inputs[key]))
+
+        self.stores = self.find_stores()
+
+        # Index of the object class for each output that will be saved, or None if it can't be found. The class itself is looked for first, and then a class with
+        # the same name (e.g. if the module was reloaded). 'file' outputs are written by the function itself, so they don't have one.
+        outputs = function.outputs()
+        self.output_indices = {}
+
+        for key, iid in function_store.dictionary["\\OUTPUTS\\"].items():
+            if iid != "" and not isinstance(outputs[key], str):
+                self.output_indices[key] = None
+
+                for i in range(len(self.application.objects)):
+                    if outputs[key] is self.application.objects[i]:
+                        self.output_indices[key] = i
+                        break
+
+                    if outputs[key].__name__ == self.application.objects[i].__name__:
+                        self.output_indices[key] = i
+
+        self.objects_hash = None
+        self.objects_hash_generation = None
+
+    def find_stores(self):
+        """Look up the ObjectStore for each link.
+
+        Returns:
+            list: The ObjectStore for each link in self.links, or None if there isn't anything at its IID.
+        """
+        stores = []
+
+        for key, i, iid in self.links:
+            try:
+                stores.append(get_object(active_objects = self.application.active_objects, iid = iid))
+            except KeyError:
+                stores.append(None)
+
+        return stores
+
+    def is_valid(self):
+        """Check whether the links still point to the same objects. This is only checked properly if any objects have changed since the plan was last checked.
+
+        Returns:
+            bool: True if the plan can still be used.
+        """
+        generation = self.application.objects_generation
+
+        if generation == self.generation:
+            return True
+
+        for new_store, store in zip(self.find_stores(), self.stores):
+            if new_store is not store:
+                return False
+
+        self.generation = generation
+        return True
+
+    def get_objects_hash(self):
+        """Get a hash of the dictionaries of every object the function reads (directly or through other objects). This is only recalculated if any objects have
+        changed since it was last calculated.
+
+        Returns:
+            tuple: The hash, and the list of files given as inputs to the function or any of those objects.
+        """
+        generation = self.application.objects_generation
+
+        if self.objects_hash_generation != generation:
+            active_objects = self.application.active_objects
+            objects = {}
+            files = list(self.file_paths)
+
+            for iid in get_linked_iids_recursive(active_objects, self.input_links):
                 try:
-                    inputs_dict[key] = get_object(active_objects = self.application.active_objects, iid = self.dictionary["\\INPUTS\\"][key])     # This will retrieve an "ObjectStore" object
-                    inputs_dict[key] = inputs_dict[key].get_object()                                                                            # This converts the "ObjectStore" object to the actual object itself.
+                    item = get_object(active_objects, iid)
+                except (KeyError, TypeError):
+                    item = None
+
+                if isinstance(item, ObjectStore):
+                    objects[iid] = [item.object.__name__, item.dictionary]
+                    files += get_file_paths(item.datatypes(), item.dictionary["\\INPUTS\\"])
+                else:
+                    objects[iid] = None
+
+            self.objects_hash = (get_hash(objects), list(dict.fromkeys(files)))
+            self.objects_hash_generation = generation
+
+        return self.objects_hash
+
+
 
-                except KeyError:
-                    object_location = self.dictionary['\\INPUTS\\'][key]
-                    open_popup(self.application.root, "Object link error", f"Could not find object located at {object_location} for input {key} when executing function.")
+class MainThreadCall():
+    def __init__(self, function, args, kwargs, wait):
+        """A function call that has been passed to the main thread to run, since Tk can only be used from the main thread.
 
-        # Execute the function
-        results = self.function.execute(inputs_dictionary = inputs_dict, outputs_dictionary = self.dictionary["\\OUTPUTS\\"].copy())
+        Args:
+            function (callable): The function to call.
+            args (tuple): Positional arguments for the function.
+            kwargs (dict): Keyword arguments for the function.
+            wait (bool): Whether the thread that made the call will wait for the result. If not, any exception is reported by Tk like any other callback.
+        """
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.wait = wait
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+    def run(self):
+        try:
+            self.result = self.function(*self.args, **self.kwargs)
+
+        except Exception as e:
+            if not self.wait:
+                raise
+            self.exception = e
+
+        finally:
+            self.done.set()
+
+    def get_result(self):
+        # Block until the main thread has run the call
+        self.done.wait()
+
+        if self.exception is not None:
+            raise self.exception
+
+        return self.result
+
+CONSOLE_MAX_LINES = 5000                # Most lines kept in the console. Older lines are removed, but are still in the console log file.
+CONSOLE_FLUSH_INTERVAL = 100            # Milliseconds between adding any new text to the console
+TEMPORARY_LOG = "<temporary>"           # Log filename that stands for a new file in the temporary folder, so every window (and every user) has its own
+
+def make_temporary_log(prefix):
+    # A new, empty log file in the temporary folder, which nothing else is using
+    handle, filename = tempfile.mkstemp(prefix = prefix, suffix = ".log")
+    os.close(handle)
+    return filename
+
+class TextRedirector():
+    def __init__(self, textbox, root, log_filename = None, max_lines = CONSOLE_MAX_LINES, interval = CONSOLE_FLUSH_INTERVAL):
+        """Redirects anything written to it (e.g. sys.stdout) into a Tk textbox. Writing only adds the text to a queue, so it's quick and can be done from any
+        thread, and the queue is added to the textbox in one go every few milliseconds. Only the last few thousand lines are kept in the textbox, but
+        everything is also written to a log file.
+
+        Args:
+            textbox (tk.Text): The textbox to write to.
+            root (tk.Tk): The main window, used to schedule adding the text.
+            log_filename (str, optional): File to write everything to as well. It's replaced if it already exists. Defaults to None, which doesn't keep a log.
+            max_lines (int, optional): Most lines to keep in the textbox. Defaults to CONSOLE_MAX_LINES.
+            interval (int, optional): Milliseconds between adding the text in the queue to the textbox. Defaults to CONSOLE_FLUSH_INTERVAL.
+        """
+        self.textbox = textbox
+        self.root = root
+        self.max_lines = max_lines
+        self.interval = interval
+        self.pending = collections.deque()      # Text that hasn't been added to the textbox yet. Appending and popping from a deque are thread safe.
+        self.log_filename = log_filename
+        self.log_file = None if log_filename is None else open(log_filename, "w", encoding = "utf-8")
+        self.after_id = self.root.after(self.interval, self.update_textbox)
+
+    def write(self, string):
+        # Python prints a new line string on top of whatever the user prints. Don't add the time stamp to this.
+        if string == "\n" or string == "":
+            self.pending.append(string)
+        else:
+            current_time = str(time.strftime("%H:%M:%S", time.localtime()))
+            self.pending.append(f"[{current_time}] {string}")
 
-        # Now set the output objects
-        updated_objects = False
-        for key, value in self.dictionary["\\OUTPUTS\\"].items():
-            
-            # If the user leaves a blank entry for the output, don't save anything
-            if self.dictionary["\\OUTPUTS\\"][key] == "":
-                pass
+        return len(string)
 
-            else:
-                object_type = self.function.outputs()[key]
+    def flush(self):
+        pass
 
-                # Find the object index for the object type we are going to produce. NOTE THAT THIS IS DONE BY COMPARING THEIR NAMES!
-                object_index = None
-                for i in range(len(self.application.objects)):
-                    if object_type.__name__ == self.application.objects[i].__name__:
-                        object_index = i
-                
-                if object_index == None:
-                    raise ValueError("Failed to find the object of type {} in the list of objects available in the application".format(object_type))
+    def take_pending(self):
+        # Take everything that's been written so far
+        strings = []
 
-                # Add the object to our active_objects dictionary
-                object_store_to_add = ObjectStore(application = self.application, index = object_index, dictionary = {"\\INPUTS\\" : results[key]})
+        while True:
+            try:
+                strings.append(self.pending.popleft())
+            except IndexError:
+                return "".join(strings)
 
-                set_object(database = self.application.active_objects, iid = self.dictionary["\\OUTPUTS\\"][key], to_add = object_store_to_add)
-                updated_objects = True
-        
-        if updated_objects:
-            # Refresh the objects tree
-            self.application.objects_tree.delete(*self.application.objects_tree.get_children())
-            fill_objects_tree(treeview = self.application.objects_tree, dictionary = self.application.active_objects, object_image = self.application.object_image, folder_image = self.application.folder_image)
+    def write_log(self, text):
+        if self.log_file is not None and text != "":
+            self.log_file.write(text)
+            self.log_file.flush()
 
-    def to_json_form(self):
-        # For saving to a .json file
-        dictionary = self.dictionary
-        dictionary["\\FUNCTION_INDEX\\"] = self.function_index
+    def update_textbox(self):
+        """Add any text that's been written to the textbox, and remove the oldest lines if there are too many. This must be called from the main thread, and keeps
+        re-scheduling itself using after()."""
+        text = self.take_pending()
 
-        return dictionary
+        if text != "":
+            self.write_log(text)
 
-    @staticmethod
-    def from_json_form(application, dict_from_json):
-        function_index = dict_from_json["\\FUNCTION_INDEX\\"]
-        dictionary = dict_from_json.copy()
-        del dictionary["\\FUNCTION_INDEX\\"]
+            # Don't add more lines than would be kept
+            lines = text.split("\n")
 
-        return FunctionStore(application = application, index = function_index, dictionary = dictionary)
+            if len(lines) > self.max_lines:
+                text = "\n".join(lines[-self.max_lines:])
 
-    @staticmethod
-    def check_if_json_form(dict):
-        if "\\FUNCTION_INDEX\\" in dict.keys():
-            return True
-        else:
-            return False
+            self.textbox.configure(state = "normal")        # Make textbox editable
+            self.textbox.insert("end", text)
 
+            num_lines = int(self.textbox.index("end-1c").split(".")[0])
 
+            if num_lines > self.max_lines:
+                self.textbox.delete("1.0", f"{num_lines - self.max_lines + 1}.0")
 
-class TextRedirector():
-    def __init__(self, textbox):
-        self.textbox = textbox
+            self.textbox.see("end")                         # Scroll to end
+            self.textbox.configure(state = "disabled")      # Make textbox read only
 
-    def write(self, string):       
-        self.textbox.configure(state = "normal")        # Make textbox editable
+        self.after_id = self.root.after(self.interval, self.update_textbox)
 
-        # Add text in a new line
-        if string == "\n" or string == "":
-            # Python prints a new line string on top of whatever the user prints. Don't add the time stamp to this.
-            self.textbox.insert("end", string)                 
-        else:
-            current_time = str(time.strftime("%H:%M:%S", time.localtime()))
-            self.textbox.insert("end", f"[{current_time}] {string}")
+    def close(self):
+        """Stop adding text to the textbox, and write anything still waiting to the log file."""
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
 
-        self.textbox.see("end")                         # Scroll to end
-        self.textbox.configure(state = "disabled")      # Make textbox read only
+        self.write_log(self.take_pending())
 
-    def flush(self):
-        pass
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
 
 class ToolTip():
     # Credit to squareRoot17 for most of this code in their StackOverflow answer:
@@ -520,41 +1463,54 @@ def create_tool_tip(widget, text):
 
 
 class Application:
-    def __init__(self, objects, functions):
+    def __init__(self, objects, functions, max_workers = None, console_log = TEMPORARY_LOG, stall_log = TEMPORARY_LOG):
+        """The main SciGUI window.
+
+        Args:
+            objects (list): The object classes the user can create.
+            functions (list): The function classes the user can create.
+            max_workers (int, optional): Maximum number of functions to run at the same time when using 'Run all'. Defaults to None, which uses the concurrent.futures default.
+            console_log (str, optional): File that everything printed to the console is also written to, since the console only keeps the most recent lines.
+                                         Defaults to TEMPORARY_LOG, which makes a new file in the temporary folder. Use None to not keep a log.
+            stall_log (str, optional): File that stalls of the window are added to whilst Debug > Monitor stalls is on (see scigui.stalls). Defaults to
+                                       TEMPORARY_LOG, which makes a new file in the temporary folder the first time stalls are monitored. Use None to not keep a log.
+        """
         # Get the actual location of the script, so we can import the icons for objects and folder
         __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
         # Initialisation
-        self.objects = [String] + objects
-        self.functions = functions
-        self.open_file = None
-        self.modified_and_not_saved = False
+        self.initialise_data(objects, functions, max_workers)
+        self.stall_log = stall_log
 
         # Main window
         self.root = tk.Tk()
         self.root.geometry("600x400")   # So if you un-maximise it goes back to this size
-        self.root.state('zoomed')       # Initialise as maximised
+
+        # Initialise as maximised ('zoomed' is only a window state on Windows and macOS, so X11 uses the attribute instead)
+        try:
+            self.root.state('zoomed')
+        except tk.TclError:
+            self.root.attributes('-zoomed', True)
+
         self.root.title('SciGUI')
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)      # Run custom function when user tries to click 'x'
-        self.root.bind('<Control-s>', lambda info: self.save())      # Quick save shortcut
+        self.root.bind('<Control-s>', self.timed("Save", lambda info: self.save()))      # Quick save shortcut
 
         self.root.bind("<Unmap>", self.hide_all)  # Hide all toplevels when the main window is minimised
         self.root.bind("<Map>", self.show_all)    # Show all toplevels when the main window is reopened
 
-        # Current list of objects and functions the user has added
-        self.active_objects = {}
-        self.active_functions = {}
-
         # Menu with 'file', etc...
         self.root_menubar = tk.Menu(self.root)
         self.root.config(menu = self.root_menubar)
 
         # File menu dropdown
         self.file_menu = tk.Menu(tearoff = "off")
-        self.file_menu.add_command(label = 'New', command = lambda : self.new())
-        self.file_menu.add_command(label = 'Open', command = lambda : self.open())
-        self.file_menu.add_command(label = 'Save', command = lambda : self.save(), accelerator = "Ctrl+S")
-        self.file_menu.add_command(label = 'Save as', command = lambda : self.save_as())
+        self.file_menu.add_command(label = 'New', command = self.timed("New", lambda : self.new()))
+        self.file_menu.add_command(label = 'Open', command = self.timed("Open", lambda : self.open()))
+        self.file_menu.add_command(label = 'Save', command = self.timed("Save", lambda : self.save()), accelerator = "Ctrl+S")
+        self.file_menu.add_command(label = 'Save as', command = self.timed("Save as", lambda : self.save_as()))
+        self.file_menu.add_command(label = 'Save as JSON', command = self.timed("Save as", lambda : self.save_as(as_database = False)))
+        self.file_menu.add_command(label = 'Save as database', command = self.timed("Save as", lambda : self.save_as(as_database = True)))
         
         # Edit menu dropdown
         self.edit_menu = tk.Menu(tearoff = "off")
@@ -564,15 +1520,30 @@ class Application:
         # Function menu dropdown
         self.functions_menu = tk.Menu(tearoff = "off")
         self.functions_menu.add_command(label = 'Run all', command = lambda : self.run_all_functions())
+        self.functions_menu.add_command(label = 'Re-run all', command = lambda : self.run_all_functions(force = True))
+        self.functions_menu.add_command(label = 'Cancel', command = lambda : self.cancel_run())
+        self.functions_menu.add_separator()
+        self.functions_menu.add_command(label = 'Run history', command = lambda : self.run_history_window())
+        self.functions_menu.add_command(label = 'Profile all', command = lambda : self.profile_functions())
 
         # 'Help' menu dropdown
         self.help_menu = tk.Menu(tearoff = "off")
 
         self.debug_menu = tk.Menu(tearoff = "off")
         self.debug_menu.add_command(label = 'Clear console', command = lambda : self.clear_console())
+        self.debug_menu.add_command(label = 'Print console log location', command = lambda : print(f"Console log: {self.console.log_filename}"))
         self.debug_menu.add_command(label = 'Print active objects', command = lambda : print(self.active_objects))
         self.debug_menu.add_command(label = 'Print active functions', command = lambda : print(self.active_functions))
         self.debug_menu.add_command(label = 'Print objects Treeview', command = lambda : self.print_objects_treeview())
+        self.debug_menu.add_command(label = 'Print cache statistics', command = lambda : self.print_cache_statistics())
+        self.debug_menu.add_command(label = 'Clear results cache', command = lambda : self.result_cache.clear())
+        self.strict_inputs_var = tk.BooleanVar(value = self.strict_inputs)
+        self.debug_menu.add_checkbutton(label = 'Strict inputs', variable = self.strict_inputs_var, command = lambda : self.set_strict_inputs(self.strict_inputs_var.get()))
+        self.track_memory_var = tk.BooleanVar(value = False)
+        self.debug_menu.add_checkbutton(label = 'Track memory', variable = self.track_memory_var, command = lambda : self.set_track_memory(self.track_memory_var.get()))
+        self.monitor_stalls_var = tk.BooleanVar(value = False)
+        self.debug_menu.add_checkbutton(label = 'Monitor stalls', variable = self.monitor_stalls_var, command = lambda : self.set_stall_monitor(self.monitor_stalls_var.get()))
+        self.debug_menu.add_command(label = 'Print stall statistics', command = lambda : self.print_stall_statistics())
 
         self.help_menu.add_cascade(label = 'Debug', menu = self.debug_menu)
 
@@ -599,11 +1570,32 @@ class Application:
 
 
 
+        # Status bar, showing whether functions are running
+        self.status_bar = tk.Frame(self.root)
+        self.status_bar.pack(side = "bottom", fill = "x")
+
+        self.status_label = tk.Label(self.status_bar, text = "Ready", anchor = "w")
+        self.status_progress = ttk.Progressbar(self.status_bar, mode = "determinate", length = 150)
+        self.cancel_button = ttk.Button(self.status_bar, text = "Cancel", command = lambda : self.cancel_run(), state = "disabled")
+        self.stall_label = tk.Label(self.status_bar, text = "", anchor = "e")            # Only shown whilst stalls are being monitored
+        self.stall_shown = 0.0                                                          # When the last stall was shown in it
+
+        self.cancel_button.pack(side = "right")
+        self.status_progress.pack(side = "right", padx = 5)
+        self.status_label.pack(side = "left", fill = "x", expand = True)
+
+        # Start checking for calls from the background threads
+        self.root.after(50, self.process_main_thread_calls)
+
         # Console print out
         self.console_widget = tk.scrolledtext.ScrolledText(self.root, height = 4, font = ("consolas", "8", "normal"))
         self.console_widget.pack(side = "bottom", fill = "both")
         self.console_widget.configure(state = "disabled")                                          # Make textbox read only
-        sys.stdout = TextRedirector(self.console_widget)
+        if console_log == TEMPORARY_LOG:
+            console_log = make_temporary_log("scigui_console_")
+
+        self.console = TextRedirector(self.console_widget, self.root, log_filename = console_log)
+        sys.stdout = self.console
         
 
 
@@ -618,7 +1610,7 @@ class Application:
 
         for i in range(len(self.objects)):
             object = self.objects[i]
-            self.add_object_menu.add_command(label = str(object.__name__), command = lambda i = i: self.obj_fnc_window("object", i))
+            self.add_object_menu.add_command(label = str(object.__name__), command = self.timed("obj_fnc_window", lambda i = i: self.obj_fnc_window("object", i)))
 
         self.objects_tree_rmb.add_command(label = "Add folder", command = lambda : self.add_folder())
         self.added_extra_object_menu_options = False
@@ -629,6 +1621,12 @@ class Application:
 
             # Select the object you right clicked on
             iid = self.objects_tree.identify_row(event.y)
+
+            # Clicking "Show more" in a large folder shows the next page, rather than selecting anything
+            if is_placeholder(iid):
+                open_objects_tree_item(self.objects_tree, self.active_objects, iid, object_image = self.object_image, folder_image = self.folder_image)
+                iid = ''
+
             if iid:
                 self.objects_tree.selection_set(iid)   
                 self.objects_tree.focus(iid)
@@ -645,7 +1643,7 @@ class Application:
             try:
                 # Check if we've selected an object, if so we can display the "Rename" and "Delete" options
                 if str(self.objects_tree.focus()) != '' and not self.added_extra_object_menu_options:
-                    self.objects_tree_rmb.add_command(label = "Edit", command = lambda : self.obj_fnc_window("object"))
+                    self.objects_tree_rmb.add_command(label = "Edit", command = self.timed("obj_fnc_window", lambda : self.obj_fnc_window("object")))
                     self.objects_tree_rmb.add_command(label = "Delete", command = lambda : self.delete_object())
                     self.added_extra_object_menu_options = True
 
@@ -666,11 +1664,16 @@ class Application:
                 if not isinstance(get_object(self.active_objects, self.objects_tree.focus()), dict):
                     self.obj_fnc_window("object")
 
-        self.objects_tree.bind("<Button-3>", objects_tree_right_click)
-        self.objects_tree.bind("<Button-1>", objects_tree_left_click)
-        self.objects_tree.bind("<B1-Motion>", self.move_object_drag, add = '+') 
-        self.objects_tree.bind("<ButtonRelease-1>", self.move_object_release)
-        self.objects_tree.bind('<Double-Button-1>', objects_tree_double_click)
+        # Each handler is timed whilst stalls are being monitored (see scigui.stalls)
+        self.objects_tree.bind("<Button-3>", self.timed("Objects tree right click", objects_tree_right_click))
+        self.objects_tree.bind("<Button-1>", self.timed("Objects tree click", objects_tree_left_click))
+        self.objects_tree.bind("<B1-Motion>", self.timed("Objects tree drag", self.move_object_drag), add = '+') 
+        self.objects_tree.bind("<ButtonRelease-1>", self.timed("Objects tree drop", self.move_object_release))
+        self.objects_tree.bind('<Double-Button-1>', self.timed("Objects tree double click", objects_tree_double_click))
+        self.objects_tree.bind("<<TreeviewOpen>>", self.timed("Objects tree open folder", lambda event : open_objects_tree_item(self.objects_tree, self.active_objects, 
+                                                                                                                                 self.objects_tree.focus(), 
+                                                                                                                                 object_image = self.object_image, 
+                                                                                                                                 folder_image = self.folder_image)))
         self.moving_object = False
 
         # Functions tree
@@ -685,7 +1688,7 @@ class Application:
 
         for i in range(len(self.functions)):
             function = self.functions[i]
-            self.add_function_menu.add_command(label = str(function.__name__), command = lambda i = i: self.obj_fnc_window("function", i))
+            self.add_function_menu.add_command(label = str(function.__name__), command = self.timed("obj_fnc_window", lambda i = i: self.obj_fnc_window("function", i)))
         
         self.added_extra_function_menu_options = False
 
@@ -709,12 +1712,15 @@ class Application:
                 # Check if we've selected an object, if so we can display the "Rename" and "Delete" options
                 if str(self.functions_tree.focus()) != '' and not self.added_extra_function_menu_options:
                     self.functions_tree_rmb.add_command(label = "Execute", command = lambda : self.execute_function())
-                    self.functions_tree_rmb.add_command(label = "Edit", command = lambda : self.obj_fnc_window("function"))
+                    self.functions_tree_rmb.add_command(label = "Sweep", command = lambda : self.sweep_window())
+                    self.functions_tree_rmb.add_command(label = "Run history", command = lambda : self.run_history_window(str(self.functions_tree.focus()).split("\\")[1]))
+                    self.functions_tree_rmb.add_command(label = "Profile", command = lambda : self.profile_functions(str(self.functions_tree.focus()).split("\\")[1]))
+                    self.functions_tree_rmb.add_command(label = "Edit", command = self.timed("obj_fnc_window", lambda : self.obj_fnc_window("function")))
                     self.functions_tree_rmb.add_command(label = "Delete", command = lambda : self.delete_function())
                     self.added_extra_function_menu_options = True
 
                 elif str(self.functions_tree.focus()) == '' and self.added_extra_function_menu_options:
-                    self.functions_tree_rmb.delete(1,4)
+                    self.functions_tree_rmb.delete(1,6)
                     self.added_extra_function_menu_options = False
                 
                 # Display the right click menu
@@ -728,21 +1734,360 @@ class Application:
             if str(self.functions_tree.focus()) != '':
                 self.obj_fnc_window("function")
 
-        self.functions_tree.bind("<Button-3>", functions_tree_right_click)
-        self.functions_tree.bind("<Button-1>", functions_tree_left_click)
-        self.functions_tree.bind("<B1-Motion>", self.move_function, add = '+') 
-        self.functions_tree.bind('<Double-Button-1>', functions_tree_double_click)
+        self.functions_tree.bind("<Button-3>", self.timed("Functions tree right click", functions_tree_right_click))
+        self.functions_tree.bind("<Button-1>", self.timed("Functions tree click", functions_tree_left_click))
+        self.functions_tree.bind("<B1-Motion>", self.timed("Functions tree drag", self.move_function), add = '+') 
+        self.functions_tree.bind('<Double-Button-1>', self.timed("Functions tree double click", functions_tree_double_click))
+
+
 
 
-        # Initialise data
-        functions = {}
-        objects = {}
 
+    def initialise_data(self, objects, functions, max_workers):
+        """Set up everything that doesn't need Tk, i.e. the workspace itself and the tools for running functions.
+
+        Args:
+            objects (list): The object classes the user can create.
+            functions (list): The function classes the user can create.
+            max_workers (int): Maximum number of functions to run at the same time, or None for the concurrent.futures default.
+        """
+        self.objects = [String] + objects + [Array]
+        self.functions = functions
+        self.open_file = None
+        self.modified_and_not_saved = False
+        self.max_workers = max_workers
+        self.strict_inputs = False              # Whether functions that edit their inputs raise an InputMutationError (see scigui.views)
+        self.objects_lock = threading.RLock()     # Held whilst functions write their outputs to active_objects, since they can run at the same time
+        self.backends = ExecutionBackends(classes = self.objects + self.functions, max_workers = max_workers)
+        self.result_cache = ResultCache()       # Only used by functions that opt in with cache_results()
+        self.payloads = PayloadStore()          # Large outputs of functions, which are saved separately (see scigui.payloads)
+        self.object_pool = ValuePool()          # Input values shared by objects with the same ones (see scigui.dedup)
+        self.instance_cache = InstanceCache()   # Objects built by ObjectStore.get_object()
+        self.stall_monitor = None               # Watches the Tk event loop for stalls, if turned on (see scigui.stalls)
+        self.history = RunHistory()             # How long each function took in the last few runs (see scigui.telemetry)
+
+        # Functions are run on a background thread. Anything they need to do with Tk is passed back to the main thread through this queue.
+        self.main_thread_calls = queue.Queue()
+        self.background_thread = None
+        self.cancel_event = threading.Event()
+        self.figure_canvases = []               # Plots made by the functions that are running, which need to be drawn once each function finishes
+
+        # Changes to active_objects waiting to be shown in the objects Treeview (see apply_tree_events())
+        self.tree_events = []
+        self.tree_events_lock = threading.Lock()
+        self.tree_events_scheduled = False
+
+        # Workspace database that every change to active_objects is saved to, if one is open (see scigui.database)
+        self.database = None
+
+        # Journal that every change is written to whilst a JSON workspace is open, so it's autosaved and can be recovered after a crash (see scigui.journal)
+        self.autosave = True
+        self.journal = None
 
+        # Current list of objects and functions the user has added
+        self.active_objects = None
+        self.active_functions = {}
+        self.objects_generation = 0             # Increased whenever objects are added, removed, moved or replaced (see objects_changed())
+        self.set_active_objects(ObjectTree())
 
     def run(self):
         self.root.mainloop()
 
+    def objects_changed(self):
+        """Record that objects have been added, removed, moved or replaced, so anything that has saved where links point to (e.g. execution plans) checks them again.
+        This is called automatically for every change to active_objects (see on_objects_event()), and must be called after anything else that changes what a link gives."""
+        with self.objects_lock:
+            self.objects_generation += 1
+
+    def set_active_objects(self, active_objects):
+        """Replace all the active objects, e.g. when a file is opened. This doesn't update the objects Treeview. If a workspace database is open, the new objects
+        replace the ones in it.
+
+        Args:
+            active_objects (ObjectTree): The new objects.
+        """
+        if self.active_objects is not None:
+            self.active_objects.remove_listener(self.on_objects_event)
+
+        self.active_objects = active_objects
+        self.active_objects.add_listener(self.on_objects_event)
+        self.objects_changed()
+
+        if self.database is not None:
+            self.database.attach(self.active_objects, write = True)
+
+        if self.journal is not None:
+            self.journal.attach(self.active_objects, write = True)
+
+    def functions_changed(self, key = None):
+        """Record that active_functions has changed (a function was added, edited, deleted, moved or run), so the change is autosaved.
+
+        Args:
+            key (str, optional): The only function that changed, e.g. one that was just run, so only it is autosaved. Functions that aren't active (e.g. the copies
+                                 made by a sweep) aren't saved, so don't need autosaving. Defaults to None, which autosaves all of them.
+        """
+        if self.journal is None:
+            return
+
+        if key is None:
+            self.journal.write_functions(self.active_functions)
+
+        elif key in self.active_functions:
+            self.journal.write_function(key, self.active_functions[key])
+
+    def close_journal(self, compact = True):
+        """Stop autosaving the open workspace, if it's being autosaved.
+
+        Args:
+            compact (bool, optional): Whether to put any changes that haven't been saved yet into the autosave, so they're recovered the next time the workspace
+                                      is opened. Defaults to True.
+        """
+        if self.journal is not None:
+            self.journal.close(compact = compact)
+            self.journal = None
+
+    def discard_journal(self):
+        """Stop autosaving the open workspace, and throw away any changes that haven't been saved yet, e.g. when the user chooses not to keep them. The
+        workspace file is left as it was last saved (see scigui.journal)."""
+        if self.journal is not None:
+            filename = self.journal.filename
+            self.close_journal(compact = False)
+            delete_journal(filename)
+
+    def close_database(self):
+        # Stop saving changes to the open workspace database, if there is one
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+    def on_objects_event(self, event, iid, new_iid = None):
+        # Called by active_objects straight after anything in it changes, which can be on any thread
+        self.objects_changed()
+        self.queue_tree_event(event, iid, new_iid)
+
+    def queue_tree_event(self, event, iid, new_iid = None):
+        """Queue a change to active_objects to be shown in the objects Treeview. Changes made on the main thread are shown straight away, and changes made by
+        functions on other threads are shown together the next time the main thread checks its queue."""
+        with self.tree_events_lock:
+            self.tree_events.append((event, iid, new_iid))
+
+            if self.tree_events_scheduled:
+                return
+
+            self.tree_events_scheduled = True
+
+        self.call_in_main_thread(self.apply_tree_events, wait = False)
+
+    def apply_tree_events(self):
+        """Update the objects Treeview with any changes that have been queued. Only the items that changed are touched, so which folders are open, the selection
+        and the scroll position are all kept. This must be called from the main thread."""
+        with self.tree_events_lock:
+            events = self.tree_events
+            self.tree_events = []
+            self.tree_events_scheduled = False
+
+        if len(events) == 0:
+            return
+
+        treeview = self.objects_tree
+        selection = treeview.selection()
+        focus = treeview.focus()
+        scroll_position = treeview.yview()[0]
+        moved = []                      # (old IID, new IID) of everything moved, so the selection can follow it
+        opened = set()                  # IIDs of folders that were open before being moved or replaced
+        changed_folders = set()         # Folders where items were added, removed, replaced or reordered
+
+        def remember_open(iid, new_iid):
+            if treeview.exists(iid) and treeview.tag_has("folder", iid):
+                if treeview.item(iid, "open"):
+                    opened.add(new_iid)
+
+                for child_iid in treeview.get_children(iid):
+                    remember_open(child_iid, new_iid + child_iid[len(iid):])
+
+        with self.objects_lock:
+            for event, iid, new_iid in events:
+                if event == "reorder":
+                    changed_folders.add(iid)
+                    continue
+
+                # IIDs can't be changed in a Treeview, so moved items are removed and added again with their new IIDs. Replaced items are added again too, since
+                # a folder's contents need to be shown again.
+                if event in ("move", "replace"):
+                    remember_open(iid, new_iid if event == "move" else iid)
+
+                    if treeview.exists(iid):
+                        treeview.delete(iid)
+
+                if event == "move":
+                    moved.append((iid, new_iid))
+                    changed_folders.add(new_iid.rpartition("\\")[0])
+
+                changed_folders.add(iid.rpartition("\\")[0])
+
+            # Only the folders that changed are updated, and only if they're being shown
+            for folder_iid in changed_folders:
+                update_objects_tree_folder(treeview, self.active_objects, folder_iid, object_image = self.object_image, folder_image = self.folder_image, opened = opened)
+
+        # Keep the selection on items that were moved or renamed
+        def follow(iid):
+            for old_iid, new_iid in moved:
+                if iid == old_iid or iid.startswith(old_iid + "\\"):
+                    iid = new_iid + iid[len(old_iid):]
+
+            return iid
+
+        new_selection = tuple(iid for iid in map(follow, selection) if treeview.exists(iid))
+
+        if new_selection != treeview.selection():
+            treeview.selection_set(new_selection)
+
+        if focus != "" and treeview.exists(follow(focus)):
+            treeview.focus(follow(focus))
+
+        treeview.yview_moveto(scroll_position)
+
+    def call_in_main_thread(self, function, *args, wait = True, **kwargs):
+        """Call a function on the main thread. This is needed for anything that uses Tk, since it can only be used from the main thread.
+
+        Args:
+            function (callable): The function to call. Any other arguments are passed to it.
+            wait (bool, optional): Whether to wait for the function to finish and return its result. Defaults to True.
+
+        Returns:
+            The result of the function, or None if not waiting.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return function(*args, **kwargs)
+
+        call = MainThreadCall(function, args, kwargs, wait)
+        self.main_thread_calls.put(call)
+
+        if wait:
+            return call.get_result()
+
+    def process_main_thread_calls(self):
+        """Run any calls that other threads have passed to the main thread. This keeps re-scheduling itself using after()."""
+        while True:
+            try:
+                call = self.main_thread_calls.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                call.run()
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+
+        self.root.after(50, self.process_main_thread_calls)
+
+    def set_status(self, text, progress = None, total = None):
+        """Update the status bar. This can be called from any thread.
+
+        Args:
+            text (str): Text to show.
+            progress (int, optional): Number of steps completed. Defaults to None, which clears the progress bar.
+            total (int, optional): Total number of steps. Defaults to None.
+        """
+        def update():
+            self.status_label.configure(text = text)
+
+            if progress is None or not total:
+                self.status_progress.configure(value = 0)
+            else:
+                self.status_progress.configure(maximum = total, value = progress)
+
+        self.call_in_main_thread(update, wait = False)
+
+    def is_running(self):
+        return self.background_thread is not None
+
+    def check_not_running(self, action, parent = None):
+        """Check that no functions are running before changing the objects or functions, since running functions read and write them from another thread.
+        This must be called from the main thread.
+
+        Args:
+            action (str): What the user is trying to do, for the popup, e.g. "delete objects".
+            parent (tk.Toplevel, optional): Window to open the popup over. Defaults to None, which uses the main window.
+
+        Returns:
+            bool: True if nothing is running, or False (after telling the user) if functions are running.
+        """
+        if not self.is_running():
+            return True
+
+        open_popup(parent or self.root, "Functions running", f"Cannot {action} whilst functions are running. Wait for them to finish, or cancel them first.")
+        return False
+
+    def run_in_background(self, task, description):
+        """Run a task (e.g. executing functions) on a background thread, so the window doesn't freeze. Only one task can run at a time.
+
+        Args:
+            task (callable): The task to run. It should check self.cancel_event if it can be cancelled part way through.
+            description (str): Text to show in the status bar whilst the task is running.
+
+        Returns:
+            bool: True if the task was started, or False if another task was already running.
+        """
+        if self.is_running():
+            self.popup("Already running", "Functions are already running. Wait for them to finish, or cancel them first.")
+            return False
+
+        def finished(exception):
+            self.background_thread = None
+            self.cancel_button.configure(state = "disabled")
+            self.set_status("Ready")
+
+            # Report errors like any other Tk callback
+            if exception is not None:
+                raise exception
+
+        def target():
+            exception = None
+
+            try:
+                # Every function the task runs is part of the same run in the history (see scigui.telemetry)
+                with self.history.run(description):
+                    task()
+
+            except RunCancelled:
+                print("Run cancelled")
+
+            except Exception as e:
+                exception = e
+
+            finally:
+                self.call_in_main_thread(finished, exception, wait = False)
+
+        self.cancel_event.clear()
+        self.cancel_button.configure(state = "normal")
+        self.set_status(description)
+
+        self.background_thread = threading.Thread(target = target, name = "scigui-run", daemon = True)
+        self.background_thread.start()
+        return True
+
+    def cancel_run(self):
+        """Stop a run after the functions that have already started have finished."""
+        if self.is_running():
+            print("Cancelling...")
+            self.cancel_event.set()
+            self.set_status("Cancelling...")
+
+    def refresh_objects_tree(self):
+        """Show any changes to the objects that haven't been applied to the objects tree yet. This can be called from any thread."""
+        self.call_in_main_thread(self.apply_tree_events, wait = False)
+
+    def draw_figures(self):
+        """Draw any plots made by functions running on other threads. This can be called from any thread."""
+        def draw():
+            for figure_canvas in self.figure_canvases:
+                figure_canvas.draw_idle()
+
+            self.figure_canvases = []
+
+        self.call_in_main_thread(draw, wait = False)
+
     def hide_all(self, event):
         for child in self.root.children.values():
             if isinstance(child, tk.Toplevel):
@@ -755,19 +2100,65 @@ class Application:
 
 
     def on_closing(self):
+        keep_changes = True
+
         if self.modified_and_not_saved:
-            if tk.messagebox.askyesno("Quit", "File not saved, do you still want to quit?"):
-                self.root.destroy()
-        
+            if self.journal is not None:
+                # The changes are autosaved, so they can either be kept until the file is next opened, or thrown away. The file itself is only changed by saving.
+                keep_changes = tk.messagebox.askyesnocancel("Quit", "File not saved, do you want to keep the changes? They will be recovered the next time the file is opened.")
+
+                if keep_changes is None:
+                    return
+
+            elif not tk.messagebox.askyesno("Quit", "File not saved, do you still want to quit?"):
+                return
+
+        self.cancel_event.set()
+        self.backends.shutdown()
+        self.close_database()
+
+        if keep_changes:
+            self.close_journal()
         else:
-            self.root.destroy()
+            self.discard_journal()
+
+        self.payloads.close()
+        self.set_stall_monitor(False)
+        self.close_console()
+        self.root.destroy()
+
+    def close_console(self):
+        # Anything printed after the window has gone goes to the terminal instead
+        sys.stdout = sys.__stdout__
+        self.console.close()
 
 
+    def set_open_file(self, filename):
+        """Change which file the workspace is saved in, e.g. when a file is opened or saved as a different file. The on-disk results cache (see scigui.cache)
+        goes next to the file, so it always moves with it.
+
+        Args:
+            filename (str): The .sgui file, or None for a new workspace that hasn't been saved yet.
+        """
+        self.open_file = filename
+        self.result_cache.set_directory(filename + ".cache" if filename is not None else None)
+
     def new(self):
+        if not self.check_not_running("start a new file"):
+            return
+
         def proceed():
+            # Close the database and journal first, so clearing the objects doesn't clear them from the file too. The user chose not to keep any changes
+            # that haven't been saved, so they're thrown away rather than put in the file.
+            self.close_database()
+            self.discard_journal()
             self.clear_all_objects(popup = False)
             self.clear_all_functions(popup = False)
-            self.open_file = None
+            self.set_open_file(None)
+            self.payloads.set_directory(None)
+            self.object_pool.clear()
+            self.instance_cache.clear()
+            self.history.clear()
             self.modified_and_not_saved = False
         
         if self.modified_and_not_saved:
@@ -778,30 +2169,103 @@ class Application:
             proceed()
 
     def load_file(self, filename, refresh_treeviews = True, print_msg = True):
-        # Convert file to dictionary
-        with open(filename) as f:
-            json_opened = json.load(f)
-        
         # Convert the dictionary-stored objects and functions to ObjectStore and FunctionStore objects
-        def convert_to_stores(dict):
+        def convert_to_store(dictionary):
+            if ObjectStore.check_if_json_form(dictionary):
+                return ObjectStore.from_json_form(application = self, dict_from_json = dictionary, shared = shared)
 
-            for key in dict.keys():
+            elif FunctionStore.check_if_json_form(dictionary):
+                return FunctionStore.from_json_form(application = self, dict_from_json = dictionary)
 
-                if ObjectStore.check_if_json_form(dict[key]):
-                    dict[key] = ObjectStore.from_json_form(application = self, dict_from_json = dict[key])
+            else:
+                raise ValueError(f"Could not load '{filename}', it contains something that isn't an object or a function: {dictionary}")
 
-                elif FunctionStore.check_if_json_form(dict[key]):
-                    dict[key] = FunctionStore.from_json_form(application = self, dict_from_json = dict[key])
+        def show_progress(bytes_read, total_bytes):
+            self.set_status(f"Loading {os.path.basename(filename)}...", progress = bytes_read, total = total_bytes)
 
-                else:
-                    convert_to_stores(dict[key])
-        
-        convert_to_stores(json_opened)
+            if self.root is not None:
+                self.root.update_idletasks()
+
+        def make_lazy_store(object_index, loader):
+            # Objects in a database aren't read until they're needed
+            def load_dictionary():
+                dictionary = loader()
+                del dictionary["\\OBJECT_INDEX\\"]
+
+                if "\\INPUTS\\" in dictionary:
+                    dictionary["\\INPUTS\\"] = shared.resolve(self.payloads.load_references(dictionary["\\INPUTS\\"]))
+
+                return dictionary
+
+            return ObjectStore(application = self, index = object_index, dictionary = None, loader = load_dictionary)
+
+        def read_section(name, data):
+            if name == "Shared":
+                shared.update(data)
+            elif name == "History":
+                history.update(data)
+
+        # Put any changes to the workspace that's open into its autosave first, in case it's the same file
+        self.close_journal()
+
+        # Values shared by more than one object are read from the "Shared" section the first time an object uses them (see scigui.dedup)
+        shared = SharedSection(self.object_pool, convert = lambda json_form : self.payloads.load_references({"" : json_form})[""])
+
+        active_objects = ObjectTree()
+        active_functions = {}
+        history = {}
+        database = None
+        source = filename
+        sequence = 0
+        num_recovered = 0
+
+        if is_database(filename):
+            # Only the folders, and where each object is, are read now (see scigui.database)
+            database = WorkspaceDatabase(filename)
+
+            try:
+                sections = database.read_sections()
+                shared.update(sections.get("Shared", {}))
+                history.update(sections.get("History", {}))
+                database.read_objects(active_objects, make_store = make_lazy_store)
+                active_functions = {name : convert_to_store(json_form) for name, json_form in database.read_functions().items()}
+            except BaseException:
+                database.close()
+                raise
+
+        else:
+            # Changes that were autosaved but not saved are read from the autosave instead of the file (see scigui.journal)
+            source = get_recovery_filename(filename) if self.autosave else filename
+
+            # Read the file a piece at a time, converting each object and function as it's read (see scigui.workspace)
+            try:
+                sections = read_workspace(source, objects = active_objects, functions = active_functions, convert = convert_to_store, progress = show_progress,
+                                          on_section = read_section)
+            finally:
+                self.set_status("Ready")
+
+            # Replay any changes that were made after it was last saved, if the program stopped before it could save them (see scigui.journal)
+            sequence = get_sequence(sections)
+
+            if self.autosave:
+                for record in read_journal(filename, sequence):
+                    apply_record(active_objects, active_functions, record, convert = convert_to_store)
+                    sequence = record["Sequence"]
+                    num_recovered += 1
+
+        # Overwrite our active functions and active objects. Any database that was open is closed first, so they don't replace what's in it.
+        self.close_database()
+        self.set_active_objects(active_objects)
+        self.active_functions = active_functions
+
+        if database is not None:
+            self.database = database
+            self.database.attach(self.active_objects)
+
+        elif self.autosave:
+            self.journal = Journal(filename, sequence = sequence)
+            self.journal.attach(self.active_objects)
 
-        # Overwrite our active functions and active objects
-        self.active_objects = json_opened["Objects"].copy()
-        self.active_functions = json_opened["Functions"].copy()
-        
         if refresh_treeviews:
             # Re-render the TreeViews
             self.objects_tree.delete(*self.objects_tree.get_children())
@@ -811,38 +2275,111 @@ class Application:
             fill_functions_tree(treeview = self.functions_tree, dictionary = self.active_functions)
 
         # Keep track of which file we opened
-        self.open_file = filename
+        self.set_open_file(filename)
+        self.payloads.set_directory(filename + ".payloads")
+        self.object_pool.collect(self.active_objects)
+        self.instance_cache.clear()
+        self.history.load_json_form(history)
 
         if print_msg:
             print(f"Loaded file {self.open_file}")
 
-    def save_file(self, filename):
-        # Get the dict we want to save
-        save_dict = {"Objects" : self.active_objects.copy(), "Functions" : self.active_functions.copy()}
+        if database is None and source != filename:
+            print(f"Recovered the changes that hadn't been saved from {source}")
+            self.modified_and_not_saved = True
 
-        # Go through the dictionary, and convert any ObjectStore or FunctionStore objects to their dictionary forms
-        def convert_stores(dict):
-            for key in dict.keys():
-                if isinstance(dict[key], ObjectStore) or isinstance(dict[key], FunctionStore):
-                    dict[key] = dict[key].to_json_form()
-            
-                else:
-                    convert_stores(dict[key])
+        if num_recovered > 0:
+            print(f"Recovered {num_recovered} changes that hadn't been saved")
+            self.modified_and_not_saved = True
 
-        convert_stores(save_dict)
+    def save_file(self, filename, as_database = None):
+        """Save the workspace.
 
-        # Save to a .json file
-        with open(filename, 'w') as fp:
-            json.dump(save_dict, fp)
-        
-        # Load the .json file we saved (this is a bit inefficient, but a placeholder due to issues with trying to make a deepcopy of active_objects)
-        self.load_file(filename, refresh_treeviews = False, print_msg = False)
+        Args:
+            filename (str): The .sgui file to save to.
+            as_database (bool, optional): Whether to save it as a workspace database (see scigui.database) rather than JSON. Defaults to None, which keeps
+                                          whichever format is open.
+        """
+        if as_database is None:
+            as_database = self.database is not None
+
+        # Functions running in the background can't write their outputs whilst we're saving. The objects and functions are written straight to the file,
+        # without being copied or changed (see scigui.workspace).
+        with self.objects_lock:
+            # Payloads go next to the file, before it's written, so it never refers to one that isn't there (see scigui.payloads)
+            self.payloads.copy_to(filename + ".payloads", self.active_objects)
+
+            if as_database and self.database is not None and os.path.abspath(filename) == os.path.abspath(self.database.filename):
+                # Every change to the objects has already been saved, so only the functions (and the run history) need writing
+                self.database.write_functions(self.active_functions)
+                self.database.write_section("History", self.history.to_json_form())
+
+            elif as_database:
+                # The changes are in the new file now, so the old file stays as it was last saved
+                self.discard_journal()
+                write_database(filename, objects = self.active_objects, functions = self.active_functions, sections = {"History" : self.history.to_json_form()})
+
+                # Carry on saving changes to the new database. Writing it read every object, so none of them need the old one any more.
+                self.close_database()
+                self.database = WorkspaceDatabase(filename)
+                self.database.attach(self.active_objects)
+
+            elif self.autosave:
+                # A different file starts a new journal, and any old journal next to it is out of date
+                if self.journal is None or os.path.abspath(filename) != os.path.abspath(self.journal.filename):
+                    self.discard_journal()
+                    delete_journal(filename)
+                    self.journal = Journal(filename)
+                    self.journal.attach(self.active_objects)
+
+                self.journal.save(lambda sections : self.write_json_workspace(filename, sections = sections))
+                self.close_database()
+
+            else:
+                self.write_json_workspace(filename)
+                delete_journal(filename)
+                self.close_database()
+
+            # The file now refers to exactly the payloads the objects do, so any others aren't needed
+            if self.database is None:
+                self.payloads.collect_garbage(self.active_objects)
+
+            self.object_pool.collect(self.active_objects)
+
+        # Keep track of which file we saved to
+        if self.open_file is None or os.path.abspath(filename) != os.path.abspath(self.open_file):
+            self.set_open_file(filename)
 
         print("Saved to {}".format(filename))
 
         self.modified_and_not_saved = False
 
+    def write_json_workspace(self, filename, sections = None):
+        """Write the workspace to a JSON file, with each value that's shared by more than one object saved once (see scigui.dedup). This must be called whilst
+        holding objects_lock.
+
+        Args:
+            filename (str): The .sgui file.
+            sections (dict, optional): Any other sections to save, as {name : data}. Defaults to None.
+        """
+        shared = self.object_pool.shared_values(self.active_objects)
+        sections = dict(sections or {})
+
+        if len(self.history.runs) > 0:
+            sections["History"] = self.history.to_json_form()
+
+        if len(shared) > 0:
+            sections["Shared"] = section_to_json_form(shared)
+
+        write_workspace(filename, objects = self.active_objects, functions = self.active_functions, sections = sections,
+                        encoder = SharingEncoder(self.object_pool, shared))
+
     def open(self):
+        if not self.check_not_running("open a file"):
+            return
+
+        proceed = False
+
         if self.modified_and_not_saved:
             if tk.messagebox.askyesno("Open file", "Program not saved, do you still want to open a new file?"):
                 proceed = True
@@ -864,6 +2401,10 @@ class Application:
                 pass
 
             else:
+                # The user chose not to keep any changes that haven't been saved, so they aren't put in the file when load_file() closes the journal
+                if self.modified_and_not_saved:
+                    self.discard_journal()
+
                 self.load_file(filename)
 
     def save(self):
@@ -874,7 +2415,7 @@ class Application:
         else:
             self.save_file(self.open_file)
 
-    def save_as(self):
+    def save_as(self, as_database = None):
         if self.open_file == None:
             initialdir = "/"
         else:
@@ -888,7 +2429,7 @@ class Application:
 
         else:
             filename = filename.name
-            self.save_file(filename)
+            self.save_file(filename, as_database = as_database)
 
 
 
@@ -900,15 +2441,17 @@ class Application:
             body_text (str): The text to appear in the body
 
         """
-        open_popup(self.root, title_text = title_text, body_text = body_text)
+        self.call_in_main_thread(open_popup, self.root, title_text = title_text, body_text = body_text)
 
 
 
     def clear_all_objects(self, popup = True):
+        if not self.check_not_running("clear all objects"):
+            return
 
         def proceed():
             self.objects_tree.delete(*self.objects_tree.get_children())
-            self.active_objects = {}
+            self.set_active_objects(ObjectTree())
 
         if popup:
             self.yes_no_popup("Clear all objects", "Are you sure you want to clear all objects?", lambda : proceed(), default = "No")
@@ -917,21 +2460,130 @@ class Application:
             proceed()
 
     def clear_all_functions(self, popup = True):
+        if not self.check_not_running("clear all functions"):
+            return
 
         def proceed():
             self.functions_tree.delete(*self.functions_tree.get_children())
             self.active_functions = {}
+            self.functions_changed()
         
         if popup:
             self.yes_no_popup("Clear all functions", "Are you sure you want to clear all functions?", lambda : proceed(), default = "No")
 
-        else:
-            proceed()
+        else:
+            proceed()
+
+    def clear_console(self):
+        self.console_widget.configure(state = 'normal')
+        self.console_widget.delete('1.0', 'end')
+        self.console_widget.configure(state = 'disabled')
+
+    def print_cache_statistics(self):
+        print("Results cache statistics:")
+
+        for key, value in self.result_cache.statistics().items():
+            print(f"    {key}: {value}")
+
+        print("Object cache statistics:")
+
+        for key, value in self.instance_cache.statistics().items():
+            print(f"    {key}: {value}")
+
+        print("Payload statistics:")
+
+        for key, value in self.payloads.statistics().items():
+            print(f"    {key}: {value}")
+
+        print("Shared value statistics:")
+
+        for key, value in self.object_pool.statistics(self.active_objects).items():
+            print(f"    {key}: {value}")
+
+    def set_strict_inputs(self, strict):
+        """Choose whether functions that edit their inputs should raise an error, rather than being given a copy of the input they edit.
+
+        Args:
+            strict (bool): Whether to raise an error.
+        """
+        self.strict_inputs = strict
+        print(f"Strict inputs {'on' if strict else 'off'}")
+
+    def set_track_memory(self, enabled):
+        """Choose whether to record the peak memory use of each function in the run history. This slows down running functions.
+
+        Args:
+            enabled (bool): Whether to record it.
+        """
+        set_memory_tracking(enabled)
+        print(f"Memory tracking {'on' if enabled else 'off'}")
+
+    def timed(self, name, handler):
+        """Wrap an event handler, so it's timed whilst stalls are being monitored (see scigui.stalls).
+
+        Args:
+            name (str): What the handler is, e.g. "Objects tree double click".
+            handler (callable): The handler.
+
+        Returns:
+            callable: The wrapped handler, to bind instead.
+        """
+        def timed_handler(*args, **kwargs):
+            if self.stall_monitor is None:
+                return handler(*args, **kwargs)
+
+            with self.stall_monitor.handler(name):
+                return handler(*args, **kwargs)
+
+        return timed_handler
+
+    def set_stall_monitor(self, enabled):
+        """Start or stop watching the event loop for stalls, which are shown in the status bar and added to the stall log.
+
+        Args:
+            enabled (bool): Whether to watch for them.
+        """
+        if enabled and self.stall_monitor is None:
+            if self.stall_log == TEMPORARY_LOG:
+                self.stall_log = make_temporary_log("scigui_stalls_")
+
+            self.stall_monitor = StallMonitor(self.root, log_filename = self.stall_log, on_update = self.show_stall_status)
+            self.stall_label.configure(text = "UI lag 0 ms", foreground = "black")
+            self.stall_label.pack(side = "right", padx = 5, after = self.status_progress)
+            print(f"Monitoring stalls{f', which are logged to {self.stall_log}' if self.stall_log is not None else ''}")
+
+        elif not enabled and self.stall_monitor is not None:
+            self.stall_monitor.stop()
+            self.stall_monitor = None
+            self.stall_label.pack_forget()
+            print("Stopped monitoring stalls")
+
+    def show_stall_status(self, text, stalled):
+        # A stall stays in the status bar until the next one, or until the event loop has been running smoothly for a while
+        if stalled:
+            self.stall_label.configure(text = text, foreground = "red")
+            self.stall_shown = time.perf_counter()
+
+        elif time.perf_counter() - self.stall_shown > 10:
+            self.stall_label.configure(text = text, foreground = "black")
+
+    def print_stall_statistics(self):
+        if self.stall_monitor is None:
+            print("Stalls aren't being monitored. Turn on Debug > Monitor stalls first.")
+            return
+
+        statistics = self.stall_monitor.statistics()
+        handlers = statistics.pop("Handlers")
+
+        print("Stall statistics:")
 
-    def clear_console(self):
-        self.console_widget.configure(state = 'normal')
-        self.console_widget.delete('1.0', 'end')
-        self.console_widget.configure(state = 'disabled')
+        for key, value in statistics.items():
+            print(f"    {key}: {value:.3f}" if isinstance(value, float) else f"    {key}: {value}")
+
+        print("Handler times:")
+
+        for name, times in handlers.items():
+            print(f"    {name}: {times['Calls']} calls, {times['Total']:.3f} s total, {times['Longest']:.3f} s longest")
 
     def print_objects_treeview(self):
 
@@ -945,8 +2597,19 @@ class Application:
         print_children('')
 
     def move_object_drag(self, event):
+        if self.is_running():
+            # Nothing is moved whilst functions are running, and move_object_release() tells the user why once they let go
+            self.moving_object = True
+            self.root.config(cursor = "X_cursor")
+            return
+
         treeview = event.widget
         moveto_iid = str(treeview.identify_row(event.y))
+
+        # Hovering over "Show more" is the same as hovering over the folder it's in
+        if is_placeholder(moveto_iid):
+            moveto_iid = str(treeview.parent(moveto_iid))
+
         moveto_parent_iid = str(treeview.parent(moveto_iid))
 
         try: 
@@ -990,20 +2653,19 @@ class Application:
             treeview.move(self.original_item_iid, self.original_parent_iid, index_to_actually_move_to)   
 
             # Get the new order of the dictionary keys
-            iid_list = treeview.get_children(self.original_parent_iid)
+            iid_list = [iid for iid in treeview.get_children(self.original_parent_iid) if not is_placeholder(iid)]
             key_list = [None] * len(iid_list)
 
             for i in range(len(iid_list)):
                 key_list[i] = iid_list[i].split("\\")[-1]
-            
-            # Recreate the dictionary in the correct order
-            original_dict = get_object(active_objects = self.active_objects, iid = self.original_parent_iid)
-            new_dict = {}
 
-            for key in key_list:
-                new_dict[key] = original_dict[key]
-
-            set_object(database = self.active_objects, iid = self.original_parent_iid, to_add = new_dict)
+            # Anything in a large folder that isn't being shown yet stays after everything that is
+            folder = self.active_objects.find_folder(self.original_parent_iid)
+            shown_keys = set(key_list)
+            key_list += [key for key in folder.keys() if key not in shown_keys]
+            
+            # Put the folder in the same order
+            folder.reorder(key_list)
 
             self.modified_and_not_saved = True
 
@@ -1031,9 +2693,19 @@ class Application:
 
         if self.moving_object:
 
+            if not self.check_not_running("move objects"):
+                self.root.config(cursor = "arrow")
+                self.moving_object = False
+                return
+
             # Should make this do the 'move into folder' action. So moving into a folder only occurs if you release the LMB, whilst hovering over a folder
             treeview = event.widget
             moveto_iid = str(treeview.identify_row(event.y))
+
+            # Releasing over "Show more" is the same as releasing over the folder it's in
+            if is_placeholder(moveto_iid):
+                moveto_iid = str(treeview.parent(moveto_iid))
+
             moveto_parent_iid = str(treeview.parent(moveto_iid))
 
             if (moveto_iid == ""                                                            # Released without hovering over any of the existing objects
@@ -1046,7 +2718,6 @@ class Application:
               
                 # Delete item from old position, and add it to the top
                 key = self.original_item_iid.split("\\")[-1]
-                original_parent = get_object(active_objects = self.active_objects, iid = self.original_parent_iid)
 
                 if key in self.active_objects.keys():
                     self.popup("Move Object Error", "Cannot move this object into the new folder, it already has an item in it with the same name.")
@@ -1054,12 +2725,8 @@ class Application:
                     self.moving_object = False
                     return
 
-                self.active_objects[key] = original_parent[key]
-                del original_parent[key]
-
-                # Delete the old object and re-render the treeview (we can't just move the objects around - the IIDs need to change due to the folder change)
-                treeview.delete(self.original_item_iid)
-                fill_objects_tree(treeview, self.active_objects, self.object_image, self.folder_image)
+                # The treeview is updated by apply_tree_events() (the IIDs need to change due to the folder change, so the item is re-inserted there)
+                self.active_objects.move(self.original_item_iid, "\\" + key)
                 self.modified_and_not_saved = True
                 
             elif (moveto_iid != "" 
@@ -1071,7 +2738,6 @@ class Application:
                 
                 # Delete item from old folder, add it to the new folder
                 key = self.original_item_iid.split("\\")[-1]
-                original_parent = get_object(active_objects = self.active_objects, iid = self.original_parent_iid)
                 new_parent = get_object(active_objects = self.active_objects, iid = moveto_iid)
 
                 if key in new_parent.keys():
@@ -1080,12 +2746,7 @@ class Application:
                     self.moving_object = False
                     return
 
-                new_parent[key] = original_parent[key]
-                del original_parent[key]
-
-                # Delete the old object and re-render the treeview (we can't just move the objects around - the IIDs need to change due to the folder change)
-                treeview.delete(self.original_item_iid)
-                fill_objects_tree(treeview, self.active_objects, self.object_image, self.folder_image)
+                self.active_objects.move(self.original_item_iid, moveto_iid + "\\" + key)
                 self.modified_and_not_saved = True
 
             elif (not isinstance(get_object(self.active_objects, moveto_iid), dict)     # Object selected
@@ -1103,38 +2764,9 @@ class Application:
                     self.moving_object = False
                     return
 
-                # Get the list of things we want in the target folder
+                # Move the item to just below the one it was released on
                 moveto_index = treeview.index(moveto_iid)
-                iid_list = list(treeview.get_children(moveto_parent_iid))
-                iid_list.insert(moveto_index + 1, self.original_item_iid)           # Insert where we want the new item
-                key_list = [None] * len(iid_list)
-
-                for i in range(len(iid_list)):
-                    key_list[i] = iid_list[i].split("\\")[-1]
-
-                old_moveto_parent = get_object(active_objects = self.active_objects, iid = moveto_parent_iid)
-                new_moveto_parent = {}
-
-                for key in key_list:
-                    if key in old_moveto_parent.keys():
-                        # Add the original items
-                        new_moveto_parent[key] = old_moveto_parent[key]
-
-                    else:
-                        # Add the new item at the right position
-                        new_moveto_parent[key] = get_object(active_objects = self.active_objects, iid = self.original_item_iid)
-
-                set_object(database = self.active_objects, iid = moveto_parent_iid, to_add = new_moveto_parent)
-
-                # Delete original object
-                original_parent = get_object(active_objects = self.active_objects, iid = self.original_parent_iid)
-                del original_parent[self.original_item_iid.split("\\")[-1]]
-
-                # Delete the old object and re-render the treeview (we can't just move the objects around - the IIDs need to change due to the folder change)
-                treeview.delete(self.original_item_iid)
-                fill_objects_tree(treeview, self.active_objects, self.object_image, self.folder_image)
-                new_iid = moveto_parent_iid + "\\" + self.original_item_iid.split("\\")[-1]
-                treeview.move(new_iid, moveto_parent_iid, moveto_index + 1)
+                self.active_objects.move(self.original_item_iid, moveto_parent_iid + "\\" + key, position = moveto_index + 1)
                 self.modified_and_not_saved = True
 
             else:
@@ -1145,6 +2777,10 @@ class Application:
             self.moving_object = False
 
     def move_function(self, event):
+        # The functions can't be reordered whilst they're running. This is called for every movement of the mouse, so there's no popup.
+        if self.is_running():
+            return
+
         treeview = event.widget
         moveto_index = treeview.index(treeview.identify_row(event.y))   
 
@@ -1171,6 +2807,7 @@ class Application:
             new_dict[key] = self.active_functions[key]
 
         self.active_functions = new_dict.copy()
+        self.functions_changed()
         self.modified_and_not_saved = True
 
 
@@ -1272,11 +2909,14 @@ class Application:
                 open_popup(self.new_folder_window, "Name error", "Name cannot be blank.")
                 return
 
+            elif not self.check_not_running("change folders", parent = self.new_folder_window):
+                return
+
             else:
 
                 # If the user selected a dictionary, that means they clicked on a folder, so add the new item under it. The exception is if they're editing a folder.
                 # Otherwise they clicked on an object, so add the new item in the same folder as that object
-                if (editing) or (type(selected_object) is not dict):
+                if (editing) or (not isinstance(selected_object, dict)):
                     key_list.pop(-1)
 
                 # Edit the active objects dictionary
@@ -1291,36 +2931,17 @@ class Application:
 
                 if editing:
 
-                    # Update the dictionary
-                    temp_dict[new_name] = temp_dict[old_name]
-
-                    # We only need to delete the old dictionary entry, and update the Treeview, if the name has changed
+                    # We only need to update the dictionary and the Treeview if the name has changed
                     if new_name != old_name:
 
-                        # Delete the old entries in the dictionary
-                        del temp_dict[old_name]
-
-                        # Delete the item from the TreeView
-                        self.objects_tree.delete(selected_item_iid)
+                        # Rename the folder in the dictionary, keeping its position (this also updates the Treeview, keeping its open folders)
+                        new_iid = self.active_objects.rename(selected_item_iid, new_name)
 
-                        # Re-render the objects Treeview - we can't just re-insert the folder, as we need to also re-insert all its children
-                        fill_objects_tree(self.objects_tree, self.active_objects, object_image = self.object_image, folder_image = self.folder_image)
-                    
                         # Highlight the object that was just edited
-                        parent_iid = '\\' + '\\'.join(key_list)
-
-                        if parent_iid == '\\':
-                            parent_iid = ''    # In case there is no parent, correct the parent iid
-
-                        new_iid = parent_iid + '\\' + new_name
-
                         self.objects_tree.selection_set(new_iid)
 
                 else:
                     temp_dict[new_name] = {}
-
-                    # Re-render the objects Treeview and close the window
-                    fill_objects_tree(self.objects_tree, self.active_objects, object_image = self.object_image, folder_image = self.folder_image)
                 
                 self.new_folder_window.destroy()
                 self.modified_and_not_saved = True
@@ -1333,10 +2954,7 @@ class Application:
         key_list.pop(0)                                     # Index 0 is always just an empty string ('')
 
         def yes_func():
-            # Delete the item from the TreeView
-            self.objects_tree.delete(selected_item_iid)
-
-            # Delete the item from the active objects dictionary
+            # Delete the item from the active objects dictionary (which also deletes it from the TreeView)
             temp_dict = self.active_objects
 
             for key in key_list[0:-1]:
@@ -1345,6 +2963,9 @@ class Application:
             del temp_dict[key_list[-1]]
             self.modified_and_not_saved = True
 
+        if not self.check_not_running("delete objects"):
+            return
+
         if tk.messagebox.askyesno("Delete object", f"Delete object '{key_list[-1]}'?"):
             yes_func()
 
@@ -1357,17 +2978,23 @@ class Application:
 
         selected_function = self.active_functions[key]          # This will be a FunctionStore object
 
-        print(f"Executing function '{key}' at position {list(self.active_functions).index(key)}...", end = '')
+        def task():
+            print(f"Executing function '{key}' at position {list(self.active_functions).index(key)}...")
+
+            try:
+                selected_function.execute(name = key)
+                print(f"Completed function '{key}'")
         
-        try:
-            self.modified_and_not_saved = True
-            selected_function.execute()
-            print("Completed")
-    
-        except Exception as e:
-            print("FAILED")
-            print(repr(e))
-            raise e
+            except Exception as e:
+                print(f"Function '{key}' FAILED")
+                print(repr(e))
+                raise e
+
+            finally:
+                self.draw_figures()
+
+        self.modified_and_not_saved = True
+        self.run_in_background(task, description = f"Running '{key}'")
 
     def delete_function(self):
         # Get the selected item
@@ -1382,36 +3009,564 @@ class Application:
 
             # Delete the item from the active functions dictionary
             del self.active_functions[key_list[-1]]
+            self.functions_changed()
             self.modified_and_not_saved = True
 
+        if not self.check_not_running("delete functions"):
+            return
+
         if tk.messagebox.askyesno("Delete function", f"Delete function '{key_list[-1]}'?"):
             yes_func()
 
-    def run_all_functions(self):
-        print("Executing all functions")
-        failed = False
+    def get_function_graph(self, function_stores = None):
+        """Build the dependency graph between functions, based on the objects they read and write.
 
-        for i in range(len(self.active_functions)):
-            function_store = list(self.active_functions.values())[i]
-            function_obj = function_store.function
-            print(f"Executing function type '{function_obj.__name__}' at position {i}... ", end = '')
+        Args:
+            function_stores (dict, optional): Dictionary of {key : FunctionStore} to build the graph for. Defaults to None, which uses all the active functions.
 
-            try:
-                self.modified_and_not_saved = True
-                function_store.execute()
-                print("Completed")
+        Raises:
+            SchedulingError: If the functions can't be put in a valid order, e.g. due to a cycle or two functions writing to the same output.
 
-            except Exception as e:
-                print("FAILED")
-                print(repr(e))
-                failed = True
-                raise e
+        Returns:
+            FunctionGraph: The dependency graph.
+        """
+        if function_stores is None:
+            function_stores = self.active_functions
 
-        
-        if not failed:
+        reads = {}
+        writes = {}
+
+        for key, function_store in function_stores.items():
+            reads[key] = get_linked_iids_recursive(self.active_objects, function_store.input_links())
+            writes[key] = function_store.output_links()
+
+        return FunctionGraph(reads = reads, writes = writes)
+
+    def run_functions(self, function_stores = None, force = False, keep_going = False, profiler = None):
+        """Run a set of functions, running ones that don't depend on each other at the same time. This blocks until everything has finished, so the GUI
+        uses run_all_functions() instead, which calls this on a background thread.
+
+        Args:
+            function_stores (dict, optional): Dictionary of {key : FunctionStore} to run. Defaults to None, which runs all the active functions.
+            force (bool, optional): Whether to re-run every function. Defaults to False, which skips any function where nothing it reads has changed since it was last run.
+            keep_going (bool, optional): Whether to carry on running the functions that don't depend on one that failed. Defaults to False.
+            profiler (Profiler, optional): Profile each function with this (see scigui.profiling). The functions are run one at a time whilst profiling. Defaults
+                                           to None, for no profiling.
+
+        Raises:
+            SchedulingError: If the functions can't be put in a valid order. Nothing is run if this happens.
+            RunCancelled: If self.cancel_event is set part way through.
+        """
+        if function_stores is None:
+            function_stores = self.active_functions
+
+        graph = self.get_function_graph(function_stores)
+        num_finished = 0
+
+        def on_start(key):
+            print(f"Executing function '{key}' of type '{function_stores[key].function.__name__}'")
+            self.set_status(f"Running '{key}' ({num_finished}/{len(graph)} done)", progress = num_finished, total = len(graph))
+
+        def run_node(key):
+            function_store = function_stores[key]
+
+            # Skip functions that would give the same result as last time. Anything downstream will also be skipped if the outputs don't change.
+            if not force and function_store.is_clean():
+                return False
+
+            # Outputs are written from the worker threads, so the objects tree is only refreshed once everything has finished
+            if profiler is not None:
+                with profiler.profile():
+                    function_store.execute(refresh_treeview = False, name = key, profiling = True)
+            else:
+                function_store.execute(refresh_treeview = False, name = key)
+
+            return True
+
+        def on_finish(key, executed, exception):
+            nonlocal num_finished
+            num_finished += 1
+
+            if exception is None and executed:
+                print(f"Completed function '{key}'")
+            elif exception is None:
+                print(f"Skipped function '{key}' (unchanged since last run)")
+            else:
+                print(f"Function '{key}' FAILED")
+                print(repr(exception))
+
+            self.set_status(f"Running ({num_finished}/{len(graph)} done)", progress = num_finished, total = len(graph))
+            self.draw_figures()
+
+        try:
+            # This is part of the run that's already happening if there is one, e.g. from run_in_background()
+            with self.history.run("Running functions"):
+                run_graph(graph, 
+                          run_node = run_node, 
+                          max_workers = self.max_workers if profiler is None else 1, 
+                          on_start = on_start, 
+                          on_finish = on_finish, 
+                          cancel = self.cancel_event,
+                          keep_going = keep_going)
+
+        finally:
+            self.refresh_objects_tree()
+
+    def run_all_functions(self, force = False):
+        """Run all the active functions on a background thread. Functions that don't depend on each other are run at the same time.
+
+        Args:
+            force (bool, optional): Whether to re-run every function. Defaults to False, which skips any function where nothing it reads has changed since it was last run.
+        """
+        if self.is_running():
+            self.popup("Already running", "Functions are already running. Wait for them to finish, or cancel them first.")
+            return
+
+        # Check the functions can be put in order before running anything
+        try:
+            self.get_function_graph()
+
+        except SchedulingError as e:
+            print("Executing all functions... FAILED")
+            print(str(e))
+            self.popup("Scheduling error", str(e))
+            return
+
+        def task():
+            print("Executing all functions")
+            self.run_functions(force = force)
             print("Finished executing all functions")
 
+        self.modified_and_not_saved = True
+        self.run_in_background(task, description = "Running all functions")
+
+    def profile_functions(self, key = None):
+        """Run a function, or re-run every function, with cProfile on a background thread, then save the profile and show its hotspots (see scigui.profiling).
+
+        Args:
+            key (str, optional): The function to profile. Defaults to None, which profiles re-running all the active functions.
+        """
+        if self.is_running():
+            self.popup("Already running", "Functions are already running. Wait for them to finish, or cancel them first.")
+            return
+
+        if key is None:
+            try:
+                self.get_function_graph()
+
+            except SchedulingError as e:
+                print("Profiling all functions... FAILED")
+                print(str(e))
+                self.popup("Scheduling error", str(e))
+                return
+
+        # Profiles are kept next to the workspace, like the results cache
+        directory = self.open_file + ".profiles" if self.open_file is not None else os.path.join(tempfile.gettempdir(), "scigui-profiles")
+        filename = get_profile_filename(directory, "all" if key is None else key)
+        profiler = Profiler()
+
+        def task():
+            try:
+                if key is None:
+                    print("Profiling all functions")
+                    self.run_functions(force = True, profiler = profiler)
+                    print("Finished profiling all functions")
+
+                else:
+                    print(f"Profiling function '{key}'")
+
+                    with profiler.profile():
+                        self.active_functions[key].execute(name = key, profiling = True)
+
+                    print(f"Finished profiling function '{key}'")
+
+            finally:
+                # Whatever ran before a failure or cancellation is still worth seeing
+                self.draw_figures()
+                profiler.save(filename)
+                print(f"Saved profile to {filename}")
+                self.call_in_main_thread(self.profile_window, filename, wait = False)
+
+        self.modified_and_not_saved = True
+        self.run_in_background(task, description = "Profiling all functions" if key is None else f"Profiling '{key}'")
+
+    def profile_window(self, filename):
+        """Create the window showing the frames with the most cumulative time in a profile.
+
+        Args:
+            filename (str): The .pstats file.
+        """
+        stats = pstats.Stats(filename)
+        totals = get_origin_totals(stats)
+        total_time = sum(totals.values())
+
+        profile_window = tk.Toplevel(self.root)
+        profile_window.title(f"Profile {os.path.basename(filename)}")
+        profile_window.columnconfigure(1, weight = 1)
+        profile_window.rowconfigure(2, weight = 1)
+
+        ttk.Label(profile_window, text = filename).grid(column = 0, row = 0, columnspan = 2, sticky = "w")
+
+        # How much of the time was spent in the user's code, and how much in scigui and everything else
+        summary = ",   ".join(f"{origin}: {format_seconds(seconds)} ({seconds / total_time if total_time > 0 else 0:.0%})" for origin, seconds in totals.items())
+        ttk.Label(profile_window, text = summary).grid(column = 0, row = 1, columnspan = 2, sticky = "w", pady = (5, 5))
+
+        columns = ["Function", "Location", "Calls", "Own time", "Cumulative", "Per call", "Origin"]
+        hotspots_tree = ttk.Treeview(profile_window, columns = columns, show = "headings", selectmode = "browse", height = 20)
+        hotspots_tree.grid(column = 0, row = 2, columnspan = 2, sticky = "nsew")
+
+        scrollbar = ttk.Scrollbar(profile_window, orient = "vertical", command = hotspots_tree.yview)
+        scrollbar.grid(column = 2, row = 2, sticky = "ns")
+        hotspots_tree.configure(yscrollcommand = scrollbar.set)
 
+        ttk.Label(profile_window, text = "Show").grid(column = 0, row = 3, sticky = "w", pady = (10, 0))
+        origin_variable = tk.StringVar(profile_window, value = "User code")
+        origin_box = SortableCombobox(profile_window, textvariable = origin_variable, state = "readonly")
+        origin_box["values"] = ORIGINS + ["Everything"]
+        origin_box.grid(column = 1, row = 3, sticky = "w", pady = (10, 0))
+
+        sort = {"Column" : "Cumulative", "Reverse" : True}
+        hotspots = []
+
+        def fill_hotspots():
+            nonlocal hotspots
+            origin = origin_variable.get()
+            hotspots = get_hotspots(stats, origin = None if origin == "Everything" else origin, limit = 200)
+            show_hotspots()
+
+        def show_hotspots():
+            hotspots_tree.delete(*hotspots_tree.get_children())
+
+            def sort_key(hotspot):
+                value = hotspot[sort["Column"]]
+
+                # Recursive calls are shown as "total/primitive"
+                if sort["Column"] == "Calls":
+                    return int(str(value).split("/")[0])
+
+                return value
+
+            for hotspot in sorted(hotspots, key = sort_key, reverse = sort["Reverse"]):
+                values = [hotspot["Function"], hotspot["Location"], hotspot["Calls"]] + \
+                         [format_seconds(hotspot[column]) for column in ["Own time", "Cumulative", "Per call"]] + [hotspot["Origin"]]
+                hotspots_tree.insert("", "end", values = values)
+
+        def sort_by(column):
+            # Clicking the same column again sorts it the other way
+            sort["Reverse"] = not sort["Reverse"] if sort["Column"] == column else column in ("Calls", "Own time", "Cumulative", "Per call")
+            sort["Column"] = column
+            show_hotspots()
+
+        for column in columns:
+            hotspots_tree.heading(column, text = column, command = lambda column = column : sort_by(column))
+            hotspots_tree.column(column, width = 250 if column == "Function" else 100, stretch = column == "Function")
+
+        origin_box.bind("<<ComboboxSelected>>", lambda event : fill_hotspots())
+        fill_hotspots()
+
+    def run_history_window(self, key = None):
+        """Create the window showing how long functions took in the last few runs, with a timeline of the selected run.
+
+        Args:
+            key (str, optional): Only show the runs of this function. Defaults to None, which shows every run.
+        """
+        history_window = tk.Toplevel(self.root)
+        history_window.title("Run history" if key is None else f"Run history of '{key}'")
+        history_window.columnconfigure(0, weight = 1)
+        history_window.rowconfigure(2, weight = 1)
+
+        timing_columns = ["Status", "Wall", "CPU"] + STAGES + ["Peak memory"]
+
+        # Every run, or every run of the one function
+        run_columns = ["Run", "Description", "Started"] + (["Functions", "Wall"] if key is None else timing_columns)
+        runs_tree = ttk.Treeview(history_window, columns = run_columns, show = "headings", selectmode = "browse", height = 8)
+        runs_tree.grid(column = 0, row = 0, sticky = "nsew")
+
+        # The functions in the selected run
+        function_columns = ["Function", "Start"] + timing_columns
+        functions_tree = ttk.Treeview(history_window, columns = function_columns, show = "headings", selectmode = "browse", height = 8)
+        functions_tree.grid(column = 0, row = 1, sticky = "nsew", pady = (10, 0))
+
+        for tree, columns in [(runs_tree, run_columns), (functions_tree, function_columns)]:
+            for column in columns:
+                tree.heading(column, text = column)
+                tree.column(column, width = 200 if column in ("Description", "Function") else 90, stretch = column in ("Description", "Function"))
+
+        # Timeline of the selected run, with one bar per function split into its stages
+        stage_colours = dict(zip(STAGES, ["#f2c14e", "#5b8def", "#4cb944", "#d1495b"]))
+        timeline = tk.Canvas(history_window, background = "white", height = 200)
+        timeline.grid(column = 0, row = 2, sticky = "nsew", pady = (10, 0))
+
+        ttk.Button(history_window, text = "Refresh", command = lambda : fill_runs()).grid(column = 0, row = 3, sticky = "e", pady = (10, 0))
+
+        def timings(entry):
+            return [entry.get("Status", ""), format_seconds(entry.get("Wall")), format_seconds(entry.get("CPU"))] + \
+                   [format_seconds(entry.get(stage)) for stage in STAGES] + [format_bytes(entry.get("Peak memory"))]
+
+        def fill_runs():
+            runs_tree.delete(*runs_tree.get_children())
+            functions_tree.delete(*functions_tree.get_children())
+            timeline.delete("all")
+
+            with self.history.lock:
+                runs = {str(run["Run"]) : dict(run, Functions = list(run["Functions"])) for run in self.history.runs}
+
+            # Newest first
+            for run_id, run in reversed(list(runs.items())):
+                started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["Started"]))
+
+                if key is None:
+                    runs_tree.insert("", "end", iid = run_id, values = [run_id, run["Description"], started, len(run["Functions"]), format_seconds(run["Wall"])])
+                    continue
+
+                for entry in run["Functions"]:
+                    if entry["Function"] == key:
+                        runs_tree.insert("", "end", iid = run_id, values = [run_id, run["Description"], started] + timings(entry))
+                        break
+
+            runs_tree.runs = runs
+
+            if len(runs_tree.get_children()) > 0:
+                runs_tree.selection_set(runs_tree.get_children()[0])
+
+        def show_run(event = None):
+            selection = runs_tree.selection()
+            functions_tree.delete(*functions_tree.get_children())
+            timeline.delete("all")
+
+            if len(selection) == 0:
+                timeline.entries = []
+                return
+
+            entries = sorted(runs_tree.runs[selection[0]]["Functions"], key = lambda entry : entry["Start"])
+
+            for i, entry in enumerate(entries):
+                functions_tree.insert("", "end", iid = str(i), values = [entry["Function"], format_seconds(entry["Start"])] + timings(entry))
+
+                if entry["Function"] == key:
+                    functions_tree.selection_set(str(i))
+
+            timeline.entries = entries
+            draw_timeline(entries)
+
+        def draw_timeline(entries):
+            timeline.delete("all")
+
+            if len(entries) == 0:
+                return
+
+            width = max(timeline.winfo_width(), 400)
+            label_width = 150
+            row_height = 20
+            end = max(entry["Start"] + entry["Wall"] for entry in entries) or 1
+            scale = (width - label_width - 20) / end
+
+            # Key for the colours, and the length of the run
+            x = label_width
+            for stage, colour in stage_colours.items():
+                timeline.create_rectangle(x, 8, x + 10, 18, fill = colour, outline = "")
+                x = timeline.bbox(timeline.create_text(x + 14, 13, text = stage, anchor = "w"))[2] + 15
+
+            timeline.create_text(width - 10, 13, text = format_seconds(end), anchor = "e")
+
+            for i, entry in enumerate(entries):
+                y = 30 + i * row_height
+                x = label_width + entry["Start"] * scale
+
+                timeline.create_text(label_width - 5, y + row_height / 2, text = entry["Function"], anchor = "e", fill = "red" if entry.get("Status") == "Failed" else "black")
+
+                # Anything that isn't part of a stage (e.g. waiting for a worker process) is left grey
+                timeline.create_rectangle(x, y + 3, x + max(entry["Wall"] * scale, 1), y + row_height - 3, fill = "#cccccc", outline = "")
+
+                for stage in STAGES:
+                    stage_width = entry.get(stage, 0.0) * scale
+
+                    if stage_width > 0:
+                        timeline.create_rectangle(x, y + 3, x + stage_width, y + row_height - 3, fill = stage_colours[stage], outline = "")
+                        x += stage_width
+
+            timeline.configure(scrollregion = timeline.bbox("all"))
+
+        runs_tree.bind("<<TreeviewSelect>>", show_run)
+        timeline.entries = []
+        timeline.bind("<Configure>", lambda event : draw_timeline(timeline.entries))
+        fill_runs()
+
+
+
+    def sweep_window(self):
+        """Create the window used to run the selected function many times, over a grid of values for its 'raw' inputs."""
+
+        # Get the selected item
+        selected_item_iid = str(self.functions_tree.focus())
+        key = selected_item_iid.split("\\")[1]
+        function_store = self.active_functions[key]
+
+        # Only non-list raw inputs can be swept
+        raw_keys = [input_key for input_key, datatype in function_store.datatypes().items() if datatype == "raw"]
+
+        if len(raw_keys) == 0:
+            self.popup("Sweep error", f"Function '{key}' has no 'raw' inputs to sweep over.")
+            return
+
+        sweep_window = tk.Toplevel(self.root)
+        sweep_window.title(f"Sweep '{key}'")
+        sweep_window.columnconfigure(1, weight = 1)
+        sweep_window.grab_set()
+
+        # One entry per raw input, filled with its current value
+        value_variables = {}
+        for i, input_key in enumerate(raw_keys):
+            label = ttk.Label(sweep_window, text = input_key)
+            label.grid(column = 0, row = i, sticky = "w")
+            create_tool_tip(widget = label, text = "Comma separated values (e.g. 1, 2, 5), or a range (e.g. 0:10:2 gives 0, 2, 4, 6, 8, 10). Leave as one value to keep it fixed.")
+
+            value_variables[input_key] = tk.StringVar(sweep_window, value = str(function_store.dictionary["\\INPUTS\\"].get(input_key, "")))
+            ttk.Entry(sweep_window, textvar = value_variables[input_key]).grid(column = 1, row = i, sticky = "nsew")
+
+        row = len(raw_keys)
+
+        ttk.Label(sweep_window, text = "Mode").grid(column = 0, row = row, sticky = "w", pady = (15, 0))
+        mode_variable = tk.StringVar(sweep_window)
+        mode_box = SortableCombobox(sweep_window, textvariable = mode_variable, state = "readonly")
+        mode_box["values"] = ["Every combination", "Zip together"]
+        mode_box.current(0)
+        mode_box.grid(column = 1, row = row, sticky = "nsew", pady = (15, 0))
+
+        summary_label = ttk.Label(sweep_window, text = "Summary")
+        summary_label.grid(column = 0, row = row + 1, sticky = "w")
+        create_tool_tip(widget = summary_label, text = "Where to save a String object containing a table of the inputs and results for every run.")
+        summary_variable = tk.StringVar(sweep_window, value = f"\\{key} sweep summary")
+        ttk.Entry(sweep_window, textvar = summary_variable).grid(column = 1, row = row + 1, sticky = "nsew")
+
+        ttk.Button(sweep_window, text = "Run", command = lambda : run()).grid(column = 1, row = row + 2, sticky = "e", pady = (15, 0))
+
+        def run():
+            # Work out the inputs for every run
+            try:
+                values = {}
+                for input_key, variable in value_variables.items():
+                    values[input_key] = parse_sweep_values(variable.get())
+
+                    if len(values[input_key]) == 0:
+                        raise ValueError(f"No values given for '{input_key}'.")
+
+                    if any("\\" in value for value in values[input_key]):
+                        raise ValueError(f"Values for '{input_key}' cannot link to objects.")
+
+                mode = "product" if mode_variable.get() == "Every combination" else "zip"
+                sweep_inputs = get_sweep_inputs(values, mode = mode)
+
+            except ValueError as e:
+                open_popup(sweep_window, "Sweep error", str(e))
+                return
+
+            # Each run's outputs go in a subfolder of the function's normal output, so these can't be existing objects
+            output_iids = function_store.output_links()
+            for iid in output_iids:
+                try:
+                    existing = get_object(self.active_objects, iid)
+                except (KeyError, TypeError):
+                    continue
+
+                if not isinstance(existing, dict):
+                    open_popup(sweep_window, "Sweep error", f"The output '{iid}' is an object, but the results of a sweep are saved in a folder at the output location. Change the output or delete the object first.")
+                    return
+
+            summary_iid = summary_variable.get()
+            if summary_iid != "" and summary_iid[0] != "\\":
+                open_popup(sweep_window, "Sweep error", f"'{summary_iid}' is not a valid object directory. It must start with '\\'")
+                return
+
+            # Make a temporary copy of the function for each run
+            width = max(3, len(str(len(sweep_inputs))))
+            run_names = [f"run_{i + 1:0{width}d}" for i in range(len(sweep_inputs))]
+            function_stores = {}
+
+            for run_name, inputs in zip(run_names, sweep_inputs):
+                dictionary = {"\\INPUTS\\" : function_store.dictionary["\\INPUTS\\"].copy(), "\\OUTPUTS\\" : function_store.dictionary["\\OUTPUTS\\"].copy()}
+                dictionary["\\INPUTS\\"].update(inputs)
+
+                for output_key, iid in dictionary["\\OUTPUTS\\"].items():
+                    if iid in output_iids:
+                        dictionary["\\OUTPUTS\\"][output_key] = iid + "\\" + run_name
+
+                function_stores[f"{key} [{run_name}]"] = FunctionStore(application = self, index = function_store.index, dictionary = dictionary)
+
+            def task():
+                print(f"Sweeping function '{key}' over {len(function_stores)} runs")
+
+                try:
+                    self.run_functions(function_stores, force = True, keep_going = True)
+                    print(f"Finished sweeping function '{key}'")
+
+                finally:
+                    # Save the summary, even if some of the runs failed
+                    if summary_iid != "":
+                        table = self.get_sweep_summary(function_stores.values(), run_names, sweep_inputs)
+
+                        with self.objects_lock:
+                            set_object(database = self.active_objects, iid = summary_iid, to_add = ObjectStore(application = self, index = 0, dictionary = {"\\INPUTS\\" : {"Value" : table}}))
+
+                        self.refresh_objects_tree()
+
+            sweep_window.destroy()
+            self.modified_and_not_saved = True
+            self.run_in_background(task, description = f"Sweeping '{key}'")
+
+    def get_sweep_summary(self, function_stores, run_names, sweep_inputs):
+        """Make a tab separated table of the inputs and results for each run of a sweep.
+
+        Args:
+            function_stores (list): The FunctionStore used for each run.
+            run_names (list): The name of each run.
+            sweep_inputs (list): The dictionary of swept inputs for each run.
+
+        Returns:
+            str: The table, with one row per run.
+        """
+        input_keys = list(sweep_inputs[0].keys())
+        result_columns = []
+        rows = []
+
+        for function_store, run_name, inputs in zip(function_stores, run_names, sweep_inputs):
+            row = {"Run" : run_name}
+            row.update(inputs)
+
+            # Runs that failed have no results, and anything at their outputs is left over from an earlier sweep
+            if "\\LAST_RUN\\" not in function_store.dictionary:
+                row["Status"] = "Failed"
+                rows.append(row)
+                continue
+
+            row["Status"] = "Completed"
+
+            for output_key, iid in function_store.dictionary["\\OUTPUTS\\"].items():
+                if iid not in function_store.output_links():
+                    continue
+
+                try:
+                    result = get_object(self.active_objects, iid)
+                except (KeyError, TypeError):
+                    continue
+
+                if isinstance(result, ObjectStore):
+                    for result_key, value in result.dictionary["\\INPUTS\\"].items():
+                        column = f"{output_key}.{result_key}"
+                        row[column] = " ".join(str(value).split())        # Keep each value on one line of the table
+
+                        if column not in result_columns:
+                            result_columns.append(column)
+
+            rows.append(row)
+
+        columns = ["Run"] + input_keys + ["Status"] + result_columns
+        lines = ["\t".join(columns)]
+
+        for row in rows:
+            lines.append("\t".join(str(row.get(column, "")) for column in columns))
+
+        return "\n".join(lines)
 
     def obj_fnc_window(self, obj_or_fnc, index_if_new = None):
         """Create the window used to add new objects or functions, or edit existing ones
@@ -1446,6 +3601,11 @@ class Application:
                     else:
                         raise ValueError(f"Encountered an unexpected input value type ('{type(self.input_variables[i])}') when trying to run 'retrieve_user_inputs()'")
 
+                # Values that are shown as a description (e.g. arrays) are kept as they were, unless the user has typed something else in
+                for key, (description, value) in self.described_values.items():
+                    if self.input_values.get(key) == description:
+                        self.input_values[key] = value
+
         def add_to_input_list(datatype_string, frame, variable_list):
             
             def destroy_list(list):
@@ -1466,7 +3626,7 @@ class Application:
                                                                                                                 variable,
                                                                                                                 object_image = self.object_image,
                                                                                                                 folder_image = self.folder_image,
-                                                                                                                object_type = String,
+                                                                                                                object_type = (String, Array),
                                                                                                                 grab_set = self.main_window))
                 link_button.grid(row = frame.grid_size()[1] - 1, column = 1)
                 
@@ -1597,7 +3757,7 @@ class Application:
                                                                                                                                                         variable,
                                                                                                                                                         object_image = self.object_image,
                                                                                                                                                         folder_image = self.folder_image,
-                                                                                                                                                        object_type = String,
+                                                                                                                                                        object_type = (String, Array),
                                                                                                                                                         grab_set = self.main_window))]
                 
             elif datatype == "object":
@@ -1712,6 +3872,9 @@ class Application:
             if self.name_var.get() == "":
                 open_popup(self.main_window, "Name error", "Name cannot be blank.")
 
+            elif not self.check_not_running(f"save {obj_or_fnc}s", parent = self.main_window):
+                pass
+
             else:
                 # Collect inputs
                 retrieve_user_inputs()
@@ -1728,8 +3891,8 @@ class Application:
                             open_popup(self.main_window, "String link error", f"Link for {key} could not be found (no object exists at {value})")
                             return
 
-                        if type(linked_object) is not ObjectStore or type(linked_object.get_object()) is not String:
-                            open_popup(self.main_window, "String link error", "Input for {} is type '{}', when it should be of type String.".format(key, linked_object))
+                        if type(linked_object) is not ObjectStore or linked_object.object not in (String, Array):
+                            open_popup(self.main_window, "String link error", "Input for {} is type '{}', when it should be of type String or Array.".format(key, linked_object.object.__name__ if type(linked_object) is ObjectStore else "folder"))
                             return
 
                     elif self.inputs_dict[key] == "object":
@@ -1798,7 +3961,7 @@ class Application:
                     set_item(database = database, iid = new_name, to_add = storage_class(application = self, index = item_index, dictionary = combined_in_out_dict))
 
                 elif obj_or_fnc == "object":
-                    if type(selected_item) is not dict:
+                    if not isinstance(selected_item, dict):
                         key_list.pop(-1)
 
                     # Edit the active objects dictionary
@@ -1816,6 +3979,10 @@ class Application:
                             open_popup(self.main_window, "Name already exists", "Item already exists in this folder with the name '{}'".format(self.name_var.get()))
                             return   
 
+                    # Rename the existing object first, so the edited one keeps its position
+                    if index_if_new == None and new_name != old_name:
+                        self.active_objects.rename(selected_item_iid, new_name)
+
                     # Update the dictionary
                     temp_dict[new_name] = storage_class(self, item_index, {"\\INPUTS\\" : self.input_values})
 
@@ -1841,36 +4008,22 @@ class Application:
                             self.functions_tree.selection_set(new_iid)
 
                     elif obj_or_fnc == "object":
-                        # Delete the old entries in the dictionary
                         if new_name != old_name:
-                            del temp_dict[old_name]
-
-                            # Delete the item from the TreeView
-                            self.objects_tree.delete(selected_item_iid)
-
-                            #Re-insert the new function into the Treeview at the same position
+                            # The object was renamed in the dictionary above, which also updated the TreeView. Highlight the object that was just edited.
                             parent_iid = '\\'.join(key_list)
 
                             if parent_iid == '\\':
                                 parent_iid = ''    # In case there is no parent, correct the parent iid
 
-                            new_iid = parent_iid + '\\' + new_name
-
-                            print(f"parent_iid = {parent_iid}")
-
-                            self.objects_tree.insert(parent_iid, treeview_index, new_iid, text = new_name, image = self.object_image)      # Parent ID, Position, ID, Displayed Text
+                            self.objects_tree.selection_set(parent_iid + '\\' + new_name)
 
-                            # Highlight the object that was just edited
-                            self.objects_tree.selection_set(new_iid)
-
-                            # If in the future, we want to re-open any renamed folders, we can use these:
-                            # https://stackoverflow.com/questions/20531783/retrieving-ttk-treeview-items-open-option-as-boolean
-                            # https://stackoverflow.com/questions/59594483/tkinter-treeview-expand-all-child-nodes
-
-                else:
-                    # Re-render the  Treeview and close the window
+                elif obj_or_fnc == "function":
+                    # Re-render the functions Treeview and close the window (the objects Treeview is updated as objects are added)
                     fill_tree(treeview, database, object_image = self.object_image, folder_image = self.folder_image) 
 
+                if obj_or_fnc == "function":
+                    self.functions_changed()
+
                 self.main_window.destroy()
                 self.modified_and_not_saved = True
 
@@ -1907,7 +4060,7 @@ class Application:
         if index_if_new == None:
             # Editing an existing item
 
-            if type(selected_item) is dict:         # This indicates a folder is being edited
+            if isinstance(selected_item, dict):         # This indicates a folder is being edited
                 self.add_folder(editing = True)
                 return
 
@@ -1941,6 +4094,7 @@ class Application:
         self.input_boxes = [None] * len(self.inputs_dict)                # Boxes containing the widgets the users use to enter the inputs
         self.input_variables = [None] * len(self.inputs_dict)            # List containing the variables linked to the input boxes
         self.input_values = {}                                          # Dict of the current input values (used to evaluate functional inputs)
+        self.described_values = {}                                      # Dict of {input key : (description, value)} for values shown as a description, e.g. arrays
 
         if obj_or_fnc == "function":
             self.outputs_dict = master_data.outputs()
@@ -2028,6 +4182,12 @@ class Application:
                         add_to_input_list(datatype_string = self.inputs_dict[keys[j]][0], frame = self.input_boxes[j], variable_list = self.input_variables[j])
                         self.input_variables[j][k].set(old_values[j][k])
 
+                # Arrays and payloads are too big to show, so they're shown as their shape and dtype
+                elif describe_value(old_values[j]) is not None:
+                    description = f"<{describe_value(old_values[j])}>"
+                    self.described_values[keys[j]] = (description, old_values[j])
+                    self.input_variables[j].set(description)
+
                 else: 
                     self.input_variables[j].set(old_values[j])
 
@@ -2078,6 +4238,19 @@ class Application:
 
 
     def get_axes(self, title = "Plot", three_d = False):
+        """Open a new window with a plot in it. This can be called from a user's function by manipulating the \\APPLICATION\\ key.
+
+        Args:
+            title (str, optional): The window title. Defaults to "Plot".
+            three_d (bool, optional): Whether to make 3D axes. Defaults to False.
+
+        Returns:
+            matplotlib.axes.Axes: The axes to plot on. The plot is drawn once the function has finished.
+        """
+        # Functions are run on a background thread, but the window has to be made on the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return self.call_in_main_thread(self.get_axes, title = title, three_d = three_d)
+
         figure = Figure()
 
         # Create a Toplevel to put the plot in
@@ -2099,6 +4272,7 @@ class Application:
             axes = figure.add_subplot()
 
         figure_canvas.get_tk_widget().pack(side = "top", fill = "both", expand = 1)
+        self.figure_canvases.append(figure_canvas)
 
         return axes
 
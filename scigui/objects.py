@@ -16,6 +16,9 @@ always returns 'disabled' as an 'else' result. Note functional inputs cannot be
 
 Note that the inputs are rendered in the order they appear in the get_inputs() dictionary. Hence, if a 'function' should only rely on inputs
 that come before it.
+
+Objects are cached once they've been built, so the same instance is shared by every function (and every other object) that uses it until its inputs change. If your
+object gets edited by the functions that use it, add a cache_instance() static method that returns False, so a fresh one is built every time.
 """
 
 class Debug:
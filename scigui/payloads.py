@@ -0,0 +1,373 @@
+"""
+Large payloads in the outputs of functions (e.g. big numpy arrays, or long lists) are kept out of the workspace. Each one is written to its own file in a folder
+next to the .sgui file (filename + ".payloads"), and the object's dictionary only keeps a PayloadReference to it, which is saved in the .sgui file as
+{"\\PAYLOAD\\": name}. Payloads are only read when something actually uses them (see ObjectStore.build_object()), and numpy arrays are memory-mapped rather than
+read, so only the parts that are used are loaded.
+
+Numpy arrays are saved as .npy files, and lists and tuples are pickled. Each file is named by a hash of its contents, so identical payloads (e.g. from running the
+same function again) are only saved once. Payloads are never changed once they've been written, and files nothing refers to any more are deleted when the
+workspace is saved (see PayloadStore.collect_garbage()).
+
+Numpy arrays that are too small to be worth a file of their own are saved in the .sgui file itself, as the bytes of a .npy file encoded in base64, i.e.
+{"\\ARRAY\\": base64}, so they are saved exactly rather than as text.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+PAYLOAD_MIN_BYTES = 1024**2             # Numpy arrays at least this big are saved separately
+PAYLOAD_MIN_ITEMS = 10000               # Lists and tuples with at least this many items are saved separately
+
+
+def is_reference_form(value):
+    """Check whether a value read from a .sgui file is a reference to a payload.
+
+    Args:
+        value: The value.
+
+    Returns:
+        bool: True if it's the JSON form of a PayloadReference.
+    """
+    return isinstance(value, dict) and len(value) == 1 and "\\PAYLOAD\\" in value
+
+def is_array_form(value):
+    """Check whether a value read from a .sgui file is a small numpy array that was saved in the file itself.
+
+    Args:
+        value: The value.
+
+    Returns:
+        bool: True if it's the JSON form of a numpy array.
+    """
+    return isinstance(value, dict) and len(value) == 1 and "\\ARRAY\\" in value
+
+def array_to_json_form(array):
+    f = io.BytesIO()
+    numpy.save(f, array, allow_pickle = False)
+
+    return {"\\ARRAY\\" : base64.b64encode(f.getvalue()).decode("ascii")}
+
+def array_from_json_form(json_form):
+    return numpy.load(io.BytesIO(base64.b64decode(json_form["\\ARRAY\\"])), allow_pickle = False)
+
+def inputs_to_json_form(inputs):
+    """Convert any small numpy arrays in an object's inputs to their JSON form, for saving in a .sgui file. Large ones are already PayloadReferences.
+
+    Args:
+        inputs (dict): The "\\INPUTS\\" dictionary.
+
+    Returns:
+        dict: The same dictionary if there weren't any arrays in it, otherwise a new one.
+    """
+    if numpy is None or not any(isinstance(value, numpy.ndarray) for value in inputs.values()):
+        return inputs
+
+    return {key : array_to_json_form(value) if isinstance(value, numpy.ndarray) else value for key, value in inputs.items()}
+
+def copy_payload(source, destination):
+    if os.path.exists(destination):
+        return
+
+    # Payloads never change, so a hard link is as good as a copy
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+def describe_array(dtype, shape):
+    return f"{dtype} {'x'.join(str(n) for n in shape) if len(shape) > 0 else 'scalar'}"
+
+def find_references(objects):
+    """Find every payload that a folder of objects refers to.
+
+    Args:
+        objects (dict): The objects, e.g. Application.active_objects.
+
+    Returns:
+        set: The names of the payloads.
+    """
+    names = set()
+
+    for value in objects.values():
+        if isinstance(value, dict):
+            names |= find_references(value)
+
+        elif hasattr(value, "dictionary"):
+            for input_value in value.dictionary.get("\\INPUTS\\", {}).values():
+                if isinstance(input_value, PayloadReference):
+                    names.add(input_value.name)
+
+    return names
+
+
+class PayloadReference:
+    __slots__ = ("store", "name")
+
+    def __init__(self, store, name):
+        """A payload that has been saved to a file, in place of the value itself.
+
+        Args:
+            store (PayloadStore): The store the payload is in.
+            name (str): The name of its file.
+        """
+        self.store = store
+        self.name = name
+
+    def load(self):
+        """Read the payload. Numpy arrays are memory-mapped, and are read-only.
+
+        Returns:
+            The value.
+        """
+        return self.store.load(self.name)
+
+    def describe(self):
+        """Get a short description of the payload, without reading it.
+
+        Returns:
+            str: e.g. "float64 1000x1000" for a numpy array.
+        """
+        return self.store.describe(self.name)
+
+    def to_json_form(self):
+        return {"\\PAYLOAD\\" : self.name}
+
+    def __repr__(self):
+        return f"<Payload {self.name}>"
+
+    def __eq__(self, other):
+        return isinstance(other, PayloadReference) and other.name == self.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+class PayloadStore:
+    def __init__(self, directory = None):
+        """The folder of payloads for the open workspace.
+
+        Args:
+            directory (str, optional): The folder. Defaults to None, for a workspace that hasn't been saved yet, which uses a temporary folder.
+        """
+        self.directory = None
+        self.temporary = False          # Whether the folder is a temporary one, which is deleted once it's no longer used
+        self.descriptions = {}          # {name : description} of payloads that have been described (they never change, so this never needs clearing)
+        self.set_directory(directory)
+
+    def set_directory(self, directory):
+        """Change the folder, e.g. when a different file is opened. Payloads in the old folder can't be read after this.
+
+        Args:
+            directory (str): The new folder, or None to use a temporary folder.
+        """
+        self.close()
+        self.directory = directory
+        self.temporary = False
+
+    def close(self):
+        # Delete the temporary folder, if there is one
+        if self.temporary and self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors = True)
+
+        self.directory = None
+        self.temporary = False
+
+    def get_directory(self):
+        # The temporary folder is only made once there's something to put in it
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix = "scigui-payloads-")
+            self.temporary = True
+
+        os.makedirs(self.directory, exist_ok = True)
+        return self.directory
+
+    def path(self, name):
+        return os.path.join(self.get_directory(), name)
+
+    def save(self, value):
+        """Save a value as a payload if it's big enough, otherwise leave it as it is.
+
+        Args:
+            value: The value, e.g. one input of an object made by a function.
+
+        Returns:
+            PayloadReference or the original value.
+        """
+        if numpy is not None and isinstance(value, numpy.ndarray) and value.dtype != object and value.nbytes >= PAYLOAD_MIN_BYTES:
+            digest = hashlib.sha1(f"{value.dtype.str} {value.shape}".encode())
+            digest.update(numpy.ascontiguousarray(value).data)
+            name = digest.hexdigest() + ".npy"
+            write = lambda f : numpy.save(f, value, allow_pickle = False)
+
+        elif isinstance(value, (list, tuple)) and len(value) >= PAYLOAD_MIN_ITEMS:
+            data = pickle.dumps(value, protocol = pickle.HIGHEST_PROTOCOL)
+            name = hashlib.sha1(data).hexdigest() + ".pickle"
+            write = lambda f : f.write(data)
+
+        else:
+            return value
+
+        path = self.path(name)
+
+        # The same payload has already been saved
+        if os.path.exists(path):
+            return PayloadReference(self, name)
+
+        # Write to a temporary file first, so a payload is never left half written. Each thread has its own, since two functions can output the same payload.
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(temp_path, "wb") as f:
+                write(f)
+
+            os.replace(temp_path, path)
+
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            raise
+
+        return PayloadReference(self, name)
+
+    def save_inputs(self, inputs):
+        """Save any big enough values in an object's inputs as payloads.
+
+        Args:
+            inputs (dict): The "\\INPUTS\\" dictionary.
+
+        Returns:
+            dict: A new dictionary, with PayloadReferences in place of the payloads.
+        """
+        return {key : self.save(value) for key, value in inputs.items()}
+
+    def load_references(self, inputs):
+        """Convert the JSON form of each reference in an object's inputs (read from a .sgui file) to a PayloadReference, and of each small numpy array to the array.
+
+        Args:
+            inputs (dict): The "\\INPUTS\\" dictionary.
+
+        Returns:
+            dict: A new dictionary, with PayloadReferences and arrays in place of their JSON forms.
+        """
+        loaded = {}
+
+        for key, value in inputs.items():
+            if is_reference_form(value):
+                value = PayloadReference(self, value["\\PAYLOAD\\"])
+            elif is_array_form(value):
+                value = array_from_json_form(value)
+
+            loaded[key] = value
+
+        return loaded
+
+    def load(self, name):
+        path = self.path(name)
+
+        if name.endswith(".npy"):
+            return numpy.load(path, mmap_mode = "r", allow_pickle = False)
+
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def describe(self, name):
+        if name not in self.descriptions:
+            try:
+                with open(self.path(name), "rb") as f:
+                    if name.endswith(".npy"):
+                        # Only the header is read
+                        if numpy.lib.format.read_magic(f) == (1, 0):
+                            shape, _, dtype = numpy.lib.format.read_array_header_1_0(f)
+                        else:
+                            shape, _, dtype = numpy.lib.format.read_array_header_2_0(f)
+
+                        description = describe_array(dtype, shape)
+                    else:
+                        description = f"pickle, {os.fstat(f.fileno()).st_size} bytes"
+
+            except (OSError, ValueError):
+                return "missing payload"
+
+            self.descriptions[name] = description
+
+        return self.descriptions[name]
+
+    def copy_to(self, directory, objects):
+        """Copy the payloads used by some objects to a different folder, and use that folder from now on, e.g. when the workspace is saved as a different file.
+
+        Args:
+            directory (str): The new folder.
+            objects (dict): The objects, e.g. Application.active_objects.
+        """
+        if self.directory is not None and os.path.abspath(directory) == os.path.abspath(self.directory):
+            return
+
+        for name in find_references(objects):
+            os.makedirs(directory, exist_ok = True)
+
+            copy_payload(self.path(name), os.path.join(directory, name))
+
+        self.set_directory(directory)
+
+    def copy_all_to(self, directory):
+        """Copy every payload to a different folder, without using that folder, e.g. when the workspace is converted to a different file (see scigui.database).
+
+        Args:
+            directory (str): The folder to copy to.
+        """
+        if self.directory is None or not os.path.isdir(self.directory) or os.path.abspath(directory) == os.path.abspath(self.directory):
+            return
+
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith((".npy", ".pickle")):
+                os.makedirs(directory, exist_ok = True)
+                copy_payload(entry.path, os.path.join(directory, entry.name))
+
+    def collect_garbage(self, objects):
+        """Delete every payload that some objects don't use, e.g. once they've been saved.
+
+        Args:
+            objects (dict): The objects, e.g. Application.active_objects.
+        """
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+
+        names = find_references(objects)
+
+        for entry in os.scandir(self.directory):
+            if entry.name not in names and entry.name.endswith((".npy", ".pickle")):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    # e.g. it's still memory-mapped on Windows. It'll be deleted next time.
+                    pass
+
+    def statistics(self):
+        """Get the number of payloads, and the space they take up.
+
+        Returns:
+            dict: The statistics.
+        """
+        count = 0
+        size = 0
+
+        if self.directory is not None and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith((".npy", ".pickle")):
+                    count += 1
+                    size += entry.stat().st_size
+
+        return {"Directory" : self.directory, "Payloads" : count, "Bytes" : size}
@@ -0,0 +1,176 @@
+"""
+Profiling functions with cProfile, without copying them out of the workspace. Application.profile_functions() runs one function, or re-runs every function,
+with each FunctionStore.execute() inside Profiler.profile(), then saves everything that was profiled to a .pstats file (which can be read with the pstats module,
+or tools like snakeviz) and shows the biggest hotspots (see get_hotspots()).
+
+cProfile only sees the thread it's started on, so every function gets its own cProfile.Profile on whichever thread runs it, and they're added together at the
+end. Profiled runs run the functions one at a time, so each profile only has its own function's calls in it. Functions that ask to run in a thread are run inline
+whilst they're profiled, and functions with cached results are run anyway (see FunctionStore.execute()). Functions that run in a separate process (see
+scigui.backends) only show the time spent waiting for it.
+
+Each frame is put in one of ORIGINS by where its code is, so the user's own code can be looked at separately from scigui's (see get_origin()).
+"""
+
+import contextlib
+import cProfile
+import os
+import pstats
+import re
+import site
+import sysconfig
+import threading
+import time
+
+
+ORIGINS = ["User code", "scigui", "Libraries", "Built-in"]
+
+SCIGUI_DIRECTORY = os.path.normcase(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_library_directories():
+    # The standard library, and anywhere packages are installed
+    directories = [sysconfig.get_paths().get(name) for name in ("stdlib", "platstdlib", "purelib", "platlib")]
+
+    try:
+        directories += site.getsitepackages() + [site.getusersitepackages()]
+    except AttributeError:
+        # Some virtual environments have an old site module without these
+        pass
+
+    return tuple(os.path.join(os.path.normcase(os.path.abspath(directory)), "") for directory in directories if directory)
+
+LIBRARY_DIRECTORIES = get_library_directories()
+
+
+def get_origin(filename):
+    """Work out whose code a frame in a profile is.
+
+    Args:
+        filename (str): The file the frame's code is in, as recorded by cProfile.
+
+    Returns:
+        str: One of ORIGINS.
+    """
+    # cProfile records built-in functions as being in "~", and code that isn't in a file has names like "<string>"
+    if filename == "~" or filename.startswith("<"):
+        return "Built-in"
+
+    path = os.path.normcase(os.path.abspath(filename))
+
+    # scigui could be installed alongside the libraries, so it's checked first
+    if path.startswith(os.path.join(SCIGUI_DIRECTORY, "")):
+        return "scigui"
+
+    if path.startswith(LIBRARY_DIRECTORIES):
+        return "Libraries"
+
+    return "User code"
+
+def get_profile_filename(directory, name):
+    """Get a new filename to save a profile to.
+
+    Args:
+        directory (str): The folder to save it in.
+        name (str): What was profiled, e.g. the function's key.
+
+    Returns:
+        str: The filename, which includes the time, so profiles are never overwritten.
+    """
+    name = re.sub(r"[^\w\-]+", "_", name).strip("_") or "profile"
+
+    return os.path.join(directory, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.pstats")
+
+
+class Profiler:
+    def __init__(self):
+        """Profiles of everything run inside profile(), on any thread, which are added together by stats()."""
+        self.lock = threading.Lock()
+        self.profiles = []
+
+    @contextlib.contextmanager
+    def profile(self):
+        """Profile everything run inside this, on the current thread."""
+        profile = cProfile.Profile()
+        profile.enable()
+
+        try:
+            yield
+
+        finally:
+            profile.disable()
+
+            with self.lock:
+                self.profiles.append(profile)
+
+    def stats(self):
+        """Add all the profiles together.
+
+        Returns:
+            pstats.Stats: The profiles' statistics.
+        """
+        stats = pstats.Stats()
+
+        with self.lock:
+            for profile in self.profiles:
+                stats.add(profile)
+
+        return stats
+
+    def save(self, filename):
+        """Save all the profiles, as one .pstats file.
+
+        Args:
+            filename (str): The file to save to.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok = True)
+        self.stats().dump_stats(filename)
+
+
+def get_hotspots(stats, origin = None, limit = None):
+    """Get the frames in a profile with the most cumulative time, i.e. including everything they called.
+
+    Args:
+        stats (pstats.Stats): The profile, e.g. from Profiler.stats(), or read from a .pstats file.
+        origin (str, optional): Only get frames from this part of ORIGINS. Defaults to None, which gets every frame.
+        limit (int, optional): Most frames to get. Defaults to None, which gets all of them.
+
+    Returns:
+        list: A dictionary for each frame, with the most cumulative time first.
+    """
+    hotspots = []
+
+    for (filename, line, name), (primitive_calls, calls, own_time, cumulative_time, _) in stats.stats.items():
+        frame_origin = get_origin(filename)
+
+        if origin is not None and frame_origin != origin:
+            continue
+
+        hotspots.append({"Function" : name,
+                         "File" : filename,
+                         "Line" : line,
+                         "Location" : name if filename == "~" else f"{os.path.basename(filename)}:{line}",
+                         "Calls" : calls if calls == primitive_calls else f"{calls}/{primitive_calls}",        # Like pstats, recursive calls are shown separately
+                         "Own time" : own_time,
+                         "Cumulative" : cumulative_time,
+                         "Per call" : cumulative_time / calls if calls > 0 else 0.0,
+                         "Origin" : frame_origin})
+
+    hotspots.sort(key = lambda hotspot : hotspot["Cumulative"], reverse = True)
+
+    return hotspots if limit is None else hotspots[:limit]
+
+def get_origin_totals(stats):
+    """Add up the time spent in each part of ORIGINS, not including anything each frame called.
+
+    Args:
+        stats (pstats.Stats): The profile.
+
+    Returns:
+        dict: {origin : seconds}, for every origin in ORIGINS.
+    """
+    totals = {origin : 0.0 for origin in ORIGINS}
+
+    for (filename, _, _), (_, _, own_time, _, _) in stats.stats.items():
+        totals[get_origin(filename)] += own_time
+
+    return totals
@@ -0,0 +1,239 @@
+"""
+Tools for running many functions at once. Each function is a node in a dependency graph, where a function depends on every other function that writes to an object
+it reads (either directly, or through a chain of object links). Functions that don't depend on each other are run at the same time on a thread pool.
+"""
+
+import concurrent.futures
+import heapq
+import os
+
+
+class SchedulingError(ValueError):
+    """Raised when a set of functions can't be put in a valid order, e.g. due to a cycle or two functions writing to the same output."""
+    pass
+
+class RunCancelled(Exception):
+    """Raised by run_graph() if it was cancelled before all the functions were run."""
+    pass
+
+
+def get_parent_iids(iid):
+    """Get every folder IID above an IID, e.g. \\A\\B\\C will give [\\A, \\A\\B].
+
+    Args:
+        iid (str): The IID, in the form \\First Folder\\Second Folder\\Object.
+
+    Returns:
+        list: The IIDs of each parent folder, from the top level down.
+    """
+    key_list = iid.split("\\")
+    return ["\\".join(key_list[:i]) for i in range(2, len(key_list))]
+
+
+class FunctionGraph:
+    def __init__(self, reads, writes):
+        """Dependency graph between functions, built from the object IIDs each function reads and writes.
+
+        Args:
+            reads (dict): Dictionary of {function key : list of object IIDs read by the function}. The order of the keys is used to break ties when scheduling.
+            writes (dict): Dictionary of {function key : list of object IIDs written by the function}.
+
+        Raises:
+            SchedulingError: If two functions write to the same (or overlapping) object, or if there is a cycle in the graph.
+        """
+        self.keys = list(reads.keys())
+        self.order = {key : i for i, key in enumerate(self.keys)}
+        self.dependencies = {key : set() for key in self.keys}
+        self.dependents = {key : set() for key in self.keys}
+
+        errors = []
+
+        # Find which function writes to each IID
+        writers = {}
+        for key in self.keys:
+            for iid in writes[key]:
+                writers.setdefault(iid, []).append(key)
+
+        # Two functions writing to the same object, or one writing inside another's output, means the result would depend on which one finished last
+        for iid, keys in writers.items():
+            if len(keys) > 1:
+                errors.append("Functions {} all write to the same output '{}'.".format(", ".join(f"'{key}'" for key in keys), iid))
+
+            for parent_iid in get_parent_iids(iid):
+                for parent_key in writers.get(parent_iid, []):
+                    if parent_key not in keys:
+                        errors.append(f"Function '{keys[0]}' writes to '{iid}', which is inside the output '{parent_iid}' of function '{parent_key}'.")
+
+        # A function depends on any other function that writes to something it reads
+        for key in self.keys:
+            for iid in reads[key]:
+                for written_iid in [iid] + get_parent_iids(iid):
+                    for writer_key in writers.get(written_iid, []):
+                        # Functions are allowed to read their own outputs - they'll just get the value from before they were run
+                        if writer_key != key:
+                            self.dependencies[key].add(writer_key)
+                            self.dependents[writer_key].add(key)
+
+        if len(errors) == 0:
+            cycle = self.find_cycle()
+            if cycle is not None:
+                errors.append("Functions {} depend on each other in a cycle.".format(" -> ".join(f"'{key}'" for key in cycle)))
+
+        if len(errors) > 0:
+            raise SchedulingError("\n".join(errors))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find_cycle(self):
+        """Look for a cycle in the graph.
+
+        Returns:
+            list or None: List of function keys making up the cycle (with the first key repeated at the end), or None if there are no cycles.
+        """
+        # Iterative depth-first search, colouring each node as unvisited (0), in progress (1) or finished (2)
+        state = {key : 0 for key in self.keys}
+
+        for start in self.keys:
+            if state[start] != 0:
+                continue
+
+            path = [start]
+            iterators = [iter(sorted(self.dependencies[start], key = self.order.get))]
+            state[start] = 1
+
+            while path:
+                try:
+                    key = next(iterators[-1])
+
+                except StopIteration:
+                    state[path.pop()] = 2
+                    iterators.pop()
+                    continue
+
+                if state[key] == 1:
+                    return path[path.index(key):] + [key]
+
+                elif state[key] == 0:
+                    state[key] = 1
+                    path.append(key)
+                    iterators.append(iter(sorted(self.dependencies[key], key = self.order.get)))
+
+        return None
+
+    def topological_order(self):
+        """Get an order the functions can be run in one at a time, keeping to the original order wherever the dependencies allow it.
+
+        Returns:
+            list: Function keys in the order they should be run.
+        """
+        remaining = {key : len(self.dependencies[key]) for key in self.keys}
+        ready = [(self.order[key], key) for key in self.keys if remaining[key] == 0]
+        heapq.heapify(ready)
+        ordered = []
+
+        while ready:
+            key = heapq.heappop(ready)[1]
+            ordered.append(key)
+
+            for dependent in self.dependents[key]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(ready, (self.order[dependent], dependent))
+
+        return ordered
+
+
+def run_graph(graph, run_node, max_workers = None, on_start = None, on_finish = None, wait = None, cancel = None, keep_going = False):
+    """Run every function in a FunctionGraph, running each one as soon as everything it depends on has finished. If a function fails, no new functions are started,
+    the ones already running are allowed to finish, and then the exception is raised. The same happens if the run is cancelled, but RunCancelled is raised instead.
+    With keep_going, a failed function only stops the functions that depend on it, and the first exception is raised once everything else has finished.
+
+    Args:
+        graph (FunctionGraph): The graph to run.
+        run_node (callable): Function that takes a function key and runs it. This is called from the worker threads.
+        max_workers (int, optional): Maximum number of functions to run at the same time. Defaults to None, which uses the concurrent.futures default.
+        on_start (callable, optional): Called with the function key just before a function is started. Always called from the thread that called run_graph().
+        on_finish (callable, optional): Called with the function key, the value returned by run_node (or None if it failed) and the exception raised (or None) after a 
+                                        function finishes. Always called from the thread that called run_graph().
+        wait (callable, optional): Called repeatedly while waiting for functions to finish, e.g. to keep a GUI responsive. Defaults to None, which just blocks.
+        cancel (threading.Event, optional): Event that can be set (from any thread) to stop new functions from being started. Defaults to None.
+        keep_going (bool, optional): Whether to carry on running functions that don't depend on one that failed. Defaults to False.
+
+    Returns:
+        list: The keys of the functions that were run, in the order they finished.
+    """
+    remaining = {key : len(graph.dependencies[key]) for key in graph.keys}
+    ready = [(graph.order[key], key) for key in graph.keys if remaining[key] == 0]
+    heapq.heapify(ready)
+
+    # Only hand functions to the pool when there's a free worker for them, so a cancelled run doesn't leave a queue of functions that still get run
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) + 4)         # Same as the concurrent.futures default
+
+    running = {}
+    finished = []
+    error = None
+    cancelled = False
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = max_workers) as executor:
+        while ready or running:
+
+            if not cancelled and cancel is not None and cancel.is_set():
+                cancelled = True
+
+                if error is None:
+                    error = RunCancelled("Run cancelled")
+
+            stopped = cancelled or (error is not None and not keep_going)
+
+            # Start everything that's ready to go, in the original order
+            while ready and not stopped and len(running) < max_workers:
+                key = heapq.heappop(ready)[1]
+
+                if on_start is not None:
+                    on_start(key)
+
+                running[executor.submit(run_node, key)] = key
+
+            if stopped and not running:
+                break
+
+            # Only block indefinitely if there's nothing else to check on whilst waiting
+            if wait is None and cancel is None:
+                done, not_done = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+
+            else:
+                done, not_done = concurrent.futures.wait(running, timeout = 0.05, return_when = concurrent.futures.FIRST_COMPLETED)
+
+                if wait is not None:
+                    wait()
+
+            for future in done:
+                key = running.pop(future)
+                exception = future.exception()
+
+                if exception is None:
+                    result = future.result()
+                else:
+                    result = None
+
+                if on_finish is not None:
+                    on_finish(key, result, exception)
+
+                if exception is not None:
+                    if error is None:
+                        error = exception
+                    continue
+
+                finished.append(key)
+
+                for dependent in graph.dependents[key]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        heapq.heappush(ready, (graph.order[dependent], dependent))
+
+    if error is not None:
+        raise error
+
+    return finished
@@ -0,0 +1,198 @@
+"""
+Finding out what makes the window freeze. Whilst a StallMonitor is running (Debug > Monitor stalls), a heartbeat is scheduled on the Tk event loop every few
+milliseconds with after(), and how late each one runs is the event loop's lag. If the main thread doesn't get back to the event loop for longer than the
+threshold, that's a stall: a sampler thread notices the heartbeat has stopped, and records the main thread's stack every SAMPLE_INTERVAL seconds until it
+starts again. Each stall is then written to the log file, with the stack that was seen most often, and shown in the status bar.
+
+Event handlers (clicking the trees, dragging, opening the object window, saving, ...) are wrapped with Application.timed(), which records how long each one
+takes, so a stall can be put down to the handler that was running at the time.
+"""
+
+import collections
+import contextlib
+import sys
+import threading
+import time
+import traceback
+
+
+STALL_THRESHOLD = 0.2                   # Seconds without getting back to the event loop that count as a stall
+HEARTBEAT_INTERVAL = 50                 # Milliseconds between heartbeats
+SAMPLE_INTERVAL = 0.02                  # Seconds between samples of the main thread's stack during a stall
+MAX_STALLS = 100                        # Most stalls kept in memory (they're all in the log file)
+
+
+class StallMonitor:
+    def __init__(self, root, threshold = STALL_THRESHOLD, interval = HEARTBEAT_INTERVAL, log_filename = None, on_update = None):
+        """Start monitoring the Tk event loop. This must be called from the main thread.
+
+        Args:
+            root (tk.Tk): The main window.
+            threshold (float, optional): Seconds without getting back to the event loop that count as a stall. Defaults to STALL_THRESHOLD.
+            interval (int, optional): Milliseconds between heartbeats. Defaults to HEARTBEAT_INTERVAL.
+            log_filename (str, optional): File to add each stall to. Defaults to None, which doesn't keep a log.
+            on_update (callable, optional): Called on the main thread about once a second, and straight after each stall, as on_update(text, stalled), with
+                                            text to show in the status bar. Defaults to None.
+        """
+        self.root = root
+        self.threshold = threshold
+        self.interval = interval
+        self.log_filename = log_filename
+        self.on_update = on_update
+        self.main_thread_id = threading.get_ident()
+
+        self.lock = threading.Lock()            # Held whilst the sampler and the main thread share the samples
+        self.last_beat = time.perf_counter()
+        self.lags = collections.deque(maxlen = max(1, 1000 // interval))        # Lag of each heartbeat in the last second
+        self.num_beats = 0
+        self.max_lag = 0.0
+        self.handlers = []                      # Names of the handlers running now, innermost last
+        self.handler_times = {}                 # {name : {"Calls" : n, "Total" : seconds, "Longest" : seconds}}
+        self.slow_handler = None                # The last handler that took longer than the threshold, for stalls too short to be sampled
+        self.samples = collections.Counter()    # {(handlers, stack) : number of times it was seen} during the current stall
+        self.stalls = collections.deque(maxlen = MAX_STALLS)
+        self.last_stall = None
+
+        self.log_file = None if log_filename is None else open(log_filename, "a", encoding = "utf-8")
+        self.running = True
+        self.after_id = self.root.after(self.interval, self.beat)
+        self.sampler = threading.Thread(target = self.sample, name = "Stall sampler", daemon = True)
+        self.sampler.start()
+
+    def beat(self):
+        # Runs on the main thread, whenever the event loop gets round to it
+        now = time.perf_counter()
+        lag = max(0.0, now - self.last_beat - self.interval / 1000)
+        self.last_beat = now
+
+        self.lags.append(lag)
+        self.num_beats += 1
+        self.max_lag = max(self.max_lag, lag)
+
+        with self.lock:
+            samples = self.samples
+            self.samples = collections.Counter()
+
+        if lag > self.threshold:
+            self.report_stall(lag, samples)
+
+        elif self.on_update is not None and self.num_beats % self.lags.maxlen == 0:
+            self.on_update(f"UI lag {max(self.lags) * 1000:.0f} ms", False)
+
+        if self.running:
+            self.after_id = self.root.after(self.interval, self.beat)
+
+    def sample(self):
+        # Runs on the sampler thread
+        while self.running:
+            time.sleep(SAMPLE_INTERVAL)
+
+            if time.perf_counter() - self.last_beat < self.interval / 1000 + self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self.main_thread_id)
+
+            if frame is None:
+                continue
+
+            stack = tuple(traceback.format_list(traceback.extract_stack(frame)))
+            del frame
+
+            with self.lock:
+                self.samples[(tuple(self.handlers), stack)] += 1
+
+    @contextlib.contextmanager
+    def handler(self, name):
+        """Time an event handler. This must be used on the main thread.
+
+        Args:
+            name (str): What the handler is, e.g. "Objects tree double click".
+        """
+        with self.lock:
+            self.handlers.append(name)
+
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            duration = time.perf_counter() - start
+
+            with self.lock:
+                self.handlers.pop()
+
+            times = self.handler_times.setdefault(name, {"Calls" : 0, "Total" : 0.0, "Longest" : 0.0})
+            times["Calls"] += 1
+            times["Total"] += duration
+            times["Longest"] = max(times["Longest"], duration)
+
+            if duration > self.threshold:
+                self.slow_handler = name
+
+    def report_stall(self, duration, samples):
+        """Record a stall, write it to the log file, and show it in the status bar.
+
+        Args:
+            duration (float): How long the event loop was stopped for, in seconds.
+            samples (collections.Counter): The handlers and stacks seen during the stall.
+        """
+        num_samples = sum(samples.values())
+        handlers = (self.slow_handler,) if self.slow_handler is not None else ()
+        stack = ()
+        count = 0
+
+        if num_samples > 0:
+            (handlers, stack), count = samples.most_common(1)[0]
+
+        self.slow_handler = None
+
+        stall = {"Time" : time.strftime("%Y-%m-%d %H:%M:%S"),
+                 "Duration" : duration,
+                 "Handler" : handlers[-1] if len(handlers) > 0 else None,
+                 "Stack" : "".join(stack),
+                 "Samples" : num_samples}
+
+        self.stalls.append(stall)
+        self.last_stall = stall
+
+        handler_text = f" in '{stall['Handler']}'" if stall["Handler"] is not None else ""
+
+        if self.log_file is not None:
+            self.log_file.write(f"[{stall['Time']}] Stall of {duration:.3f} s{handler_text} ({num_samples} stack samples)\n")
+
+            if num_samples > 0:
+                self.log_file.write(f"Most common stack ({count} of {num_samples} samples):\n{stall['Stack']}\n")
+
+            self.log_file.flush()
+
+        if self.on_update is not None:
+            self.on_update(f"UI stall {duration:.2f} s{handler_text}", True)
+
+    def statistics(self):
+        """Get how responsive the event loop has been since monitoring started.
+
+        Returns:
+            dict: The statistics. Handlers are listed with the longest total time first.
+        """
+        handlers = sorted(self.handler_times.items(), key = lambda item : item[1]["Total"], reverse = True)
+
+        return {"Heartbeats" : self.num_beats,
+                "Max lag" : self.max_lag,
+                "Stalls" : len(self.stalls),
+                "Longest stall" : max((stall["Duration"] for stall in self.stalls), default = 0.0),
+                "Handlers" : dict(handlers)}
+
+    def stop(self):
+        """Stop monitoring. This must be called from the main thread."""
+        self.running = False
+
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+        self.sampler.join()
+
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
@@ -0,0 +1,217 @@
+"""
+Timings of every function that is run, so it's possible to see where the time goes. Each call to FunctionStore.execute() records its wall time and CPU time,
+and how long was spent in each stage of running it:
+    "Resolve inputs"        Working out the inputs, building the objects it links to, and looking it up in the results cache
+    "Execute"               The user's execute() (including sending it to a worker process, if it runs in one)
+    "Write outputs"         Saving the outputs as objects (and as payloads, see scigui.payloads)
+    "Refresh tree"          Asking the objects tree to show the new outputs
+
+The peak memory use is recorded too whilst tracemalloc is tracing (see set_memory_tracking()). This is the peak for the whole program, so it includes any other
+functions running at the same time.
+
+Every function run together (e.g. by one 'Run all') is part of the same run, and each timing is tagged with its run's ID. The last MAX_RUNS runs are kept, and
+are saved in the "History" section of the workspace.
+"""
+
+import contextlib
+import threading
+import time
+import tracemalloc
+
+
+MAX_RUNS = 50                           # Most runs kept in the history
+
+STAGES = ["Resolve inputs", "Execute", "Write outputs", "Refresh tree"]
+
+
+def set_memory_tracking(enabled):
+    """Start or stop recording the peak memory use of each function, using tracemalloc. This slows down everything that uses memory, so it's off by default.
+
+    Args:
+        enabled (bool): Whether to record it.
+    """
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def format_seconds(seconds):
+    # For showing times in the run history, e.g. "1.25 s" or "310 ms"
+    if seconds is None:
+        return ""
+
+    if seconds >= 1:
+        return f"{seconds:.3g} s" if seconds < 100 else f"{seconds:.0f} s"
+
+    return f"{seconds * 1000:.4g} ms"
+
+def format_bytes(size):
+    if size is None:
+        return ""
+
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.4g} {unit}"
+
+        size /= 1024
+
+    return f"{size:.3g} GB"
+
+
+class FunctionTimer:
+    def __init__(self, history, name, function):
+        """Times one call to FunctionStore.execute(), and adds it to the history once it's finished (see finish()).
+
+        Args:
+            history (RunHistory): The history to add it to.
+            name (str): The function's key, e.g. in Application.active_functions.
+            function (class): The user's function class.
+        """
+        self.history = history
+        self.run = history.current_run
+        self.entry = {"Run" : None if self.run is None else self.run["Run"],
+                      "Function" : name,
+                      "Class" : function.__name__,
+                      "Thread" : threading.current_thread().name,
+                      "Start" : time.time() - (time.time() if self.run is None else self.run["Started"])}
+
+        for stage in STAGES:
+            self.entry[stage] = 0.0
+
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        """Time one stage of running the function.
+
+        Args:
+            stage (str): The stage, from STAGES.
+        """
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.entry[stage] += time.perf_counter() - start
+
+    def finish(self, status):
+        """Record the total times, and add the timing to the history.
+
+        Args:
+            status (str): How it finished, e.g. "Completed", "Cached" or "Failed".
+        """
+        self.entry["Wall"] = time.perf_counter() - self.wall_start
+        self.entry["CPU"] = time.thread_time() - self.cpu_start        # Only this thread, so it doesn't include worker processes
+        self.entry["Peak memory"] = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        self.entry["Status"] = status
+
+        self.history.add(self.run, self.entry)
+
+
+class RunHistory:
+    def __init__(self, max_runs = MAX_RUNS):
+        """The timings of the functions in the last few runs.
+
+        Args:
+            max_runs (int, optional): Most runs to keep. Defaults to MAX_RUNS.
+        """
+        self.max_runs = max_runs
+        self.lock = threading.Lock()            # Functions running at the same time add their timings from different threads
+        self.runs = []                          # Each run, oldest first
+        self.current_run = None                 # The run that's happening now, if there is one
+
+    @contextlib.contextmanager
+    def run(self, description):
+        """Put every function that's timed inside this in the same run. If there's already a run happening, they're added to that one instead.
+
+        Args:
+            description (str): What the run is, e.g. "Running all functions".
+
+        Yields:
+            dict: The run.
+        """
+        if self.current_run is not None:
+            yield self.current_run
+            return
+
+        with self.lock:
+            run = {"Run" : self.runs[-1]["Run"] + 1 if len(self.runs) > 0 else 1,
+                   "Description" : description,
+                   "Started" : time.time(),
+                   "Wall" : None,
+                   "Functions" : []}
+
+            self.runs.append(run)
+            del self.runs[:-self.max_runs]
+            self.current_run = run
+
+        start = time.perf_counter()
+
+        try:
+            yield run
+
+        finally:
+            with self.lock:
+                run["Wall"] = time.perf_counter() - start
+                self.current_run = None
+
+    def timer(self, name, function):
+        return FunctionTimer(self, name, function)
+
+    def add(self, run, entry):
+        with self.lock:
+            # Functions run on their own (outside a run) are a run by themselves
+            if run is None:
+                run = {"Run" : self.runs[-1]["Run"] + 1 if len(self.runs) > 0 else 1,
+                       "Description" : f"Running '{entry['Function']}'",
+                       "Started" : time.time() - entry["Wall"],
+                       "Wall" : entry["Wall"],
+                       "Functions" : []}
+
+                self.runs.append(run)
+                del self.runs[:-self.max_runs]
+                entry["Run"] = run["Run"]
+
+            run["Functions"].append(entry)
+
+    def function_totals(self):
+        """Add up the timings of each function over every run in the history.
+
+        Returns:
+            dict: {function key : {"Runs" : number of times it was run, "Wall" : total wall time, "CPU" : total CPU time, and the total time in each stage}}.
+        """
+        totals = {}
+
+        with self.lock:
+            for run in self.runs:
+                for entry in run["Functions"]:
+                    total = totals.setdefault(entry["Function"], dict({"Runs" : 0, "Wall" : 0.0, "CPU" : 0.0}, **{stage : 0.0 for stage in STAGES}))
+                    total["Runs"] += 1
+
+                    for key in ["Wall", "CPU"] + STAGES:
+                        total[key] += entry.get(key, 0.0)
+
+        return totals
+
+    def clear(self):
+        with self.lock:
+            self.runs = []
+
+    def to_json_form(self):
+        # For saving in the "History" section of a workspace
+        with self.lock:
+            return {"Runs" : [dict(run, Functions = list(run["Functions"])) for run in self.runs]}
+
+    def load_json_form(self, json_form):
+        """Replace the history with one read from a workspace.
+
+        Args:
+            json_form (dict): The "History" section, or None if the workspace doesn't have one.
+        """
+        with self.lock:
+            self.runs = [] if json_form is None else list(json_form.get("Runs", []))[-self.max_runs:]
@@ -0,0 +1,307 @@
+"""
+The tree of objects the user has made, i.e. Application.active_objects. Folders are dictionaries of {name : ObjectStore or Folder}, exactly like the nested
+dictionaries saved in .sgui files, so they can still be read and edited like any other dictionary. The ObjectTree at the top also keeps a flat index of
+{IID : item}, which every Folder keeps up to date when it is edited, so looking up an IID doesn't need to walk through each folder.
+
+Adding, deleting and looking up an item is O(1). Moving or renaming a folder is O(number of items inside it), since the IIDs of everything inside it change.
+Reordering the items in a folder is O(number of items in that folder).
+
+Every change is also sent to the tree's listeners (see ObjectTree.add_listener()) as one of these events, which the GUI uses to update only the parts of the objects
+Treeview that have changed:
+    "add", iid              An item was added (if it is a folder, everything inside it was added as well)
+    "remove", iid           An item (and everything inside it) was removed
+    "replace", iid          The item at an IID was replaced with a different one
+    "move", iid, new_iid    An item (and everything inside it) was moved or renamed
+    "reorder", iid          The items in the folder at iid were put in a different order
+"""
+
+
+class Folder(dict):
+    def __init__(self, items = None, tree = None, iid = ""):
+        """A folder of objects. Any dictionaries inside it are converted to Folders as well.
+
+        Args:
+            items (dict, optional): The items to start with. Defaults to None, which makes an empty folder.
+            tree (ObjectTree, optional): The tree this folder is in. Defaults to None, for a folder that hasn't been added to a tree yet.
+            iid (str, optional): The IID of this folder in the tree. Defaults to "".
+        """
+        super().__init__()
+        self.tree = tree
+        self.iid = iid
+
+        if items is not None:
+            for key, value in items.items():
+                self[key] = value
+
+    def child_iid(self, key):
+        return self.iid + "\\" + key
+
+    def __setitem__(self, key, value):
+        if "\\" in key:
+            raise ValueError(f"Objects cannot have '\\' in their name ('{key}').")
+
+        if dict.__contains__(self, key):
+            self.detach(key)
+
+        # Folders are only adopted as they are if they aren't already somewhere else, otherwise they are copied
+        if isinstance(value, dict) and not (isinstance(value, Folder) and value.tree is None):
+            value = Folder(value)
+
+        replaced = dict.__contains__(self, key)
+        dict.__setitem__(self, key, value)
+
+        if self.tree is not None:
+            self.tree.add_to_index(self.child_iid(key), value)
+            self.tree.notify("replace" if replaced else "add", self.child_iid(key))
+
+    def __delitem__(self, key):
+        self.detach(key)
+        dict.__delitem__(self, key)
+
+        if self.tree is not None:
+            self.tree.notify("remove", self.child_iid(key))
+
+    def detach(self, key):
+        # Remove an item (and everything inside it) from the index, without removing it from this folder
+        if self.tree is not None:
+            self.tree.remove_from_index(self.child_iid(key), dict.__getitem__(self, key))
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+
+        value = dict.__getitem__(self, key)
+        del self[key]
+        return value
+
+    def popitem(self):
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default = None):
+        if key not in self:
+            self[key] = default
+
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        keys = list(self.keys())
+
+        for key in keys:
+            self.detach(key)
+
+        dict.clear(self)
+
+        if self.tree is not None:
+            for key in keys:
+                self.tree.notify("remove", self.child_iid(key))
+
+    def reorder(self, keys, notify = True):
+        """Change the order of the items in this folder.
+
+        Args:
+            keys (list): Every key in the folder, in the new order.
+            notify (bool, optional): Whether to send a "reorder" event to the tree's listeners. Defaults to True.
+        """
+        if sorted(keys) != sorted(self.keys()):
+            raise ValueError("The new order must contain every item in the folder exactly once.")
+
+        items = [(key, dict.__getitem__(self, key)) for key in keys]
+        dict.clear(self)
+        dict.update(self, items)
+
+        if notify and self.tree is not None:
+            self.tree.notify("reorder", self.iid)
+
+    def move_to(self, key, position, notify = True):
+        """Move one item to a different position in this folder.
+
+        Args:
+            key (str): The item to move.
+            position (int): Its new position.
+            notify (bool, optional): Whether to send a "reorder" event to the tree's listeners. Defaults to True.
+        """
+        keys = list(self.keys())
+        keys.remove(key)
+        keys.insert(position, key)
+        self.reorder(keys, notify = notify)
+
+    def to_dict(self):
+        """Get a copy of this folder as plain nested dictionaries. The objects themselves aren't copied.
+
+        Returns:
+            dict: The copy.
+        """
+        return {key : value.to_dict() if isinstance(value, Folder) else value for key, value in self.items()}
+
+
+class ObjectTree(Folder):
+    def __init__(self, items = None):
+        """The top level folder of the objects tree, which also holds the flat index of every item in it.
+
+        Args:
+            items (dict, optional): Nested dictionaries of objects to start with, e.g. the "Objects" from a .sgui file. Defaults to None.
+        """
+        self.index = {}
+        self.listeners = []
+        super().__init__(items, tree = self, iid = "")
+
+    def add_listener(self, listener):
+        """Call a function whenever something in the tree changes. It is called as listener(event, iid, new_iid = None), straight after the change, on whichever
+        thread made it. See the top of this module for the events.
+
+        Args:
+            listener (callable): The function to call.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def notify(self, event, iid, new_iid = None):
+        for listener in self.listeners:
+            listener(event, iid, new_iid)
+
+    def add_to_index(self, iid, item):
+        self.index[iid] = item
+
+        if isinstance(item, Folder):
+            item.tree = self
+            item.iid = iid
+
+            for key, value in dict.items(item):
+                self.add_to_index(iid + "\\" + key, value)
+
+    def remove_from_index(self, iid, item):
+        self.index.pop(iid, None)
+
+        if isinstance(item, Folder):
+            for key, value in dict.items(item):
+                self.remove_from_index(iid + "\\" + key, value)
+
+            item.tree = None
+
+    def find(self, iid):
+        """Get the item at an IID.
+
+        Args:
+            iid (str): The IID, in the form \\First Folder\\Second Folder\\Object. An empty string gives the whole tree.
+
+        Raises:
+            KeyError: If there is nothing at the IID.
+
+        Returns:
+            Folder or ObjectStore: The item.
+        """
+        if iid == "":
+            return self
+
+        return self.index[iid]
+
+    def find_folder(self, iid):
+        folder = self.find(iid)
+
+        if not isinstance(folder, Folder):
+            raise ValueError(f"'{iid}' is an object, not a folder.")
+
+        return folder
+
+    def set_item(self, iid, item):
+        """Add or replace the item at an IID, making any folders needed to get there.
+
+        Args:
+            iid (str): The IID.
+            item (ObjectStore or dict): The item to add.
+
+        Raises:
+            ValueError: If one of the folders in the IID is already an object.
+        """
+        if iid == "":
+            self.clear()
+            self.update(item)
+            return
+
+        parent_iid, _, key = iid.rpartition("\\")
+        folder = self
+
+        if parent_iid != "":
+            if parent_iid not in self.index:
+                self.set_item(parent_iid, Folder())
+
+            folder = self.index[parent_iid]
+
+            if not isinstance(folder, Folder):
+                raise ValueError("Attempted to create an object at {}, but the intermediate folder {} was already an existing object.".format(iid, parent_iid.split("\\")[-1]))
+
+        folder[key] = item
+
+    def delete(self, iid):
+        """Remove the item at an IID, and everything inside it.
+
+        Args:
+            iid (str): The IID.
+        """
+        parent_iid, _, key = iid.rpartition("\\")
+        del self.find_folder(parent_iid)[key]
+
+    def move(self, old_iid, new_iid, position = None):
+        """Move an item (and everything inside it) to a new IID, which can be in a different folder, or just a different name.
+
+        Args:
+            old_iid (str): The current IID.
+            new_iid (str): The new IID. The folder it is in must already exist.
+            position (int, optional): Position in the new folder. Defaults to None, which puts it at the end.
+
+        Raises:
+            KeyError: If there is nothing at old_iid, or the new folder doesn't exist.
+            ValueError: If there is already something at new_iid, or a folder is being moved inside itself.
+        """
+        item = self.find(old_iid)
+        old_parent_iid, _, old_key = old_iid.rpartition("\\")
+        new_parent_iid, _, new_key = new_iid.rpartition("\\")
+        new_parent = self.find_folder(new_parent_iid)
+
+        if new_iid == old_iid:
+            if position is not None:
+                new_parent.move_to(new_key, position)
+            return
+
+        if new_key in new_parent:
+            raise ValueError(f"Cannot move '{old_iid}' to '{new_iid}', as there is already an item there.")
+
+        if (new_parent_iid + "\\").startswith(old_iid + "\\"):
+            raise ValueError(f"Cannot move folder '{old_iid}' inside itself.")
+
+        # Move it without going through __delitem__ and __setitem__, so listeners get a single "move" event rather than a "remove" and an "add"
+        old_parent = self.find_folder(old_parent_iid)
+        self.remove_from_index(old_iid, item)
+        dict.__delitem__(old_parent, old_key)
+        dict.__setitem__(new_parent, new_key, item)
+        self.add_to_index(new_iid, item)
+
+        if position is not None:
+            new_parent.move_to(new_key, position, notify = False)
+
+        self.notify("move", old_iid, new_iid)
+
+    def rename(self, iid, new_name):
+        """Rename an item, keeping it in the same position in its folder.
+
+        Args:
+            iid (str): The IID.
+            new_name (str): The new name.
+
+        Returns:
+            str: The new IID.
+        """
+        parent_iid, _, key = iid.rpartition("\\")
+        position = list(self.find_folder(parent_iid).keys()).index(key)
+        new_iid = parent_iid + "\\" + new_name
+
+        self.move(iid, new_iid, position = position)
+        return new_iid
@@ -0,0 +1,312 @@
+"""
+Copy-on-write views of a function's inputs. Functions are given views of the lists and dictionaries stored in a FunctionStore, rather than a deep copy of them.
+
+The views are real lists and dictionaries (subclasses of list and dict), so anything that works with the stored value works with its view too, e.g. json.dumps(),
+isinstance() checks, or C extensions that need a list. Each view starts as a shallow copy, which only copies references to what's in it, so the function can
+add, remove or replace items without changing the stored input. A list or dictionary inside a view isn't copied until it's read, at which point it's replaced
+by a view of its own. Nothing is ever deep-copied, so a large input that's only read costs one pass over its top level.
+
+Code that reads the storage of a view directly, rather than through Python (e.g. json.dumps(), or list.__getitem__(view, i)), sees the stored lists and
+dictionaries inside it, which are fine to read, but mustn't be written to.
+
+In strict mode, writing to a view raises InputMutationError instead, which is useful for finding functions that edit their inputs.
+
+Views are pickled as plain lists and dictionaries, so they can be sent to worker processes (where they are ordinary copies, and strict mode doesn't apply).
+"""
+
+import copy
+
+
+class InputMutationError(TypeError):
+    """Raised when a function writes to one of its inputs in strict mode."""
+    pass
+
+
+def is_stored(value):
+    # Lists and dictionaries that are still the stored ones, rather than views or the function's own
+    return type(value) is list or type(value) is dict
+
+
+class CopyOnWriteList(list):
+    __slots__ = ("_key", "_strict", "_wrapped")
+
+    def __init__(self, key, value, strict = False):
+        """A list that starts as a shallow copy of a stored input, with any lists and dictionaries in it replaced by views the first time they're read.
+
+        Args:
+            key (str): The input key, used in error messages.
+            value (list): The stored value.
+            strict (bool, optional): Whether writing to the list should raise InputMutationError. Defaults to False.
+        """
+        list.__init__(self, value)
+        self._key = key
+        self._strict = strict
+        self._wrapped = False           # Whether every stored list and dictionary in it has been replaced by a view
+
+    def _check_writable(self):
+        if self._strict:
+            raise InputMutationError(f"Input '{self._key}' was edited by the function. Functions should copy their inputs before changing them.")
+
+    def _wrap_at(self, index):
+        value = list.__getitem__(self, index)
+
+        if is_stored(value):
+            value = wrap(self._key, value, self._strict)
+            list.__setitem__(self, index, value)
+
+        return value
+
+    def _wrap_all(self):
+        if not self._wrapped:
+            for i in range(len(self)):
+                self._wrap_at(i)
+
+            self._wrapped = True
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._wrap_all()
+            return list.__getitem__(self, index)
+
+        return self._wrap_at(index)
+
+    def __iter__(self):
+        self._wrap_all()
+        return list.__iter__(self)
+
+    def __reversed__(self):
+        self._wrap_all()
+        return list.__reversed__(self)
+
+    def __add__(self, other):
+        return self.copy() + other
+
+    def __radd__(self, other):
+        return list(other) + self.copy()
+
+    def __mul__(self, n):
+        return self.copy() * n
+
+    __rmul__ = __mul__
+
+    def __iadd__(self, other):
+        self._check_writable()
+        return list.__iadd__(self, other)
+
+    def __imul__(self, n):
+        self._check_writable()
+        return list.__imul__(self, n)
+
+    def __setitem__(self, index, value):
+        self._check_writable()
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self._check_writable()
+        list.__delitem__(self, index)
+
+    def append(self, value):
+        self._check_writable()
+        list.append(self, value)
+
+    def extend(self, values):
+        self._check_writable()
+        list.extend(self, values)
+
+    def insert(self, index, value):
+        self._check_writable()
+        list.insert(self, index, value)
+
+    def remove(self, value):
+        self._check_writable()
+        list.remove(self, value)
+
+    def pop(self, index = -1):
+        self._check_writable()
+        value = list.pop(self, index)
+
+        return wrap(self._key, value, self._strict) if is_stored(value) else value
+
+    def clear(self):
+        self._check_writable()
+        list.clear(self)
+
+    def reverse(self):
+        self._check_writable()
+        list.reverse(self)
+
+    def sort(self, *args, **kwargs):
+        self._check_writable()
+        list.sort(self, *args, **kwargs)
+
+    def copy(self):
+        """Get a plain list with the same contents. Nested lists and dictionaries are still views."""
+        self._wrap_all()
+        return list.copy(self)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(list.copy(self), memo)
+
+    def __reduce__(self):
+        # Pickle as a plain list
+        return (list, (list.copy(self),))
+
+
+class CopyOnWriteDict(dict):
+    __slots__ = ("_key", "_strict", "_wrapped")
+
+    def __init__(self, key, value, strict = False):
+        """A dictionary that starts as a shallow copy of a stored input, with any lists and dictionaries in it replaced by views the first time they're read.
+
+        Args:
+            key (str): The input key, used in error messages.
+            value (dict): The stored value.
+            strict (bool, optional): Whether writing to the dictionary should raise InputMutationError. Defaults to False.
+        """
+        dict.__init__(self, value)
+        self._key = key
+        self._strict = strict
+        self._wrapped = False
+
+    def _check_writable(self):
+        if self._strict:
+            raise InputMutationError(f"Input '{self._key}' was edited by the function. Functions should copy their inputs before changing them.")
+
+    def _wrap_all(self):
+        if not self._wrapped:
+            for key, value in dict.items(self):
+                if is_stored(value):
+                    # Replacing the value of a key that's already there doesn't change the dictionary's size, so it's fine whilst iterating
+                    dict.__setitem__(self, key, wrap(self._key, value, self._strict))
+
+            self._wrapped = True
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+
+        if is_stored(value):
+            value = wrap(self._key, value, self._strict)
+            dict.__setitem__(self, key, value)
+
+        return value
+
+    def get(self, key, default = None):
+        return self[key] if key in self else default
+
+    def values(self):
+        self._wrap_all()
+        return dict.values(self)
+
+    def items(self):
+        self._wrap_all()
+        return dict.items(self)
+
+    def __or__(self, other):
+        return self.copy() | other
+
+    def __ror__(self, other):
+        return dict(other) | self.copy()
+
+    def __ior__(self, other):
+        self._check_writable()
+        return dict.__ior__(self, other)
+
+    def __setitem__(self, key, value):
+        self._check_writable()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._check_writable()
+        dict.__delitem__(self, key)
+
+    def pop(self, *args):
+        self._check_writable()
+        value = dict.pop(self, *args)
+
+        return wrap(self._key, value, self._strict) if is_stored(value) else value
+
+    def popitem(self):
+        self._check_writable()
+        key, value = dict.popitem(self)
+
+        return key, wrap(self._key, value, self._strict) if is_stored(value) else value
+
+    def setdefault(self, key, default = None):
+        if key in self:
+            return self[key]
+
+        self._check_writable()
+        dict.__setitem__(self, key, default)
+        return default
+
+    def clear(self):
+        self._check_writable()
+        dict.clear(self)
+
+    def update(self, *args, **kwargs):
+        self._check_writable()
+        dict.update(self, *args, **kwargs)
+
+    def copy(self):
+        """Get a plain dictionary with the same contents. Nested lists and dictionaries are still views."""
+        self._wrap_all()
+        return dict.copy(self)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict.copy(self), memo)
+
+    def __reduce__(self):
+        # Pickle as a plain dictionary
+        return (dict, (dict.copy(self),))
+
+
+def wrap(key, value, strict = False):
+    """Wrap a value in a view if it is a list or dictionary. Anything else is returned as it is."""
+    if isinstance(value, list):
+        return CopyOnWriteList(key, value, strict = strict)
+
+    if isinstance(value, dict):
+        return CopyOnWriteDict(key, value, strict = strict)
+
+    return value
+
+def make_view(key, value, strict = False):
+    """Make a copy-on-write view of one of a function's inputs.
+
+    Args:
+        key (str): The input key.
+        value: The stored input value. Strings and other immutable values are returned as they are.
+        strict (bool, optional): Whether writing to the view should raise InputMutationError, rather than changing the view. Defaults to False.
+
+    Returns:
+        The view, or the value itself if it isn't a list or dictionary.
+    """
+    return wrap(key, value, strict = strict)
+
+def materialise(value):
+    """Replace any views in a function's results with plain copies, so they can be saved to a .sgui file without sharing anything with the stored inputs.
+
+    Args:
+        value: The results, or part of them.
+
+    Returns:
+        The value, with every view replaced.
+    """
+    if isinstance(value, (CopyOnWriteList, CopyOnWriteDict)):
+        return copy.deepcopy(value)
+
+    if isinstance(value, list):
+        if any(isinstance(item, (list, dict)) for item in value):
+            return [materialise(item) for item in value]
+
+    elif isinstance(value, dict):
+        if any(isinstance(item, (list, dict)) for item in value.values()):
+            return {key : materialise(item) for key, item in value.items()}
+
+    return value
@@ -0,0 +1,339 @@
+"""
+Reading and writing .sgui workspace files. A workspace is a JSON file of {"Objects" : {...}, "Functions" : {...}}, where each ObjectStore and FunctionStore is
+saved in its JSON form (see to_json_form()), and folders are nested dictionaries.
+
+Workspaces are written a piece at a time straight from the live objects, without making a copy of them first, and without changing them. They are written
+to a temporary file which then replaces the original, so the original is never left half written if anything goes wrong part way through.
+
+They are also read a piece at a time (see read_workspace()). Each object and function is converted to its store as soon as it has been read, so the whole
+file is never held in memory at once, and the progress can be shown whilst a large workspace is loading.
+"""
+
+import codecs
+import collections.abc
+import json
+import os
+import re
+
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class WorkspaceEncoder(json.JSONEncoder):
+    """JSON encoder that saves anything with a to_json_form() method (i.e. ObjectStore and FunctionStore) in that form."""
+    def default(self, o):
+        if hasattr(o, "to_json_form"):
+            return o.to_json_form()
+
+        return super().default(o)
+
+
+class EncodedJSON(str):
+    """JSON that has already been encoded, e.g. an object read straight from a database (see scigui.database), which is written out as it is."""
+    pass
+
+
+def iter_folder(folder, encoder):
+    """Encode a folder as JSON, one item at a time. Each object or function is encoded in one go, which is much faster than encoding everything a piece at a time.
+
+    Args:
+        folder (dict): The folder, i.e. nested dictionaries of ObjectStore or FunctionStore. Any other mapping can be used as a folder too.
+        encoder (WorkspaceEncoder): The encoder to use for each item.
+
+    Yields:
+        str: The next piece of JSON.
+    """
+    yield "{"
+
+    for i, (key, value) in enumerate(folder.items()):
+        if i > 0:
+            yield ", "
+
+        yield encoder.encode(key) + ": "
+
+        if isinstance(value, collections.abc.Mapping):
+            yield from iter_folder(value, encoder)
+        elif isinstance(value, EncodedJSON):
+            yield value
+        else:
+            yield encoder.encode(value)
+
+    yield "}"
+
+def iter_workspace(objects, functions, sections = None, encoder = None):
+    """Encode a workspace as JSON, a piece at a time. The result is the same as json.dumps() of the JSON forms.
+
+    Args:
+        objects (dict): The objects, e.g. Application.active_objects.
+        functions (dict): The functions, e.g. Application.active_functions.
+        sections (dict, optional): Any other sections to save, as {name : data}. They come first, so they've already been read when the objects are being
+                                   loaded. Defaults to None.
+        encoder (WorkspaceEncoder, optional): The encoder to use, e.g. a scigui.dedup.SharingEncoder. Defaults to None, which uses a WorkspaceEncoder.
+
+    Yields:
+        str: The next piece of JSON.
+    """
+    if encoder is None:
+        encoder = WorkspaceEncoder()
+
+    yield "{"
+
+    for name, data in (sections or {}).items():
+        yield encoder.encode(name) + ": " + encoder.encode(data) + ", "
+
+    yield '"Objects": '
+    yield from iter_folder(objects, encoder)
+    yield ', "Functions": '
+    yield from iter_folder(functions, encoder)
+    yield "}"
+
+def write_workspace(filename, objects, functions, sections = None, encoder = None):
+    """Save a workspace to a file. It's written to filename + ".tmp" first, which then replaces the file, so a crash part way through can't corrupt it.
+
+    Args:
+        filename (str): The .sgui file to save to.
+        objects (dict): The objects, e.g. Application.active_objects.
+        functions (dict): The functions, e.g. Application.active_functions.
+        sections (dict, optional): Any other sections to save, as {name : data}. Defaults to None.
+        encoder (WorkspaceEncoder, optional): The encoder to use. Defaults to None, which uses a WorkspaceEncoder.
+    """
+    temp_filename = filename + ".tmp"
+
+    try:
+        with open(temp_filename, "w") as f:
+            for chunk in iter_workspace(objects, functions, sections, encoder = encoder):
+                f.write(chunk)
+
+            # Make sure it's all on the disk before it replaces the original
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_filename, filename)
+
+    except BaseException:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+        raise
+
+
+class WorkspaceReader:
+    def __init__(self, file, total_bytes = None, progress = None, chunk_size = 1024**2):
+        """Reads JSON from a file a piece at a time. Only the part of the file that hasn't been parsed yet is kept in memory.
+
+        Args:
+            file (file): The file, opened in binary mode.
+            total_bytes (int, optional): Size of the file, which is passed to progress. Defaults to None.
+            progress (callable, optional): Called as progress(bytes_read, total_bytes) each time more of the file is read. Defaults to None.
+            chunk_size (int, optional): Number of bytes to read at a time. Defaults to 1 MB.
+        """
+        self.file = file
+        self.total_bytes = total_bytes
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.text = ""
+        self.position = 0               # Position in self.text of the next thing to parse
+        self.bytes_read = 0
+        self.end_of_file = False
+
+    def read_more(self):
+        """Read the next chunk of the file, dropping the text that's already been parsed.
+
+        Returns:
+            bool: False if the end of the file had already been reached.
+        """
+        if self.end_of_file:
+            return False
+
+        # Read at least as much as is already waiting, so a single large value doesn't take many attempts to parse
+        data = self.file.read(max(self.chunk_size, len(self.text) - self.position))
+        self.bytes_read += len(data)
+        self.end_of_file = len(data) == 0
+        self.text = self.text[self.position:] + self.text_decoder.decode(data, final = self.end_of_file)
+        self.position = 0
+
+        if self.progress is not None and not self.end_of_file:
+            self.progress(self.bytes_read, self.total_bytes)
+
+        return True
+
+    def error(self, message):
+        return json.JSONDecodeError(message, self.text, self.position)
+
+    def peek(self):
+        """Skip any whitespace, and get the next character without parsing it.
+
+        Returns:
+            str: The next character, or "" at the end of the file.
+        """
+        while True:
+            if self.position < len(self.text):
+                character = self.text[self.position]
+
+                if character not in " \t\n\r":
+                    return character
+
+                self.position = WHITESPACE.match(self.text, self.position).end()
+                continue
+
+            if not self.read_more():
+                return ""
+
+    def expect(self, characters):
+        """Parse one of a set of characters, e.g. "," or "}".
+
+        Args:
+            characters (str): The characters that are allowed.
+
+        Returns:
+            str: The character that was found.
+        """
+        character = self.peek()
+
+        if character == "" or character not in characters:
+            raise self.error("Expecting " + " or ".join(repr(c) for c in characters))
+
+        self.position += 1
+        return character
+
+    def read_value(self):
+        """Parse one complete JSON value, e.g. a whole object or function.
+
+        Returns:
+            The value.
+        """
+        self.peek()
+
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.text, self.position)
+
+            except json.JSONDecodeError:
+                # The value might just not have been read in full yet
+                if self.read_more():
+                    continue
+
+                raise
+
+            # Numbers at the end of what's been read so far might carry on in the next chunk
+            if end == len(self.text) and self.read_more():
+                continue
+
+            self.position = end
+            return value
+
+    def read_key(self):
+        """Parse a key in a dictionary, and the ':' after it.
+
+        Returns:
+            str: The key.
+        """
+        if self.peek() != '"':
+            raise self.error("Expecting property name enclosed in double quotes")
+
+        while True:
+            try:
+                key, end = json.decoder.scanstring(self.text, self.position + 1)
+                break
+
+            except json.JSONDecodeError:
+                if not self.read_more():
+                    raise
+
+        self.position = end
+        self.expect(":")
+        return key
+
+    def is_store(self):
+        """Check whether the dictionary about to be parsed is an object or function, rather than a folder. The keys in an object or function all start with '\\'
+        (e.g. "\\INPUTS\\"), which the names of objects and folders can't.
+
+        Returns:
+            bool: True if it's an object or function.
+        """
+        offset = 1              # Past the "{"
+
+        while True:
+            offset = WHITESPACE.match(self.text, self.position + offset).end() - self.position
+
+            if self.position + offset + 3 <= len(self.text):
+                return self.text.startswith('"\\\\', self.position + offset)          # An escaped backslash at the start of the first key
+
+            if not self.read_more():
+                return False
+
+    def read_folder(self, folder, convert):
+        """Parse a folder of objects or functions, adding each one to a folder as soon as it has been read.
+
+        Args:
+            folder (dict): The folder to add them to.
+            convert (callable): Called with the JSON form of each object or function, and returns the store to add.
+        """
+        self.expect("{")
+
+        if self.peek() == "}":
+            self.position += 1
+            return
+
+        while True:
+            key = self.read_key()
+
+            if self.peek() == "{" and not self.is_store():
+                folder[key] = {}
+                self.read_folder(folder[key], convert)
+            else:
+                folder[key] = convert(self.read_value())
+
+            if self.expect(",}") == "}":
+                return
+
+def read_workspace(filename, objects, functions, convert, progress = None, on_section = None):
+    """Load a workspace from a file, a piece at a time.
+
+    Args:
+        filename (str): The .sgui file to load.
+        objects (dict): The folder to add the objects to, e.g. an empty ObjectTree.
+        functions (dict): The dictionary to add the functions to.
+        convert (callable): Called with the JSON form of each object or function, and returns its ObjectStore or FunctionStore.
+        progress (callable, optional): Called as progress(bytes_read, total_bytes) as the file is read. Defaults to None.
+        on_section (callable, optional): Called as on_section(name, data) as soon as each other section has been read, e.g. so it can be used when converting the
+                                         objects after it. Defaults to None.
+
+    Raises:
+        json.JSONDecodeError: If the file isn't valid JSON.
+
+    Returns:
+        dict: Any other sections in the file, other than "Objects" and "Functions".
+    """
+    sections = {}
+
+    with open(filename, "rb") as f:
+        reader = WorkspaceReader(f, total_bytes = os.path.getsize(filename), progress = progress)
+        reader.expect("{")
+
+        if reader.peek() == "}":
+            reader.position += 1
+
+        else:
+            while True:
+                key = reader.read_key()
+
+                if key == "Objects":
+                    reader.read_folder(objects, convert)
+                elif key == "Functions":
+                    reader.read_folder(functions, convert)
+                else:
+                    sections[key] = reader.read_value()
+
+                    if on_section is not None:
+                        on_section(key, sections[key])
+
+                if reader.expect(",}") == "}":
+                    break
+
+        if reader.peek() != "":
+            raise reader.error("Extra data")
+
+    return sections
@@ -17,7 +17,7 @@ setup(
     version = '0.1',
     license = '	AGPL-3.0',
     packages = find_packages(),
-    install_requires = ['tk', 'matplotlib'],
+    install_requires = ['tk', 'matplotlib', 'numpy'],
     description = 'GUI toolbox that helps you turn standard Python libraries into system-model style GUIs',
     keywords = ['gui', 'system', 'model', 'fast', 'easy'],
     classifiers = [